@@ -1,5 +1,12 @@
 import utils
 
+# The hooks in this file that only depend on their arguments, and don't keep any state between calls, so build_site.py
+# can call them in worker processes. Remove a hook from this list if it reads or changes anything outside of what it's
+# given. If extra_comic_dict_processing is listed, it's called in worker processes to build pages in parallel. Extra
+# comics are built from start to finish in worker processes, calling every hook but preprocess and postprocess there,
+# but only if all of those hooks are listed. Otherwise, extra comics are built one at a time in the main process.
+WORKER_SAFE_HOOKS = ["extra_comic_dict_processing"]
+
 
 def preprocess(comic_info):
     """
@@ -26,6 +33,23 @@ def extra_page_info_processing(comic_folder, comic_info, page_path, page_info):
     return page_info
 
 
+def extra_page_info_batch_processing(comic_folder, comic_info, page_info_list):
+    """
+    Like extra_page_info_processing(), but called once with the info of every page, after extra_page_info_processing()
+    has been called for each of them. Any expensive setup, like loading a lookup file, only has to be done once, instead
+    of once per page.
+
+    :param comic_folder: If the main comic is being built, this will be blank. Otherwise, it's the name of the extra
+    comic that's currently being built.
+    :param comic_info: The current comic's comic_info.ini file parsed into a RawConfigParser object.
+    :param page_info_list: A list of dict representations of every published page's info.ini file, sorted by post date.
+    Each page's folder is your_content/{comic_folder}comics/{page_info["page_name"]}/
+    :return: None if the page info dicts were changed in place, or a new list of page info dicts. The list is sorted by
+    post date again afterwards.
+    """
+    return None
+
+
 def extra_comic_dict_processing(comic_folder, comic_info, comic_data_dict):
     """
     Use this hook to do further processing on individual comic_data_dicts after they've been generated by build_site.py
@@ -33,12 +57,31 @@ def extra_comic_dict_processing(comic_folder, comic_info, comic_data_dict):
     :param comic_folder: If the main comic is being built, this will be blank. Otherwise, it's the name of the extra
     comic that's currently being built.
     :param comic_info: The current comic's comic_info.ini file parsed into a RawConfigParser object.
-    :param comic_data_dict: A dictionary of the data for a given comic
+    :param comic_data_dict: A dictionary of the data for a given comic. In streaming builds (`Stream comic pages = True`
+    in comic_info.ini), this is called before the page's post and transcripts are loaded, so `post_html` and
+    `transcripts` are empty.
     :return: A dictionary of the data for a given comic
     """
     return comic_data_dict
 
 
+def extra_comic_dict_batch_processing(comic_folder, comic_info, comic_data_dicts):
+    """
+    Like extra_comic_dict_processing(), but called once with every comic_data_dict, after
+    extra_comic_dict_processing() has been called for each of them. Any expensive setup, like loading a lookup file,
+    only has to be done once, instead of once per page, and since the pages are never split up between worker
+    processes, it can keep state between pages. Unless it's listed in WORKER_SAFE_HOOKS, it's also always called in the
+    main process, so it can keep state between comics too.
+
+    :param comic_folder: If the main comic is being built, this will be blank. Otherwise, it's the name of the extra
+    comic that's currently being built.
+    :param comic_info: The current comic's comic_info.ini file parsed into a RawConfigParser object.
+    :param comic_data_dicts: The list of comic data dicts for every published page, in order.
+    :return: None if the comic data dicts were changed in place, or a new list of comic data dicts
+    """
+    return None
+
+
 def extra_get_storylines_processing(comic_folder, comic_info, storylines_dict):
     """
     Use this hook to do further processing on the `storylines` variable, which is used primarily to build the
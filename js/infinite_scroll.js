@@ -1,4 +1,6 @@
 let page_info_json;
+// Maps each page name to its index in page_info_json, so finding a page doesn't mean searching through every page
+let page_index_by_name = new Map();
 let infinite_scroll_div;
 let earliest_comic_loaded = null;
 let latest_comic_loaded = null;
@@ -10,12 +12,27 @@ let loading_more_pages = false;
 // it counts as being "viewed" for the purposes of determining what the current viewed page is.
 let viewed_page_top_margin_percentage = 0.30;
 let load_next_pages_threshold = 1000;
+// In virtualized mode, pages more than this many viewport heights above or below the viewport have their images
+// removed, and get them back when they're scrolled near again. This keeps long reading sessions from filling the page
+// with hundreds of full-size images.
+let virtualize = true;
+let render_margin_viewports = 3;
+// Lazy-loaded images above the viewport may not load until they're scrolled to, so the "Load Newer" button is checked
+// again after this many milliseconds even if the new pages' images are still waiting to load.
+let load_newer_image_timeout_ms = 2000;
 let comic_base_dir = null;
 let content_base_dir = null;
+// Observers that replace checking everything on every scroll event
+let load_newer_observer = null;
+let current_page_observer = null;
+let render_observer = null;
+// Image and link nodes taken off of pages that were scrolled far away, ready to be used again
+let recycled_image_nodes = [];
 
-export async function load_page(local_comic_base_dir, local_content_base_dir) {
+export async function load_page(local_comic_base_dir, local_content_base_dir, virtualized = true) {
     comic_base_dir = local_comic_base_dir;
     content_base_dir = local_content_base_dir;
+    virtualize = virtualized;
     initializing = true;
     await fetch_all_json_data();
     // If no pages to load, end early.
@@ -25,23 +42,17 @@ export async function load_page(local_comic_base_dir, local_content_base_dir) {
         document.getElementById("load-newer").hidden = true;
         return;
     }
+    page_index_by_name = new Map(page_info_json.map((page, i) => [page["page_name"], i]));
     infinite_scroll_div = document.getElementById("infinite-scroll");
+    create_observers();
     load_and_go_to_page();
     document.getElementById("load-older-button").onclick = load_older_pages;
     document.getElementById("load-newer-button").onclick = load_newer_pages;
-    window.onscroll = on_scroll;
-    // document.addEventListener("keydown", event => {
-    //     if (event.code === "KeyL") {
-    //         set_current_page(get_current_page(current_page, true));
-    //     }
-    // });
     for (let link of document.getElementsByClassName("chapter-links")) {
         link.addEventListener("click", function () {
-            let url = this.getAttribute("href");
-            console.log(url);
-            window.location.href = url;
+            window.location.href = this.getAttribute("href");
             initializing = true;
-            infinite_scroll_div.textContent = '';
+            clear_pages();
             load_and_go_to_page();
             initializing = false;
         })
@@ -50,9 +61,7 @@ export async function load_page(local_comic_base_dir, local_content_base_dir) {
 }
 
 async function fetch_all_json_data() {
-    console.debug(`${comic_base_dir}/comic/page_info_list.json`);
     let response = await fetch(`${comic_base_dir}/comic/page_info_list.json`);
-    console.log("Fetched page info list");
     let json;
     try {
         json = await response.json();
@@ -64,6 +73,57 @@ async function fetch_all_json_data() {
     page_info_json = json["page_info_list"];
 }
 
+function create_observers() {
+    // Load more pages when the "Load Newer" button gets close to being scrolled into view
+    load_newer_observer = new IntersectionObserver(function (entries) {
+        if (!initializing && entries.some(entry => entry.isIntersecting)) {
+            load_newer_pages();
+        }
+    }, {rootMargin: `0px 0px ${load_next_pages_threshold}px 0px`});
+    load_newer_observer.observe(document.getElementById("load-newer"));
+
+    // Only pages that cross the top part of the viewport count as being viewed
+    let bottom_margin = Math.round((1 - viewed_page_top_margin_percentage) * 100);
+    current_page_observer = new IntersectionObserver(function (entries) {
+        if (initializing) {
+            return;
+        }
+        for (let entry of entries) {
+            if (entry.isIntersecting) {
+                set_current_page(Number(entry.target.dataset.pageIndex));
+            }
+        }
+    }, {rootMargin: `0px 0px -${bottom_margin}% 0px`});
+
+    if (virtualize) {
+        let margin = render_margin_viewports * 100;
+        render_observer = new IntersectionObserver(function (entries) {
+            for (let entry of entries) {
+                if (entry.isIntersecting) {
+                    render_page_images(entry.target);
+                } else {
+                    recycle_page_images(entry.target);
+                }
+            }
+        }, {rootMargin: `${margin}% 0px ${margin}% 0px`});
+    }
+}
+
+function clear_pages() {
+    for (let node of infinite_scroll_div.children) {
+        current_page_observer.unobserve(node);
+        if (render_observer !== null) {
+            render_observer.unobserve(node);
+        }
+    }
+    infinite_scroll_div.textContent = '';
+    // The page being jumped to might not be at the end of the comic, so there may be newer pages to load again
+    document.getElementById("load-older").hidden = true;
+    document.getElementById("load-newer").hidden = false;
+    document.getElementById("caught-up-notification").hidden = true;
+    load_newer_observer.observe(document.getElementById("load-newer"));
+}
+
 function load_and_go_to_page() {
     get_starting_page();
     load_newer_pages();
@@ -77,42 +137,106 @@ function get_starting_page() {
         return;
     }
     let page_name = decodeURIComponent(window.location.href.split("#")[1]);
-    console.log("Loading page named " + page_name);
-    for (let i=0; i < page_info_json.length; i++) {
-        console.log(page_info_json[i].page_name);
-        if (page_info_json[i].page_name === page_name) {
-            console.log("Starting on page " + i);
-            if (i !== 0) {
-                document.getElementById("load-older").hidden = false;
-            }
-            earliest_comic_loaded = i;
-            latest_comic_loaded = i - 1;
-            return;
-        }
+    let i = page_index_by_name.get(page_name);
+    if (i === undefined) {
+        console.warn("Couldn't find page named " + page_name);
+        return;
+    }
+    if (i !== 0) {
+        document.getElementById("load-older").hidden = false;
     }
-    console.log("Couldn't find page named " + page_name);
+    earliest_comic_loaded = i;
+    latest_comic_loaded = i - 1;
 }
 
-function build_comic_div(page) {
+function build_comic_div(page_index) {
     let node = document.createElement("div");
     node.className = "infinite-page";
-    node.id = page["page_name"];
+    node.id = page_info_json[page_index]["page_name"];
+    node.dataset.pageIndex = page_index;
+    render_page_images(node);
+    current_page_observer.observe(node);
+    if (render_observer !== null) {
+        render_observer.observe(node);
+    }
+    return node;
+}
 
+function render_page_images(node) {
+    if (node.childElementCount > 0) {
+        return;
+    }
+    let page = page_info_json[Number(node.dataset.pageIndex)];
     // Make a link and image node for each file in the list of image_file_names
-    for (let image_filename of page["image_file_names"]) {
-        let link_node = document.createElement("a");
+    let image_dimensions = page["image_dimensions"] || [];
+    for (let [i, image_filename] of page["image_file_names"].entries()) {
+        let link_node = recycled_image_nodes.pop();
+        if (link_node === undefined) {
+            link_node = document.createElement("a");
+            let image_node = document.createElement("img");
+            image_node.className = "infinite-page-image";
+            image_node.decoding = "async";
+            image_node.loading = "lazy";
+            link_node.appendChild(image_node);
+        }
         link_node.href = `${comic_base_dir}/comic/${page["page_name"]}/`;
-
-        let image_node = document.createElement("img");
-        image_node.className = "infinite-page-image";
-        console.log("Adding div for page " + page["page_name"]);
+        let image_node = link_node.firstChild;
         image_node.src = `${content_base_dir}/comics/${page["page_name"]}/${image_filename}`;
         image_node.title = page["Alt text"];
-
-        link_node.appendChild(image_node);
+        // Knowing each image's size up front means pages take up the right amount of space before their images have
+        // loaded, so the page doesn't jump around as they come in
+        let dimensions = image_dimensions[i];
+        if (dimensions) {
+            image_node.width = dimensions[0];
+            image_node.height = dimensions[1];
+        } else {
+            image_node.removeAttribute("width");
+            image_node.removeAttribute("height");
+        }
         node.appendChild(link_node);
     }
-    return node;
+    if (node.style.minHeight) {
+        // Keep the space the page had when it was recycled until its images are back, so nothing below it jumps
+        wait_for_images([node]).then(function () {
+            if (node.childElementCount > 0) {
+                node.style.minHeight = "";
+            }
+        });
+    }
+}
+
+function wait_for_images(nodes, timeout_ms = null) {
+    let images = nodes.flatMap(node => Array.from(node.getElementsByTagName("img")));
+    let loaded = Promise.all(images.map(wait_for_image));
+    if (timeout_ms === null) {
+        return loaded;
+    }
+    return Promise.race([loaded, new Promise(resolve => setTimeout(resolve, timeout_ms))]);
+}
+
+function wait_for_image(image) {
+    // Images that are broken, already loaded, or recycled before they loaded (and so have no src) are all complete
+    if (image.complete) {
+        return Promise.resolve();
+    }
+    return new Promise(function (resolve) {
+        image.addEventListener("load", resolve, {once: true});
+        image.addEventListener("error", resolve, {once: true});
+    });
+}
+
+function recycle_page_images(node) {
+    if (node.childElementCount === 0) {
+        return;
+    }
+    // Keep the page's height while it's empty, so nothing else on the page moves
+    node.style.minHeight = `${node.offsetHeight}px`;
+    while (node.firstChild) {
+        let link_node = node.removeChild(node.firstChild);
+        // Stop the browser from holding on to (or still downloading) the full-size image
+        link_node.firstChild.removeAttribute("src");
+        recycled_image_nodes.push(link_node);
+    }
 }
 
 function load_older_pages() {
@@ -126,9 +250,8 @@ function load_older_pages() {
     try {
         for (let i = 0; i < num_pages_to_load; i++) {
             earliest_comic_loaded--;
-            current_page++;
 
-            let node = build_comic_div(page_info_json[earliest_comic_loaded]);
+            let node = build_comic_div(earliest_comic_loaded);
             infinite_scroll_div.insertBefore(node, infinite_scroll_div.firstChild);
 
             if (earliest_comic_loaded <= 0) {
@@ -151,24 +274,34 @@ function load_newer_pages() {
         return;
     loading_more_pages = true;
     document.getElementById("loading-infinite-scroll").hidden = true;
+    let new_nodes = [];
     try {
         for (let i = 0; i < num_pages_to_load; i++) {
             latest_comic_loaded++;
 
-            let node = build_comic_div(page_info_json[latest_comic_loaded]);
+            let node = build_comic_div(latest_comic_loaded);
             infinite_scroll_div.appendChild(node);
+            new_nodes.push(node);
 
             if (latest_comic_loaded + 1 >= page_info_json.length) {
                 // No more pages to display
                 document.getElementById("load-newer").hidden = true;
                 document.getElementById("caught-up-notification").hidden = false;
-                break;
+                load_newer_observer.disconnect();
+                return;
             }
         }
-        console.log("Done loading images");
     } finally {
         loading_more_pages = false;
     }
+    // The observer only reports changes, so if the new pages are too short to push the "Load Newer" button out of
+    // range, nothing would load more. Once their images have loaded and they're full height, observing the button
+    // again reports whether it's still in range.
+    wait_for_images(new_nodes, load_newer_image_timeout_ms).finally(function () {
+        let load_newer = document.getElementById("load-newer");
+        load_newer_observer.unobserve(load_newer);
+        load_newer_observer.observe(load_newer);
+    });
 }
 
 function go_to_anchor() {
@@ -176,50 +309,18 @@ function go_to_anchor() {
         return;
     }
     let anchor = window.location.href.split("#")[1];
-    let top = document.getElementById(decodeURI(anchor)).offsetTop;
-    window.scrollTo(0, top);
-}
-
-function get_current_page(start_at_page, show_logs=false) {
-    if (start_at_page === null) {
-        start_at_page = 0;
-    }
-    let child_nodes = infinite_scroll_div.childNodes;
-    let threshold = viewed_page_top_margin_percentage * window.innerHeight;
-    if (show_logs) {
-        console.log("childNodes length: " + child_nodes.length);
-        console.log(threshold);
-    }
-    for (let i=start_at_page; i < child_nodes.length; i++) {
-        let rect = child_nodes[i].getBoundingClientRect();
-        if (show_logs)
-            console.log("id=" + child_nodes[i].id + ", top=" + rect.top);
-        if (rect.top >= threshold) {
-            return Math.max(0, i - 1);
-        }
+    let node = document.getElementById(decodeURI(anchor));
+    if (node !== null) {
+        window.scrollTo(0, node.offsetTop);
     }
-    return child_nodes.length - 1;
 }
 
 function set_current_page(new_current_page) {
+    if (current_page === new_current_page) {
+        return;
+    }
     current_page = new_current_page;
-    console.log("Current page: " + current_page);
-    let anchor = infinite_scroll_div.childNodes[current_page].id;
-    console.log("Anchor: " + anchor);
+    let anchor = page_info_json[current_page]["page_name"];
     let new_url = window.location.href.split("#")[0] + "#" + anchor;
     window.history.replaceState(null, null, new_url);
 }
-
-function on_scroll(event) {
-    if (initializing) {
-        return;
-    }
-    if ((window.innerHeight + window.pageYOffset) >= document.body.offsetHeight - load_next_pages_threshold) {
-        load_newer_pages();
-    }
-
-    let new_current_page = get_current_page(current_page);
-    if (current_page !== new_current_page) {
-        set_current_page(new_current_page);
-    }
-}
@@ -0,0 +1,133 @@
+import { find_get_parameter } from "./utils.js";
+
+let search_url = null;
+let comic_base_dir = null;
+let search_index = null;
+// Shards that have already been fetched, by shard name
+let shards = new Map();
+// How much a match in each field counts towards a page's score, in the same order as the index's "fields" list:
+// title, tags, characters, storyline, transcripts
+const field_weights = [8, 4, 4, 2, 1];
+
+export async function load_page(local_comic_base_dir) {
+    comic_base_dir = local_comic_base_dir;
+    search_url = `${comic_base_dir}/comic/search`;
+    const form = document.getElementById("search-form");
+    const input = document.getElementById("search-input");
+    form.addEventListener("submit", function (event) {
+        event.preventDefault();
+        const url = new URL(window.location.href);
+        url.searchParams.set("q", input.value);
+        window.history.replaceState(null, "", url);
+        search(input.value);
+    });
+    const query = find_get_parameter("q");
+    if (query) {
+        input.value = query.replace(/\+/g, " ");
+        await search(input.value);
+    }
+}
+
+async function fetch_json(url) {
+    const response = await fetch(url);
+    if (!response.ok) {
+        throw new Error(`Failed to fetch ${url}: ${response.status}`);
+    }
+    return response.json();
+}
+
+function get_terms(text) {
+    // Matches the \w+ terms that the search index was built with
+    return text.toLowerCase().match(/[\p{L}\p{N}_]+/gu) || [];
+}
+
+function get_shard_name(term) {
+    const prefix = Array.from(term).slice(0, search_index.prefix_length).join("");
+    if (/^[a-z0-9]+$/.test(prefix)) {
+        return prefix;
+    }
+    return "_" + Array.from(new TextEncoder().encode(prefix), b => b.toString(16).padStart(2, "0")).join("");
+}
+
+async function get_shard(shard_name) {
+    if (!search_index.shards.includes(shard_name)) {
+        return {};
+    }
+    if (!shards.has(shard_name)) {
+        shards.set(shard_name, fetch_json(`${search_url}/${shard_name}.json`));
+    }
+    return shards.get(shard_name);
+}
+
+async function get_term_scores(term) {
+    // Terms at least as long as a shard prefix also match longer words that start with them, e.g. "cat" finds "cats"
+    const shard = await get_shard(get_shard_name(term));
+    const allow_prefix = Array.from(term).length >= search_index.prefix_length;
+    const scores = new Map();
+    for (const [shard_term, postings] of Object.entries(shard)) {
+        if (shard_term !== term && !(allow_prefix && shard_term.startsWith(term))) {
+            continue;
+        }
+        // Exact matches count for more than prefix matches
+        const multiplier = shard_term === term ? 2 : 1;
+        for (const [page_id, fields] of postings) {
+            let score = 0;
+            for (let i = 0; i < field_weights.length; i++) {
+                if (fields & (1 << i)) {
+                    score += field_weights[i];
+                }
+            }
+            scores.set(page_id, Math.max(scores.get(page_id) || 0, score * multiplier));
+        }
+    }
+    return scores;
+}
+
+async function search(query) {
+    const status = document.getElementById("search-status");
+    const results_list = document.getElementById("search-results");
+    results_list.textContent = "";
+    const terms = [...new Set(get_terms(query))];
+    if (terms.length === 0) {
+        status.textContent = "";
+        return;
+    }
+    status.textContent = "Searching...";
+    if (search_index === null) {
+        try {
+            search_index = await fetch_json(`${search_url}/index.json`);
+        } catch (e) {
+            console.error(e);
+            status.textContent = "Search isn't available for this comic.";
+            return;
+        }
+    }
+    // Only pages that match every term are shown
+    let results = null;
+    for (const term_scores of await Promise.all(terms.map(get_term_scores))) {
+        if (results === null) {
+            results = term_scores;
+            continue;
+        }
+        const combined = new Map();
+        for (const [page_id, score] of term_scores) {
+            if (results.has(page_id)) {
+                combined.set(page_id, results.get(page_id) + score);
+            }
+        }
+        results = combined;
+    }
+    // Best matches first, and newest pages first for equal matches
+    const sorted_results = [...results].sort((a, b) => b[1] - a[1] || b[0] - a[0]);
+    status.textContent = `${sorted_results.length} page${sorted_results.length === 1 ? "" : "s"} found`;
+    for (const [page_id] of sorted_results) {
+        const [page_name, title, post_date] = search_index.pages[page_id];
+        const item = document.createElement("li");
+        const link = document.createElement("a");
+        link.href = `${comic_base_dir}/comic/${page_name}/#comic-page`;
+        link.textContent = title;
+        item.appendChild(link);
+        item.appendChild(document.createTextNode(` -- ${post_date}`));
+        results_list.appendChild(item);
+    }
+}
@@ -0,0 +1,473 @@
+"""
+Benchmark harness for build_site.py.
+
+Generates synthetic comics in a temporary directory, runs build_site.main() against each of them in a fresh Python
+process, and records the per-stage processing times and peak memory usage of each build to a JSON results file.
+Every parameter accepts multiple values, and one comic is generated and built for every combination of values.
+
+Results files from different runs can be compared with --compare, e.g.:
+
+    python comic_git_engine/scripts/benchmark.py --pages 1000 10000 --output before.json
+    (make some changes)
+    python comic_git_engine/scripts/benchmark.py --pages 1000 10000 --output after.json --compare before.json
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from time import strftime, perf_counter
+from typing import Dict, List, Any, Optional
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ENGINE_ROOT = os.path.dirname(SCRIPT_DIR)
+
+LANGUAGES = ["English", "Spanish", "French", "German", "Japanese", "Portuguese", "Russian", "Italian"]
+POST_DATE_FORMAT = "%Y-%m-%d %H:%M"
+POST_TEXT = """This is the post for **{title}**. It has a little bit of *Markdown* in it,
+and a [link](https://example.com).
+
+It also has a second paragraph, so there's something for the Markdown parser to chew on.
+"""
+TRANSCRIPT_TEXT = """**Alice:** This is the {language} transcript for {title}.
+
+**Bob:** It's not a very interesting transcript.
+"""
+
+
+def build_comic_info(params: Dict[str, Any], extra_comics: List[str]) -> str:
+    return f"""[Comic Info]
+Comic name = Benchmark Comic
+Author = Benchmark Author
+Description = A synthetic comic generated by benchmark.py
+
+[Comic Settings]
+Comic domain = benchmark.example.com
+Comic subdirectory =
+Date format = {POST_DATE_FORMAT}
+Timezone = UTC
+Theme = default
+Extra comics = {", ".join(extra_comics)}
+
+[Links Bar]
+Archive = /archive/
+Tagged = /tagged/
+
+[Pages]
+archive = Archive
+tagged =
+infinite_scroll = Infinite Scroll
+index =
+latest =
+404 = Page not found
+
+[Archive]
+Date format = %B %d, %Y
+Use thumbnails = True
+
+[Image Reprocessing]
+Create thumbnails = {params["images_per_page"] > 0}
+Thumbnail size = 160w
+Overwrite existing images = False
+
+[Transcripts]
+Enable transcripts = {params["transcript_languages"] > 0}
+
+[RSS Feed]
+Build RSS feed = True
+Description = A synthetic comic generated by benchmark.py
+Language = en
+Image = your_content/images/rss_banner.png
+Image width = 100
+Image height = 32
+"""
+
+
+def make_images(image_dir: str, params: Dict[str, Any]) -> List[str]:
+    """
+    Creates one source image for every image slot on a page. Every page reuses these source images, so they only need
+    to be encoded once.
+    """
+    from PIL import Image
+
+    os.makedirs(image_dir, exist_ok=True)
+    width, height = (int(n) for n in params["image_size"].lower().split("x"))
+    paths = []
+    for i in range(params["images_per_page"]):
+        path = os.path.join(image_dir, f"page_{i + 1}.png")
+        # Noise doesn't compress well, so decoding it costs about as much as decoding a real comic page
+        Image.effect_noise((width, height), 64 + i).convert("RGB").save(path)
+        paths.append(path)
+    return paths
+
+
+def link_or_copy(src: str, dst: str):
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+def generate_comic_pages(comics_dir: str, page_count: int, params: Dict[str, Any], image_paths: List[str]):
+    start_date = datetime(2000, 1, 1)
+    languages = (LANGUAGES + [f"Language {n}" for n in range(len(LANGUAGES), params["transcript_languages"])])
+    languages = languages[:params["transcript_languages"]]
+    storyline_size = max(1, -(-page_count // max(1, params["storylines"])))
+    for i in range(page_count):
+        title = f"Page {i + 1}"
+        page_dir = os.path.join(comics_dir, title)
+        os.makedirs(page_dir)
+        image_file_names = [os.path.basename(p) for p in image_paths]
+        for src in image_paths:
+            link_or_copy(src, os.path.join(page_dir, os.path.basename(src)))
+        tags = [f"Tag {(i * 7 + j) % params['tag_pool']}" for j in range(params["tags_per_page"])]
+        storyline = f"Chapter {i // storyline_size + 1}" if params["storylines"] else ""
+        post_date = (start_date + timedelta(hours=i)).strftime(POST_DATE_FORMAT)
+        with open(os.path.join(page_dir, "info.ini"), "w", encoding="utf-8") as f:
+            f.write(f"""Title = {title}
+Post date = {post_date}
+Filenames = {", ".join(image_file_names)}
+Alt text = Alt text for {title}
+Storyline = {storyline}
+Tags = {", ".join(dict.fromkeys(tags))}
+""")
+        with open(os.path.join(page_dir, "post.txt"), "w", encoding="utf-8") as f:
+            f.write(POST_TEXT.format(title=title))
+        for language in languages:
+            with open(os.path.join(page_dir, f"{language}.txt"), "w", encoding="utf-8") as f:
+                f.write(TRANSCRIPT_TEXT.format(language=language, title=title))
+
+
+def generate_comic(site_dir: str, params: Dict[str, Any]):
+    """
+    Builds a complete comic_git project in `site_dir`, with a `your_content` folder full of synthetic comic pages and a
+    `comic_git_engine` folder pointing at this engine.
+    """
+    content_dir = os.path.join(site_dir, "your_content")
+    os.makedirs(content_dir)
+    engine_dir = os.path.join(site_dir, "comic_git_engine")
+    try:
+        os.symlink(ENGINE_ROOT, engine_dir, target_is_directory=True)
+    except OSError:
+        # Creating symlinks needs special privileges on Windows
+        for folder in ("templates", "css", "js"):
+            shutil.copytree(os.path.join(ENGINE_ROOT, folder), os.path.join(engine_dir, folder))
+
+    image_paths = make_images(os.path.join(site_dir, "source_images"), params)
+    extra_comics = [f"extra_{n + 1}" for n in range(params["extra_comics"])]
+    with open(os.path.join(content_dir, "comic_info.ini"), "w", encoding="utf-8") as f:
+        f.write(build_comic_info(params, extra_comics))
+    with open(os.path.join(content_dir, "home page.txt"), "w", encoding="utf-8") as f:
+        f.write("Welcome to the **benchmark comic**!\n")
+    generate_comic_pages(os.path.join(content_dir, "comics"), params["pages"], params, image_paths)
+    for extra_comic in extra_comics:
+        extra_dir = os.path.join(content_dir, extra_comic)
+        os.makedirs(extra_dir)
+        with open(os.path.join(extra_dir, "comic_info.ini"), "w", encoding="utf-8") as f:
+            f.write(f"[Comic Info]\nComic name = Benchmark {extra_comic}\n")
+        generate_comic_pages(os.path.join(extra_dir, "comics"), params["extra_comic_pages"], params, image_paths)
+
+
+def get_peak_rss_kb() -> Optional[int]:
+    try:
+        import resource
+    except ImportError:
+        # The resource module isn't available on Windows
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports ru_maxrss in bytes, everything else reports it in kilobytes
+    if sys.platform == "darwin":
+        max_rss //= 1024
+    return max_rss
+
+
+def run_worker(site_dir: str, result_path: str, profile_memory: bool):
+    """
+    Runs in a fresh process, so that module-level state and peak memory usage don't leak between builds.
+    """
+    sys.path.insert(0, SCRIPT_DIR)
+    os.chdir(site_dir)
+    import build_site
+
+    build_site.main(profile_memory=profile_memory)
+    stages = []
+    times = build_site.PROCESSING_TIMES
+    for (_, last_t), (name, t) in zip(times, times[1:]):
+        stages.append([name, (t - last_t) / 1_000_000])
+    result = {
+        "stages": stages,
+        "total_ms": (times[-1][1] - times[0][1]) / 1_000_000,
+        "peak_rss_kb": get_peak_rss_kb(),
+    }
+    if profile_memory:
+        # [stage name, retained bytes, peak bytes] for each stage
+        result["stage_memory"] = [
+            [name, current, peak] for (name, _), (current, peak) in zip(times[1:], build_site.MEMORY_USAGE[1:])
+        ]
+    with open(result_path, "w") as f:
+        json.dump(result, f)
+
+
+def measure_import_time(module: str = "build_site", limit: int = 10) -> Dict[str, Any]:
+    """
+    Imports `module` in a fresh process with `python -X importtime`, and returns its total import time along with
+    the modules it imports directly, heaviest first.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SCRIPT_DIR, capture_output=True, text=True, check=True
+    )
+    total_ms = None
+    direct_imports = []
+    # Lines look like "import time:       896 |       6476 |   traceback", where the indentation of the module name
+    # shows how deeply nested the import is
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        if name.strip() == module and depth == 0:
+            total_ms = int(cumulative_us) / 1000
+        elif depth == 1:
+            direct_imports.append([name.strip(), int(cumulative_us) / 1000])
+    direct_imports.sort(key=lambda i: i[1], reverse=True)
+    return {"module": module, "total_ms": total_ms, "heaviest_imports": direct_imports[:limit]}
+
+
+def measure_check_time(site_dir: str) -> Optional[float]:
+    """
+    Times `build_site.py --check` right after a build, when it should find nothing to do and exit straight away.
+    """
+    start = perf_counter()
+    result = subprocess.run(
+        [sys.executable, os.path.join(SCRIPT_DIR, "build_site.py"), "--check"],
+        cwd=site_dir, capture_output=True, text=True, check=True
+    )
+    elapsed_ms = (perf_counter() - start) * 1000
+    if "Skipping build" not in result.stdout:
+        print("Warning: build_site.py --check rebuilt the comic instead of skipping it", file=sys.stderr)
+        return None
+    return elapsed_ms
+
+
+def measure_read_info(work_dir: Optional[str], file_count: int) -> Dict[str, Any]:
+    """
+    Times reading `file_count` info.ini files with read_info()'s lightweight parser, compared to RawConfigParser.
+    """
+    sys.path.insert(0, SCRIPT_DIR)
+    import utils
+
+    temp_dir = tempfile.mkdtemp(prefix="comic_git_read_info_", dir=work_dir)
+    try:
+        paths = []
+        for i in range(file_count):
+            path = os.path.join(temp_dir, f"{i}.ini")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(f"""# Page {i + 1}
+Title = Page {i + 1}
+Post date = 2000-01-01 00:00
+Filenames = page_1.png, page_2.png
+Alt text = A long alt text that goes on
+    for more than one line
+Storyline = Chapter {i // 100 + 1}
+Characters = Alice, Bob
+Tags = Tag {i % 200}, Tag {i % 7}
+!Notes = Remember to fix the lettering on this page
+""")
+            paths.append(path)
+
+        def read_all(read_function) -> float:
+            start = perf_counter()
+            for path in paths:
+                with open(path, "rb") as f:
+                    read_function(f.read().decode("utf-8"))
+            return (perf_counter() - start) * 1000
+
+        config_parser_ms = read_all(lambda s: utils.read_info_string(s, to_dict=True))
+        fast_ms = read_all(utils.parse_info_string)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    return {
+        "files": file_count,
+        "config_parser_ms": config_parser_ms,
+        "fast_parser_ms": fast_ms,
+        "speedup": config_parser_ms / fast_ms if fast_ms else None,
+    }
+
+
+def scenario_name(params: Dict[str, Any]) -> str:
+    return ", ".join(f"{k}={v}" for k, v in params.items())
+
+
+def run_scenario(work_dir: str, params: Dict[str, Any], repeat: int, keep_sites: bool,
+                 profile_memory: bool) -> Dict[str, Any]:
+    site_dir = tempfile.mkdtemp(prefix="comic_git_benchmark_", dir=work_dir)
+    try:
+        print(f"[{strftime('%Y-%m-%d %H:%M:%S')}] Generating comic in {site_dir}")
+        generate_comic(site_dir, params)
+        runs = []
+        for i in range(repeat):
+            print(f"[{strftime('%Y-%m-%d %H:%M:%S')}] Building ({i + 1}/{repeat})")
+            result_path = os.path.join(site_dir, "benchmark_result.json")
+            command = [sys.executable, os.path.abspath(__file__), "--worker", site_dir, result_path]
+            if profile_memory:
+                command.append("--profile-memory")
+            with open(os.path.join(site_dir, "build.log"), "w") as log:
+                subprocess.run(command, stdout=log, stderr=subprocess.STDOUT, check=True)
+            with open(result_path) as f:
+                runs.append(json.load(f))
+        check_ms = measure_check_time(site_dir)
+    finally:
+        if not keep_sites:
+            shutil.rmtree(site_dir, ignore_errors=True)
+    best_run = min(runs, key=lambda r: r["total_ms"])
+    scenario = {
+        "name": scenario_name(params),
+        "params": params,
+        "stages": best_run["stages"],
+        "total_ms": best_run["total_ms"],
+        "peak_rss_kb": max(r["peak_rss_kb"] or 0 for r in runs) or None,
+        "all_total_ms": [r["total_ms"] for r in runs],
+        "check_ms": check_ms,
+    }
+    if profile_memory:
+        scenario["stage_memory"] = best_run["stage_memory"]
+    return scenario
+
+
+def format_change(old: Optional[float], new: Optional[float]) -> str:
+    if not old or new is None:
+        return ""
+    return "{:+.1f}%".format((new - old) / old * 100)
+
+
+def print_scenario(scenario: Dict[str, Any], previous: Optional[Dict[str, Any]] = None):
+    previous_stages = dict(previous["stages"]) if previous else {}
+    stage_memory = {name: (current, peak) for name, current, peak in scenario.get("stage_memory", [])}
+    print("")
+    print(scenario["name"])
+    for name, ms in scenario["stages"] + [["Total time", scenario["total_ms"]]]:
+        old_ms = previous["total_ms"] if previous and name == "Total time" else previous_stages.get(name)
+        line = "    {}: {:.2f} ms".format(name, ms)
+        if old_ms is not None:
+            line += " (was {:.2f} ms, {})".format(old_ms, format_change(old_ms, ms))
+        if name in stage_memory:
+            current, peak = stage_memory[name]
+            line += " [peak: {:.2f} MB, retained: {:.2f} MB]".format(peak / 1024 / 1024, current / 1024 / 1024)
+        print(line)
+    if scenario["peak_rss_kb"] is not None:
+        line = "    Peak RSS: {:.1f} MB".format(scenario["peak_rss_kb"] / 1024)
+        if previous and previous.get("peak_rss_kb"):
+            line += " (was {:.1f} MB, {})".format(
+                previous["peak_rss_kb"] / 1024, format_change(previous["peak_rss_kb"], scenario["peak_rss_kb"])
+            )
+        print(line)
+    if scenario.get("check_ms") is not None:
+        line = "    No-change --check run: {:.2f} ms".format(scenario["check_ms"])
+        if previous and previous.get("check_ms"):
+            line += " (was {:.2f} ms, {})".format(
+                previous["check_ms"], format_change(previous["check_ms"], scenario["check_ms"])
+            )
+        print(line)
+
+
+def print_import_time(import_time: Dict[str, Any], previous: Optional[Dict[str, Any]] = None):
+    line = "Import time for {}: {:.2f} ms".format(import_time["module"], import_time["total_ms"])
+    if previous and previous.get("total_ms"):
+        line += " (was {:.2f} ms, {})".format(
+            previous["total_ms"], format_change(previous["total_ms"], import_time["total_ms"])
+        )
+    print(line)
+    for name, ms in import_time["heaviest_imports"]:
+        print("    {}: {:.2f} ms".format(name, ms))
+
+
+def print_read_info(read_info: Dict[str, Any]):
+    print("Reading {} info.ini files: {:.2f} ms with RawConfigParser, {:.2f} ms with the fast parser ({:.1f}x)".format(
+        read_info["files"], read_info["config_parser_ms"], read_info["fast_parser_ms"], read_info["speedup"]
+    ))
+
+
+def get_scenarios(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    keys = ["pages", "images_per_page", "image_size", "transcript_languages", "tags_per_page", "tag_pool",
+            "storylines", "extra_comics", "extra_comic_pages"]
+    return [dict(zip(keys, values)) for values in itertools.product(*(getattr(args, k) for k in keys))]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark comic_git builds against synthetic comics")
+    parser.add_argument("--pages", type=int, nargs="+", default=[1000],
+                        help="Number of pages in the main comic, e.g. 1000 10000 50000")
+    parser.add_argument("--images-per-page", type=int, nargs="+", default=[1])
+    parser.add_argument("--image-size", nargs="+", default=["800x1200"], help="Image size as WIDTHxHEIGHT")
+    parser.add_argument("--transcript-languages", type=int, nargs="+", default=[0])
+    parser.add_argument("--tags-per-page", type=int, nargs="+", default=[3])
+    parser.add_argument("--tag-pool", type=int, nargs="+", default=[200],
+                        help="Number of distinct tags that pages draw their tags from")
+    parser.add_argument("--storylines", type=int, nargs="+", default=[10])
+    parser.add_argument("--extra-comics", type=int, nargs="+", default=[0])
+    parser.add_argument("--extra-comic-pages", type=int, nargs="+", default=[100])
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="Build each comic this many times and keep the fastest result")
+    parser.add_argument("-o", "--output", default="benchmark_results.json", help="Path to write the results file")
+    parser.add_argument("-c", "--compare", help="Path to a previous results file to compare against")
+    parser.add_argument("--work-dir", default=None, help="Directory to generate the comics in. Defaults to the "
+                                                         "system temp directory.")
+    parser.add_argument("--keep-sites", action="store_true", help="Don't delete the generated comics afterwards")
+    parser.add_argument("--read-info-files", type=int, default=10000,
+                        help="Number of info.ini files to time read_info() against. Set to 0 to skip.")
+    parser.add_argument("--profile-memory", action="store_true",
+                        help="Run builds with --profile-memory and record per-stage memory usage. Note that tracing "
+                             "memory allocations makes builds much slower, so don't compare these times with "
+                             "normal runs.")
+    parser.add_argument("--worker", nargs=2, metavar=("SITE_DIR", "RESULT_PATH"), help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.worker:
+        run_worker(*args.worker, args.profile_memory)
+        return
+
+    previous = {}
+    previous_import_time = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous_results = json.load(f)
+        previous = {s["name"]: s for s in previous_results["scenarios"]}
+        previous_import_time = previous_results.get("import_time")
+
+    sys.path.insert(0, SCRIPT_DIR)
+    from build_site import VERSION
+
+    results = {
+        "engine_version": VERSION,
+        "python_version": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "import_time": measure_import_time(),
+        "scenarios": [],
+    }
+    print_import_time(results["import_time"], previous_import_time)
+    if args.read_info_files:
+        results["read_info"] = measure_read_info(args.work_dir, args.read_info_files)
+        print_read_info(results["read_info"])
+    for params in get_scenarios(args):
+        scenario = run_scenario(args.work_dir, params, args.repeat, args.keep_sites, args.profile_memory)
+        results["scenarios"].append(scenario)
+        print_scenario(scenario, previous.get(scenario["name"]))
+        # Write results after every scenario, so a long benchmark that's cancelled partway through isn't wasted
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Copies the engine's and the theme's CSS and JS files to file names with a hash of their contents in them, e.g.
+assets/comic_git_engine/css/base.0123456789.css, so they can be cached by browsers and CDNs forever. A file's name only
+changes when its contents do, so nobody is ever served an old stylesheet or script after an update.
+
+Templates link to the hashed copies with the asset_url() function, which takes the path to the original file:
+
+    <link rel="stylesheet" href="{{ base_dir }}/{{ asset_url('comic_git_engine/css/base.css') }}">
+
+Paths that aren't CSS or JS files in the engine or theme folders are returned as they are, so asset_url() is always safe
+to use. Relative url()s and @imports in CSS files and relative imports in JS files are rewritten, so they still point at
+the right files (or their hashed copies) from the assets folder.
+"""
+
+import hashlib
+import os
+import posixpath
+import re
+from configparser import RawConfigParser
+from typing import Dict, List, Optional
+
+import utils
+from build_log import logger
+
+ASSETS_FOLDER = "assets"
+ASSET_EXTENSIONS = {".css", ".js"}
+HASH_LENGTH = 10
+
+# url(...) and @import "..." in CSS files
+CSS_URL_PATTERN = re.compile(r"""(url\(\s*)(["']?)([^"')\s]+)(\2\s*\))|(@import\s+)(["'])([^"']+)(\6)""")
+# import ... from "./...", import "./...", and import("./...") in JS files
+JS_IMPORT_PATTERN = re.compile(r"""((?:\bfrom|\bimport)\s*\(?\s*)(["'])(\.\.?/[^"']+)(\2)""")
+
+
+def get_asset_folders(comic_info: RawConfigParser) -> List[str]:
+    theme = comic_info.get("Comic Settings", "Theme", fallback="default")
+    folders = ["comic_git_engine/css", "comic_git_engine/js"]
+    if theme:
+        folders += [f"your_content/themes/{theme}/css", f"your_content/themes/{theme}/js"]
+    return folders
+
+
+def find_assets(folders: List[str]) -> List[str]:
+    """
+    :return: The paths, with forward slashes, of every CSS and JS file in the given folders and their sub-folders
+    """
+    assets = []
+    for folder in folders:
+        for root, dirs, files in os.walk(folder):
+            dirs.sort()
+            for file_name in sorted(files):
+                if os.path.splitext(file_name)[1].lower() in ASSET_EXTENSIONS:
+                    assets.append(posixpath.join(root.replace(os.sep, "/"), file_name))
+    return assets
+
+
+def get_hashed_path(path: str, content: bytes) -> str:
+    name, ext = posixpath.splitext(path)
+    content_hash = hashlib.sha256(content).hexdigest()[:HASH_LENGTH]
+    return posixpath.join(ASSETS_FOLDER, f"{name}.{content_hash}{ext}")
+
+
+def is_relative_url(url: str) -> bool:
+    return not (url.startswith(("/", "#", "data:")) or re.match(r"^[a-zA-Z][a-zA-Z0-9+.-]*:", url))
+
+
+class AssetBuilder:
+    def __init__(self, assets: List[str]):
+        self.assets = set(assets)
+        # Original path -> hashed path, for every asset that's been built so far
+        self.hashed_paths: Dict[str, str] = {}
+        self.building = set()
+
+    def rewrite_url(self, path: str, url: str) -> str:
+        """
+        :param path: The path of the original asset that the URL is in
+        :param url: The URL to rewrite
+        :return: The URL to use in the hashed copy of the asset, which is in a different folder to the original
+        """
+        if not is_relative_url(url):
+            return url
+        # Keep any query string or fragment, e.g. for font files
+        target, suffix = re.match(r"([^?#]*)(.*)", url).groups()
+        target_path = posixpath.normpath(posixpath.join(posixpath.dirname(path), target))
+        hashed_target = self.build(target_path) if target_path in self.assets else None
+        copy_folder = posixpath.dirname(posixpath.join(ASSETS_FOLDER, path))
+        new_target = posixpath.relpath(hashed_target or target_path, copy_folder)
+        if not new_target.startswith("."):
+            # JS imports have to start with ./ or ../ to be treated as relative
+            new_target = "./" + new_target
+        return new_target + suffix
+
+    def rewrite_css(self, path: str, text: str) -> str:
+        def replace(m: re.Match) -> str:
+            if m.group(1):
+                return m.group(1) + m.group(2) + self.rewrite_url(path, m.group(3)) + m.group(4)
+            return m.group(5) + m.group(6) + self.rewrite_url(path, m.group(7)) + m.group(8)
+        return CSS_URL_PATTERN.sub(replace, text)
+
+    def rewrite_js(self, path: str, text: str) -> str:
+        def replace(m: re.Match) -> str:
+            return m.group(1) + m.group(2) + self.rewrite_url(path, m.group(3)) + m.group(4)
+        return JS_IMPORT_PATTERN.sub(replace, text)
+
+    def build(self, path: str) -> Optional[str]:
+        """
+        Writes the hashed copy of the given asset, after the hashed copies of every asset it imports, since their
+        hashed file names are part of its contents.
+        :return: The path to the hashed copy, or None if the asset imports itself through a cycle of imports
+        """
+        if path in self.hashed_paths:
+            return self.hashed_paths[path]
+        if path in self.building:
+            # Import cycles are left pointing at the original file
+            return None
+        self.building.add(path)
+        with open(path, "rb") as f:
+            text = f.read().decode("utf-8")
+        if path.lower().endswith(".css"):
+            text = self.rewrite_css(path, text)
+        else:
+            text = self.rewrite_js(path, text)
+        content = text.encode("utf-8")
+        hashed_path = get_hashed_path(path, content)
+        if not os.path.isfile(utils.output_path(hashed_path)):
+            utils.write_output_file(hashed_path, content)
+        self.building.discard(path)
+        self.hashed_paths[path] = hashed_path
+        return hashed_path
+
+
+def build_assets(comic_info: RawConfigParser) -> Dict[str, str]:
+    """
+    Writes the hashed copies of every CSS and JS file in the engine and theme into the assets folder.
+    :return: A dict of the original paths of the assets to the paths of their hashed copies
+    """
+    assets = find_assets(get_asset_folders(comic_info))
+    builder = AssetBuilder(assets)
+    for path in assets:
+        builder.build(path)
+    logger.info(f"Wrote hashed copies of {len(builder.hashed_paths)} CSS and JS files")
+    return builder.hashed_paths
@@ -0,0 +1,215 @@
+"""
+Keeps track of state between builds, so later builds can tell what's changed since the last one.
+
+Everything is stored in the CACHE_DIRECTORY folder in the root of the comic repository. Deleting that folder is always
+safe; it just means the next build has to start from scratch. The folder has its own .gitignore, so it's never
+committed along with the built site.
+"""
+
+import hashlib
+import json
+import os
+from collections.abc import Mapping
+from datetime import datetime, timezone
+from typing import Dict, Any, Iterable, Optional
+
+CACHE_DIRECTORY = ".comic_git_cache"
+BUILD_STATE_PATH = os.path.join(CACHE_DIRECTORY, "build_state.json")
+
+# Folders that are read by the build, relative to the root of the comic repository
+INPUT_FOLDERS = ["your_content", "comic_git_engine"]
+# Files in the root of the comic repository that change the output of the build
+INPUT_FILES = ["CNAME"]
+IGNORED_FOLDER_NAMES = {".git", "__pycache__", CACHE_DIRECTORY}
+
+
+def iter_input_files(folders: Iterable[str] = INPUT_FOLDERS) -> Iterable[os.DirEntry]:
+    stack = [f for f in folders if os.path.isdir(f)]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=True):
+                    if entry.name not in IGNORED_FOLDER_NAMES:
+                        stack.append(entry.path)
+                else:
+                    yield entry
+
+
+def get_folders_fingerprint(folders: Iterable[str]) -> str:
+    """
+    Builds a hash out of the path, size, and modification time of every file in the given folders.
+    """
+    h = hashlib.sha1()
+    for path in sorted(f"{e.path}\0{e.stat().st_size}\0{e.stat().st_mtime_ns}" for e in iter_input_files(folders)):
+        h.update(path.encode("utf-8", "surrogateescape"))
+        h.update(b"\n")
+    return h.hexdigest()
+
+
+def _fingerprint_default(o: Any) -> Any:
+    if isinstance(o, datetime):
+        return o.isoformat()
+    if hasattr(o, "own_items"):
+        # A PageRecord, which would otherwise pull in the global values it's attached to, which contain it
+        return dict(o.own_items())
+    if isinstance(o, Mapping):
+        return dict(o)
+    if isinstance(o, (set, frozenset)):
+        return sorted(o, key=repr)
+    # Anything else can't be compared between builds, so its repr (which usually includes its memory address) makes
+    # the fingerprint change every time, which is always safe
+    return repr(o)
+
+
+def get_values_fingerprint(values: Any) -> str:
+    """
+    Builds a hash out of any JSON-like values, like template variables. Values that can't be represented as JSON are
+    hashed by their repr(), so anything unusual is treated as having changed.
+    """
+    try:
+        dumped = json.dumps(values, sort_keys=True, default=_fingerprint_default, ensure_ascii=False)
+    except TypeError:
+        # Dicts with a mix of key types can't be sorted
+        dumped = json.dumps(values, default=_fingerprint_default, ensure_ascii=False)
+    return hashlib.sha1(dumped.encode("utf-8", "surrogateescape")).hexdigest()
+
+
+def get_input_fingerprint(build_args: Dict[str, Any]) -> str:
+    """
+    Builds a hash out of the path, size, and modification time of every file the build reads, plus the arguments the
+    build was run with. File contents aren't read, so this stays fast even for comics with thousands of pages.
+    :param build_args: Any values that change the output of the build, like command line arguments.
+    :return: A hex digest that changes whenever any of the inputs change.
+    """
+    h = hashlib.sha1(json.dumps(build_args, sort_keys=True).encode("utf-8"))
+    h.update(os.environ.get("GITHUB_REPOSITORY", "").encode("utf-8"))
+    paths = []
+    for entry in iter_input_files():
+        stat = entry.stat()
+        paths.append(f"{entry.path}\0{stat.st_size}\0{stat.st_mtime_ns}")
+    for path in INPUT_FILES:
+        if os.path.isfile(path):
+            stat = os.stat(path)
+            paths.append(f"{path}\0{stat.st_size}\0{stat.st_mtime_ns}")
+    # Sort so the order that scandir returns files in doesn't matter
+    for path in sorted(paths):
+        h.update(path.encode("utf-8", "surrogateescape"))
+        h.update(b"\n")
+    return h.hexdigest()
+
+
+def get_comic_cache_path(name: str, comic_folder: str, ext: str) -> str:
+    """
+    :return: The path to a cache file for the given comic, e.g. "search_terms.json" for the main comic, or
+    "search_terms_extra_comic.json" for an extra comic. Each comic gets its own cache files, so extra comics can be
+    built in parallel processes without writing over each other.
+    """
+    folder_name = comic_folder.strip("/").replace("/", "_")
+    return os.path.join(CACHE_DIRECTORY, f"{name}_{folder_name}{ext}" if folder_name else f"{name}{ext}")
+
+
+def make_ignored_folder(folder: str):
+    """
+    Creates folder, if it doesn't exist yet, with a .gitignore file that makes git ignore everything in it.
+    """
+    os.makedirs(folder, exist_ok=True)
+    gitignore_path = os.path.join(folder, ".gitignore")
+    if not os.path.isfile(gitignore_path):
+        with open(gitignore_path, "w") as f:
+            f.write("*\n")
+
+
+def make_cache_folder(folder: str = CACHE_DIRECTORY):
+    """
+    Creates folder inside the cache folder, and the cache folder itself, which git is told to ignore.
+    """
+    make_ignored_folder(CACHE_DIRECTORY)
+    os.makedirs(folder, exist_ok=True)
+
+
+def load_json_file(path: str) -> Dict[str, Any]:
+    if not os.path.isfile(path):
+        return {}
+    try:
+        with open(path, "rb") as f:
+            return json.loads(f.read().decode("utf-8"))
+    except ValueError:
+        # A corrupted cache file just means we have to start from scratch
+        return {}
+
+
+def save_json_file(path: str, data: Dict[str, Any], indent: Optional[int] = 2):
+    make_cache_folder(os.path.dirname(path))
+    # Write to a temporary file first, so a build that's interrupted never leaves a half-written file behind
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(json.dumps(data, indent=indent).encode("utf-8"))
+    os.replace(temp_path, path)
+
+
+def load_build_state() -> Dict[str, Any]:
+    return load_json_file(BUILD_STATE_PATH)
+
+
+def save_build_state(state: Dict[str, Any]):
+    save_json_file(BUILD_STATE_PATH, state)
+
+
+def update_build_state(**values):
+    state = load_build_state()
+    state.update(values)
+    save_build_state(state)
+
+
+def is_build_up_to_date(version: str, build_args: Dict[str, Any], state: Optional[Dict[str, Any]] = None,
+                        use_git: bool = False) -> bool:
+    """
+    Checks whether the last successful build used the same engine version, the same build arguments, and the same
+    input files as a build run right now would.
+    :param use_git: Ask git whether any input files have changed since the commit the last build was built from,
+    instead of checking their modification times
+    """
+    if state is None:
+        state = load_build_state()
+    if not state or state.get("version") != version:
+        return False
+    # The output might have been deleted since, e.g. by delete_autogenerated_files.py
+    if not os.path.isfile("comic/page_info_list.json"):
+        return False
+    if use_git:
+        from git_changes import get_changed_paths
+
+        changed_paths = get_changed_paths(state)
+        if changed_paths is not None:
+            return state.get("build_args") == build_args and not changed_paths
+    return state.get("input_fingerprint") == get_input_fingerprint(build_args)
+
+
+def get_source_commit() -> Optional[str]:
+    """
+    GitHub Actions checks out a fresh copy of the comic for every run, so file modification times are always new there.
+    The commit being built identifies the content instead.
+    """
+    return os.environ.get("GITHUB_SHA") or None
+
+
+def is_build_due(version: str, build_args: Dict[str, Any], now: Optional[datetime] = None,
+                 state: Optional[Dict[str, Any]] = None, use_git: bool = False) -> bool:
+    """
+    Checks whether a build right now would publish anything that the last successful build didn't, either because a
+    scheduled page's post date has passed since then, or because the inputs have changed.
+    """
+    if state is None:
+        state = load_build_state()
+    if not state or state.get("version") != version or state.get("build_args") != build_args:
+        return True
+    next_post_date = state.get("next_post_date")
+    if next_post_date:
+        if now is None:
+            now = datetime.now(timezone.utc)
+        if datetime.fromisoformat(next_post_date) <= now:
+            return True
+    source_commit = get_source_commit()
+    if source_commit is not None and state.get("source_commit") == source_commit:
+        return False
+    return not is_build_up_to_date(version, build_args, state, use_git)
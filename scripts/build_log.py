@@ -0,0 +1,142 @@
+"""
+Logging for the build. Everything the build reports goes through `logger`, so how much of it is shown can be picked
+with build_site.py's --quiet and --verbose options:
+
+- Debug messages are for every single page and file, and are only shown with --verbose.
+- Info messages are one or two lines per build stage, and are shown by default.
+- Warnings and errors are always shown, and are written to stderr instead of stdout.
+
+Stages that work through every page show a single progress counter instead of a line per page. The counter updates in
+place when the build is run in a terminal, and is only printed once the stage is done otherwise, so CI logs stay short.
+
+With --log-file, every message, including debug messages, is also written to a file as one JSON object per line, along
+with the structured data some messages carry, like the name and duration of each build stage.
+"""
+
+import json
+import logging
+import sys
+from datetime import datetime, timezone
+from time import perf_counter_ns
+from typing import Optional
+
+logger = logging.getLogger("comic_git")
+
+# Console updates for progress counters are limited to this often
+PROGRESS_UPDATE_INTERVAL_NS = 100_000_000
+
+
+class ConsoleHandler(logging.Handler):
+    """
+    Writes to whatever sys.stdout and sys.stderr are when each message is logged, rather than when the handler was
+    made, so the output of extra comics can still be captured with redirect_stdout() and redirect_stderr().
+    """
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            stream = sys.stderr if record.levelno >= logging.WARNING else sys.stdout
+            stream.write(self.format(record) + "\n")
+        except Exception:
+            self.handleError(record)
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname.lower(),
+            "message": record.getMessage(),
+        }
+        data.update(getattr(record, "data", {}))
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str, ensure_ascii=False)
+
+
+def setup_logging(level: int = logging.INFO, json_log_path: Optional[str] = None):
+    """
+    :param level: The lowest level of message to show on the console
+    :param json_log_path: If set, every message is also written to this file as JSON
+    """
+    for handler in logger.handlers[:]:
+        logger.removeHandler(handler)
+        handler.close()
+    logger.setLevel(logging.DEBUG if json_log_path else level)
+    logger.propagate = False
+    console_handler = ConsoleHandler(level)
+    console_handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(console_handler)
+    if json_log_path:
+        file_handler = logging.FileHandler(json_log_path, mode="w", encoding="utf-8")
+        file_handler.setFormatter(JsonFormatter())
+        file_handler.addFilter(lambda record: not getattr(record, "console_only", False))
+        logger.addHandler(file_handler)
+
+
+def is_logging_set_up() -> bool:
+    return bool(logger.handlers)
+
+
+def get_console_level() -> int:
+    for handler in logger.handlers:
+        if isinstance(handler, ConsoleHandler):
+            return handler.level
+    return logging.INFO
+
+
+def log_data(level: int, message: str, **data):
+    """
+    Logs a message with extra data, which is only shown in the JSON log file
+    """
+    logger.log(level, message, extra={"data": data})
+
+
+def log_console_only(message: str):
+    """
+    Logs an info message that's only shown on the console, e.g. a block of output from an extra comic whose messages
+    have already been written to the JSON log file one by one
+    """
+    logger.info(message, extra={"console_only": True})
+
+
+class Progress:
+    """
+    A single progress counter for a build stage that works through a known number of items, e.g.:
+
+        with Progress("Writing comic pages", len(comic_data_dicts)) as progress:
+            for comic_data in comic_data_dicts:
+                ...
+                progress.update()
+    """
+
+    def __init__(self, stage: str, total: int):
+        self.stage = stage
+        self.total = total
+        self.count = 0
+        self.start = perf_counter_ns()
+        self.last_update = 0
+        console_level = get_console_level()
+        # Only update in place on a real terminal, and not if the counter is hidden or mixed in with debug messages
+        self.live = console_level == logging.INFO and sys.stdout.isatty()
+
+    def update(self, count: int = 1):
+        self.count += count
+        if self.live:
+            now = perf_counter_ns()
+            if now - self.last_update >= PROGRESS_UPDATE_INTERVAL_NS:
+                self.last_update = now
+                sys.stdout.write(f"\r{self.stage}: {self.count}/{self.total}")
+                sys.stdout.flush()
+
+    def finish(self):
+        if self.live:
+            # Clear the counter, so the final message below replaces it
+            sys.stdout.write("\r\033[K")
+        log_data(logging.INFO, f"{self.stage}: {self.count}/{self.total}", event="progress", stage=self.stage,
+                 count=self.count, total=self.total, ms=(perf_counter_ns() - self.start) / 1_000_000)
+
+    def __enter__(self) -> "Progress":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.finish()
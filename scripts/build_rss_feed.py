@@ -1,17 +1,44 @@
+import tempfile
 from configparser import RawConfigParser
 from re import sub
-from time import strptime, strftime
-from typing import List, Dict
+from string import Formatter
+from typing import List, Dict, Optional
 from urllib.parse import urljoin
 from xml.dom import minidom
 from xml.etree import ElementTree
 from xml.etree.ElementTree import register_namespace
 
-from utils import get_comic_url
+from utils import get_comic_url, parse_post_date, write_output_file, open_output_file
 
 cdata_dict = {}
 
 
+class SpooledPosts:
+    """
+    Holds the post HTML of every page in a temporary file instead of in memory, for streaming builds, which only keep
+    one page's post in memory at a time. The feed looks each post up again as it's written.
+    """
+
+    def __init__(self):
+        self.file = tempfile.TemporaryFile()
+        # Page name -> (offset, length) of its post in the file
+        self.positions = {}
+
+    def add(self, page_name: str, post_html: str):
+        data = post_html.encode("utf-8")
+        self.file.seek(0, 2)
+        self.positions[page_name] = (self.file.tell(), len(data))
+        self.file.write(data)
+
+    def __getitem__(self, page_name: str) -> str:
+        offset, length = self.positions[page_name]
+        self.file.seek(offset)
+        return self.file.read(length).decode("utf-8")
+
+    def close(self):
+        self.file.close()
+
+
 def add_base_tags_to_channel(channel, comic_url, comic_info):
     atom_link = ElementTree.SubElement(channel, "{http://www.w3.org/2005/Atom}link")
     atom_link.set("href", urljoin(comic_url, "feed.xml"))
@@ -36,14 +63,21 @@ def add_image_tag(channel, comic_url, comic_info):
     ElementTree.SubElement(image_tag, "height").text = comic_info.get("RSS Feed", "Image height")
 
 
-def add_item(xml_parent, comic_data, comic_url, comic_info):
+def add_item(xml_parent, comic_data, comic_url, comic_info, spooled_posts: Optional[SpooledPosts] = None):
     global cdata_dict
     item = ElementTree.SubElement(xml_parent, "item")
     ElementTree.SubElement(item, "title").text = comic_data["_title"]
     ElementTree.SubElement(item, "{http://purl.org/dc/elements/1.1/}creator").text = \
         comic_info.get("Comic Info", "Author")
-    post_date = strptime(comic_data["_post_date"], comic_info.get("Comic Settings", "Date format"))
-    ElementTree.SubElement(item, "pubDate").text = strftime("%a, %d %b %Y %H:%M:%S +0000", post_date)
+    if "_post_datetime" in comic_data:
+        post_date = comic_data["_post_datetime"]
+    else:
+        post_date = parse_post_date(comic_data["_post_date"], comic_info.get("Comic Settings", "Date format"))
+    if post_date.tzinfo is None:
+        pub_date = post_date.strftime("%a, %d %b %Y %H:%M:%S +0000")
+    else:
+        pub_date = post_date.strftime("%a, %d %b %Y %H:%M:%S %z")
+    ElementTree.SubElement(item, "pubDate").text = pub_date
     direct_link = urljoin(comic_url, "comic/{}/".format(comic_data["page_name"]))
     ElementTree.SubElement(item, "link").text = direct_link
     guid = direct_link.lower().replace(" ", "_").replace("&", "_")
@@ -62,12 +96,34 @@ def add_item(xml_parent, comic_data, comic_url, comic_info):
             e = ElementTree.SubElement(item, "category")
             e.attrib["type"] = "tag"
             e.text = tag
-    html = build_rss_post(comic_url, comic_data["comic_paths"], comic_data.get("escaped_alt_text"), comic_data["post_html"])
     post_id = comic_data["page_name"].lower().replace(" ", "_").replace("&", "_")
-    cdata_dict["post_id_" + post_id] = "<![CDATA[{}]]>".format(html)
+    if spooled_posts is None:
+        html = build_rss_post(comic_url, comic_data["comic_paths"], comic_data.get("escaped_alt_text"),
+                              comic_data["post_html"])
+        cdata_dict["post_id_" + post_id] = "<![CDATA[{}]]>".format(html)
+    else:
+        # Built when the feed is written, so only one post is in memory at a time
+        cdata_dict["post_id_" + post_id] = SpooledPost(
+            comic_url, comic_data["comic_paths"], comic_data.get("escaped_alt_text"), spooled_posts,
+            comic_data["page_name"]
+        )
     ElementTree.SubElement(item, "description").text = "{post_id_" + post_id + "}"
 
 
+class SpooledPost:
+    def __init__(self, comic_url: str, comic_paths: list[str], alt_text: str, spooled_posts: SpooledPosts,
+                 page_name: str):
+        self.comic_url = comic_url
+        self.comic_paths = comic_paths
+        self.alt_text = alt_text
+        self.spooled_posts = spooled_posts
+        self.page_name = page_name
+
+    def __str__(self):
+        html = build_rss_post(self.comic_url, self.comic_paths, self.alt_text, self.spooled_posts[self.page_name])
+        return "<![CDATA[{}]]>".format(html)
+
+
 def build_rss_post(comic_url: str, comic_paths: list[str], alt_text: str, post_html: str):
     comic_images = []
     for comic_path in comic_paths:
@@ -89,7 +145,12 @@ def pretty_xml(element):
     return pretty_string
 
 
-def build_rss_feed(comic_info: RawConfigParser, comic_data_dicts: List[Dict]):
+def build_rss_feed(comic_info: RawConfigParser, comic_data_dicts: List[Dict],
+                   spooled_posts: Optional[SpooledPosts] = None):
+    """
+    :param spooled_posts: If given, each page's post HTML is read from here instead of its comic data dict, and the
+    feed is written out one post at a time.
+    """
     global cdata_dict
 
     if not comic_info.getboolean("RSS Feed", "Build RSS feed"):
@@ -114,12 +175,27 @@ def build_rss_feed(comic_info: RawConfigParser, comic_data_dicts: List[Dict]):
         comic_data_dicts.reverse()
 
     for comic_data in comic_data_dicts:
-        add_item(channel, comic_data, comic_url, comic_info)
+        add_item(channel, comic_data, comic_url, comic_info, spooled_posts)
 
     pretty_string = pretty_xml(root)
 
+    if spooled_posts is not None:
+        write_feed_in_parts(pretty_string)
+        return
+
     # Replace CDATA manually, because XML is stupid and I can't figure out how to insert raw text
     pretty_string = pretty_string.format(**cdata_dict)
 
-    with open("feed.xml", 'wb') as f:
-        f.write(bytes(pretty_string, "utf-8"))
+    write_output_file("feed.xml", bytes(pretty_string, "utf-8"))
+
+
+def write_feed_in_parts(pretty_string: str):
+    """
+    Replaces the CDATA placeholders in the feed the same way as str.format(), but writes each part to the feed file as
+    it goes, instead of building the whole feed in memory.
+    """
+    with open_output_file("feed.xml") as f:
+        for literal_text, field_name, _, _ in Formatter().parse(pretty_string):
+            f.write(literal_text.encode("utf-8"))
+            if field_name is not None:
+                f.write(str(cdata_dict[field_name]).encode("utf-8"))
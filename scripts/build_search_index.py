@@ -0,0 +1,138 @@
+"""
+Builds a static search index for the comic, so the search page can find pages without downloading page_info_list.json.
+
+The index is an inverted index from each search term to the pages that contain it, split into shards by the first
+letters of each term. The search page only downloads index.json, which lists the pages and the shards, and then the
+shards for the terms being searched for. The terms for each page are cached between builds, and are only worked out
+again for pages whose text has changed.
+"""
+
+import json
+import os
+import re
+from collections import defaultdict
+from configparser import RawConfigParser
+from html import unescape
+from typing import Dict, List
+
+import build_cache
+import utils
+from build_log import logger
+
+# Bump this whenever the format of the index or the way terms are found changes
+SEARCH_INDEX_VERSION = 1
+# The number of letters at the start of a term that decide which shard it goes in
+PREFIX_LENGTH = 2
+# The fields that are searched. Each page's entry for a term is a bit mask of the fields that contain that term, with
+# the first field as the lowest bit.
+FIELDS = ["title", "tags", "characters", "storyline", "transcripts"]
+
+TERM_PATTERN = re.compile(r"\w+")
+HTML_TAG_PATTERN = re.compile(r"<[^>]*>")
+SAFE_SHARD_NAME_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def get_terms(text: str) -> List[str]:
+    return TERM_PATTERN.findall(text.lower())
+
+
+def get_shard_name(term: str) -> str:
+    """
+    :return: The name of the shard file that the given term is stored in. Prefixes that aren't plain letters and
+    numbers are hex-encoded, so shard names are always safe to use as file names and in URLs.
+    """
+    prefix = term[:PREFIX_LENGTH]
+    if SAFE_SHARD_NAME_PATTERN.fullmatch(prefix):
+        return prefix
+    return "_" + prefix.encode("utf-8").hex()
+
+
+def get_page_texts(comic_data: Dict) -> List[str]:
+    """
+    :return: The text of each of the searchable FIELDS for the given comic page
+    """
+    transcripts = " ".join(comic_data.get("transcripts", {}).values())
+    return [
+        comic_data.get("_title", ""),
+        " ".join(comic_data.get("_tags", [])),
+        " ".join(comic_data.get("_characters", [])),
+        comic_data.get("_storyline") or "",
+        # Transcripts have already been converted to HTML, so strip the tags back out
+        unescape(HTML_TAG_PATTERN.sub(" ", transcripts)),
+    ]
+
+
+def get_page_terms(texts: List[str]) -> Dict[str, int]:
+    """
+    :return: A dict of each term in the given texts to the bit mask of the fields it was found in
+    """
+    terms = defaultdict(int)
+    for i, text in enumerate(texts):
+        for term in get_terms(text):
+            terms[term] |= 1 << i
+    return terms
+
+
+def is_search_index_enabled(comic_info: RawConfigParser) -> bool:
+    return comic_info.getboolean("Search", "Build search index", fallback=False)
+
+
+class SearchIndexBuilder:
+    """
+    Builds the search index one page at a time, so streaming builds can add each page while its transcripts are loaded.
+    Pages must be added in order.
+    """
+
+    def __init__(self, comic_folder: str):
+        self.comic_folder = comic_folder
+        self.cache_path = build_cache.get_comic_cache_path("search_terms", comic_folder, ".json")
+        cache = build_cache.load_json_file(self.cache_path)
+        self.cached_pages = cache.get("pages", {}) if cache.get("version") == SEARCH_INDEX_VERSION else {}
+        self.new_cached_pages = {}
+        self.shards = defaultdict(dict)
+        self.pages = []
+
+    def add_page(self, comic_data: Dict):
+        page_id = len(self.pages)
+        page_name = comic_data["page_name"]
+        texts = get_page_texts(comic_data)
+        fingerprint = build_cache.get_values_fingerprint(texts)
+        cached_page = self.cached_pages.get(page_name)
+        if cached_page is not None and cached_page[0] == fingerprint:
+            terms = cached_page[1]
+        else:
+            terms = get_page_terms(texts)
+        self.new_cached_pages[page_name] = [fingerprint, terms]
+        for term, fields in terms.items():
+            self.shards[get_shard_name(term)].setdefault(term, []).append([page_id, fields])
+        self.pages.append([page_name, comic_data.get("_title", ""), comic_data.get("_post_date", "")])
+
+    def write(self):
+        search_dir = f"{self.comic_folder}comic/search"
+        index = {
+            "version": SEARCH_INDEX_VERSION,
+            "prefix_length": PREFIX_LENGTH,
+            "fields": FIELDS,
+            "shards": sorted(self.shards.keys()),
+            "pages": self.pages,
+        }
+        write_json(os.path.join(search_dir, "index.json"), index)
+        for shard_name, shard in self.shards.items():
+            write_json(os.path.join(search_dir, f"{shard_name}.json"), shard)
+        logger.info(f"Wrote search index for {len(self.pages)} pages in {len(self.shards)} shards")
+
+        build_cache.save_json_file(self.cache_path, {"version": SEARCH_INDEX_VERSION, "pages": self.new_cached_pages},
+                                   indent=None)
+
+
+def build_search_index(comic_folder: str, comic_info: RawConfigParser, comic_data_dicts: List[Dict]):
+    if not is_search_index_enabled(comic_info):
+        return
+    builder = SearchIndexBuilder(comic_folder)
+    for comic_data in comic_data_dicts:
+        builder.add_page(comic_data)
+    builder.write()
+
+
+def write_json(path: str, data) -> None:
+    utils.write_output_file(path, json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
@@ -1,33 +1,87 @@
 import argparse
 import html
+import io
+import logging
 import os
 import re
 import shutil
 import sys
-import traceback
+import tracemalloc
 from collections import OrderedDict, defaultdict
 from configparser import RawConfigParser
+from contextlib import redirect_stdout, redirect_stderr
 from copy import deepcopy
 from datetime import datetime
+from functools import lru_cache
 from glob import glob
 from importlib import import_module
 from json import dumps
-from time import strptime, strftime, perf_counter_ns
-from typing import Dict, List, Tuple, Any, Optional
-
-from PIL import Image
-from markdown2 import Markdown
-from pytz import timezone
-
+from time import perf_counter_ns
+from types import ModuleType
+from typing import Dict, List, Tuple, Any, Optional, Callable, Iterator, TYPE_CHECKING
+
+import build_assets
+import build_cache
+import build_log
+import cache_archive
+import content_index
+import git_changes
+import minify_html
+import optimize_images
+import output_writer
+import staged_output
+import storyline_index
 import utils
-from build_rss_feed import build_rss_feed
+from build_log import logger, Progress
+from build_rss_feed import build_rss_feed, SpooledPosts
+from build_search_index import build_search_index, is_search_index_enabled, SearchIndexBuilder
+from page_record import PageRecord
 from utils import read_info
 
+if TYPE_CHECKING:
+    from markdown2 import Markdown
+
+# Pillow, markdown2, pytz, and Jinja2 are only imported by the stages that use them, so scripts that import this module
+# for its helper functions (and the --check fast path) don't have to pay for those imports.
+
 VERSION = "1.0.0"
 
 BASE_DIRECTORY = ""
-MARKDOWN = Markdown(extras=["strike", "break-on-newline", "markdown-in-html"])
+MARKDOWN: Optional["Markdown"] = None
 PROCESSING_TIMES: List[Tuple[str, float]] = []
+# Filled in by checkpoint() with (current, peak) traced memory in bytes, but only when memory profiling is enabled
+MEMORY_USAGE: List[Tuple[int, int]] = []
+TOP_ALLOCATIONS: List[tracemalloc.Statistic] = []
+# The number of worker processes to use for parallel parts of the build. None means one per CPU.
+JOBS: Optional[int] = None
+# What's changed since the last build according to git, when building with --git-changes
+GIT_CHANGES: Optional[git_changes.ChangeSet] = None
+# Rendering tag pages in worker processes only pays for itself when there are enough of them to split up
+TAGGED_PAGES_PER_WORKER = 100
+# Set in each tag page worker process by init_tagged_page_worker()
+TAGGED_PAGE_BASE_DATA_DICT: Dict[str, Any] = {}
+# Building comic data dicts in worker processes only pays for itself when there are enough pages to split up
+COMIC_DATA_PAGES_PER_WORKER = 500
+# Set in each comic data worker process by init_comic_data_worker()
+COMIC_DATA_WORKER_ARGS: Tuple = ()
+# The main comic's post HTML, kept for the RSS feed by a streaming build
+SPOOLED_POSTS: Optional[SpooledPosts] = None
+# The per-page hooks that can be called in worker processes while a comic's pages are built, if the theme's hooks.py
+# lists them in WORKER_SAFE_HOOKS. Every other hook, including the batch hooks that are given every page at once, is
+# called in the process that builds the comic.
+WORKER_HOOKS = frozenset({"extra_comic_dict_processing"})
+# Every hook that's called while a comic is built. Extra comics are built from start to finish in worker processes, so
+# they're only built in parallel if every one of these hooks that the theme has is listed in WORKER_SAFE_HOOKS.
+COMIC_BUILD_HOOKS = (
+    "extra_page_info_processing", "extra_page_info_batch_processing", "extra_comic_dict_processing",
+    "extra_comic_dict_batch_processing", "extra_get_storylines_processing", "extra_global_values", "build_other_pages",
+)
+# The tag page fingerprints of each comic built so far, by comic folder, which main() saves in the build state once the
+# new build is in place
+TAGGED_PAGE_FINGERPRINTS: Dict[str, Dict[str, str]] = {}
+# Global values that are built from every comic page. They're left out of the tag page fingerprints, since otherwise
+# every new comic page would mean re-rendering every tag page (see reuse_unchanged_tagged_pages()).
+PAGE_DERIVED_GLOBAL_VALUES = {"storylines", "scheduled_post_count", "next_post_date"}
 
 AUTOGENERATE_WARNING = """<!--
 !! DO NOT EDIT THIS FILE !!
@@ -37,36 +91,44 @@ https://comic-git.gitbook.io/documentation/advanced-editing/themes#editing-exist
 -->"""
 
 
+def get_markdown() -> "Markdown":
+    global MARKDOWN
+    if MARKDOWN is None:
+        from markdown2 import Markdown
+        MARKDOWN = Markdown(extras=["strike", "break-on-newline", "markdown-in-html"])
+    return MARKDOWN
+
+
 def web_path(rel_path: str):
     if rel_path.startswith("/"):
         return BASE_DIRECTORY + rel_path
     return rel_path
 
 
+def get_output_paths(comic_info: RawConfigParser) -> List[str]:
+    """
+    :return: Every file and folder in the root of the site that the build writes
+    """
+    output_paths = ["comic", build_assets.ASSETS_FOLDER, "feed.xml"]
+    for page in get_pages_list(comic_info):
+        if page["template_name"] in ("index", "404"):
+            output_paths.append(page["template_name"] + ".html")
+        else:
+            output_paths.append(page["template_name"])
+    output_paths.extend(get_extra_comics_list(comic_info))
+    return output_paths
+
+
 def delete_output_file_space(comic_info: RawConfigParser = None):
-    shutil.rmtree("comic", ignore_errors=True)
-    if os.path.isfile("feed.xml"):
-        os.remove("feed.xml")
     if comic_info is None:
         comic_info = read_info("your_content/comic_info.ini")
-    for page in get_pages_list(comic_info):
-        if page["template_name"] == "index":
-            if os.path.exists("index.html"):
-                os.remove("index.html")
-        elif page["template_name"] == "404":
-            if os.path.exists("404.html"):
-                os.remove("404.html")
-        else:
-            if os.path.exists(page["template_name"]):
-                shutil.rmtree(page["template_name"])
-    for comic in get_extra_comics_list(comic_info):
-        if os.path.exists(comic):
-            shutil.rmtree(comic)
+    for path in get_output_paths(comic_info):
+        staged_output.remove_path(path)
 
 
-def setup_output_file_space(comic_info: RawConfigParser):
-    # Clean workspace, i.e. delete old files
-    delete_output_file_space(comic_info)
+def setup_output_file_space():
+    # Build into an empty staging folder, and leave the live site alone until the build is done
+    utils.output_directory = staged_output.start_staging()
 
 
 def get_links_list(comic_info: RawConfigParser):
@@ -87,6 +149,55 @@ def get_extra_comics_list(comic_info: RawConfigParser) -> List[str]:
     return utils.str_to_list(comic_info.get("Comic Settings", "Extra comics", fallback=""))
 
 
+def get_hooks_module(theme: str) -> Optional[ModuleType]:
+    """
+    :param theme: Name of the theme to check in for the hooks.py file
+    :return: The theme's hooks.py module, or None if the theme doesn't have one
+    """
+    if os.path.exists(f"your_content/themes/{theme}/scripts/hooks.py"):
+        current_path = os.path.abspath(".")
+        if current_path not in sys.path:
+            sys.path.append(current_path)
+            logger.debug(f"Path updated: {sys.path}")
+        return import_module(f"your_content.themes.{theme}.scripts.hooks")
+    return None
+
+
+def get_hook(theme: str, func: str) -> Optional[Callable]:
+    """
+    :param theme: Name of the theme to check in for the hooks.py file
+    :param func: Function name to look for
+    :return: The given function from the theme's hooks.py file, or None if the file or the function doesn't exist
+    """
+    hooks = get_hooks_module(theme)
+    return getattr(hooks, func, None) if hooks is not None else None
+
+
+def is_hook_worker_safe(theme: str, func: str) -> bool:
+    """
+    Hooks can keep state between calls, like a count of the pages they've seen, which would be split up between worker
+    processes. So the per-page hooks in WORKER_HOOKS are only called in worker processes if the theme's hooks.py lists
+    them in its WORKER_SAFE_HOOKS, to say they only depend on their arguments.
+    :return: True if the given hook can be called in worker processes, or if the theme doesn't have it
+    """
+    hooks = get_hooks_module(theme)
+    if hooks is None or getattr(hooks, func, None) is None:
+        return True
+    return func in WORKER_HOOKS and func in getattr(hooks, "WORKER_SAFE_HOOKS", ())
+
+
+def get_worker_unsafe_hooks(theme: str) -> List[str]:
+    """
+    :return: The hooks in COMIC_BUILD_HOOKS that the theme has, but doesn't list in its WORKER_SAFE_HOOKS, which stop
+    comics with that theme from being built in worker processes
+    """
+    hooks = get_hooks_module(theme)
+    if hooks is None:
+        return []
+    safe_hooks = getattr(hooks, "WORKER_SAFE_HOOKS", ())
+    return [func for func in COMIC_BUILD_HOOKS if getattr(hooks, func, None) is not None and func not in safe_hooks]
+
+
 def run_hook(theme: str, func: str, args: List[Any]) -> Any:
     """
     Determines if the hooks.py file has been added to the given theme, and if that file contains the given function.
@@ -96,18 +207,25 @@ def run_hook(theme: str, func: str, args: List[Any]) -> Any:
     :param args: Args list to pass to the function
     :return: The return value of the function called, if one was found. Otherwise, None.
     """
-    if os.path.exists(f"your_content/themes/{theme}/scripts/hooks.py"):
-        current_path = os.path.abspath(".")
-        if current_path not in sys.path:
-            sys.path.append(current_path)
-            print(f"Path updated: {sys.path}")
-        hooks = import_module(f"your_content.themes.{theme}.scripts.hooks")
-        if hasattr(hooks, func):
-            method = getattr(hooks, func)
-            return method(*args)
+    method = get_hook(theme, func)
+    if method is not None:
+        return method(*args)
     return None
 
 
+def run_batch_hook(theme: str, func: str, comic_folder: str, comic_info: RawConfigParser, pages: List) -> List:
+    """
+    Calls a hook that's given the whole list of pages at once, so any setup it does only happens once per build. The
+    hook can either change the pages in place and return None, or return a new list of pages.
+    :return: The pages, after the hook has processed them
+    """
+    method = get_hook(theme, func)
+    if method is None:
+        return pages
+    result = method(comic_folder, comic_info, pages)
+    return pages if result is None else list(result)
+
+
 def build_and_publish_comic_pages(
         comic_url: str,
         comic_folder: str,
@@ -116,10 +234,10 @@ def build_and_publish_comic_pages(
         publish_all_comics: bool,
         extra_comics_dict: Optional[dict] = None,
 ) -> tuple[list[dict], dict]:
-    page_info_list, scheduled_post_count = get_page_info_list(
+    page_info_list, scheduled_post_count, next_post_date = get_page_info_list(
         comic_folder, comic_info, delete_scheduled_posts, publish_all_comics
     )
-    print([p["page_name"] for p in page_info_list])
+    logger.debug("Published pages: %s", [p["page_name"] for p in page_info_list])
     checkpoint(f"Get info for all pages in '{comic_folder}'")
 
     # Save page_info_list.json file for use by other pages
@@ -128,22 +246,30 @@ def build_and_publish_comic_pages(
 
     # Build full comic data dicts, to build templates with
     comic_data_dicts = build_comic_data_dicts(comic_folder, comic_info, page_info_list)
+    # Everything in page_info_list has been copied into comic_data_dicts, so let it be freed
+    del page_info_list
     checkpoint(f"Build full comic data dicts for '{comic_folder}'")
 
     # Create low-res and thumbnail versions of all the comic pages
-    process_comic_images(comic_info, comic_data_dicts)
+    process_comic_images(comic_folder, comic_info, comic_data_dicts)
     checkpoint(f"Process comic images in '{comic_folder}'")
 
+    # Build the search index for the search page. Streaming builds do this as they write each page instead, since
+    # that's when each page's transcripts are loaded.
+    if not is_streaming_build(comic_info):
+        build_search_index(comic_folder, comic_info, comic_data_dicts)
+        checkpoint(f"Build search index for '{comic_folder}'")
+
     # Load home page text
     base_path = f"your_content/{comic_folder}home page."
     for ext in ("txt", "html"):
         path = base_path + ext
         if os.path.isfile(path):
             with open(path, "rb") as f:
-                home_page_text = MARKDOWN.convert(f.read().decode("utf-8"))
+                home_page_text = get_markdown().convert(f.read().decode("utf-8"))
             break
     else:
-        print(f"Couldn't find any home page file at {base_path}*")
+        logger.info(f"Couldn't find any home page file at {base_path}*")
         home_page_text = ""
 
     # Write page info to comic HTML pages
@@ -173,6 +299,7 @@ def build_and_publish_comic_pages(
         "home_page_text": home_page_text,
         "google_analytics_id": comic_info.get("Google Analytics", "Tracking ID", fallback=""),
         "scheduled_post_count": scheduled_post_count,
+        "next_post_date": next_post_date,
         "extra_comics": extra_comics_dict if extra_comics_dict is not None else {},
         "use_images_in_navigation_bar": comic_info.getboolean("Navigation Bar", "Use images", fallback=False),
         "navigation_bar_above_comic": comic_info.getboolean("Navigation Bar", "Above comic", fallback=False),
@@ -194,43 +321,66 @@ def build_and_publish_comic_pages(
 
 
 def get_page_info_list(comic_folder: str, comic_info: RawConfigParser, delete_scheduled_posts: bool,
-                       publish_all_comics: bool) -> Tuple[List[Dict], int]:
+                       publish_all_comics: bool) -> Tuple[List[Dict], int, Optional[datetime]]:
+    """
+    :return: A 3-tuple of the info for every published page, sorted by post date, the number of scheduled pages, and
+    the post date of the next scheduled page, if there are any.
+    """
+    from pytz import timezone
+
     date_format = comic_info.get("Comic Settings", "Date format")
     tz_info = timezone(comic_info.get("Comic Settings", "Timezone"))
     local_time = datetime.now(tz=tz_info)
-    print(f"Local time is {local_time}")
+    logger.info(f"Local time is {local_time}")
     page_info_list = []
     scheduled_post_count = 0
+    next_post_date = None
     theme = comic_info.get("Comic Settings", "Theme", fallback="default")
-    for page_path in glob(f"your_content/{comic_folder}comics/*/"):
+    index = content_index.open_content_index(comic_folder, comic_info, VERSION)
+    image_dimensions_cache = ImageDimensionsCache(comic_folder)
+    transcripts_dir = comic_info.get("Transcripts", "Transcripts folder", fallback="")
+    page_paths = glob(f"your_content/{comic_folder}comics/*/")
+    progress = Progress("Reading page info", len(page_paths))
+    for page_path in page_paths:
+        progress.update()
         filepath = f"{page_path}info.ini"
         if not os.path.exists(f"{page_path}info.ini"):
-            print(f"{page_path} is missing its info.ini file. Skipping")
+            logger.warning(f"{page_path} is missing its info.ini file. Skipping")
             continue
-        page_info = read_info(filepath, to_dict=True)
-        post_date = tz_info.localize(datetime.strptime(page_info["Post date"], date_format))
+        page_name = os.path.basename(os.path.normpath(page_path))
+        # Git can tell when a page hasn't changed even though its modification times have, e.g. in a fresh checkout
+        unchanged = GIT_CHANGES is not None and GIT_CHANGES.is_page_unchanged(comic_folder, page_name)
+        indexed_page = None
+        if index is not None:
+            signature = content_index.get_page_signature(page_path, page_name, transcripts_dir)
+            indexed_page = index.get_page(page_name, signature, check_signature=not unchanged)
+        if indexed_page is not None:
+            page_info, image_file_names, transcript_languages = indexed_page
+        else:
+            page_info = read_info(filepath, to_dict=True)
+            image_file_names, transcript_languages = None, None
+        post_date = utils.parse_post_date(page_info["Post date"], date_format, tz_info)
         if post_date > local_time and not publish_all_comics:
             scheduled_post_count += 1
+            if next_post_date is None or post_date < next_post_date:
+                next_post_date = post_date
+            if index is not None:
+                index.remove_page(page_name)
             # Post date is in the future, so delete the folder with the resources
             if delete_scheduled_posts:
-                print(f"Deleting {page_path}")
+                logger.info(f"Deleting {page_path}")
                 shutil.rmtree(page_path)
         else:
-            filenames = page_info.get("Filenames") or page_info.get("Filename", "")
-            if filenames:
-                page_info["image_file_names"] = utils.str_to_list(filenames)
-            else:
-                # If Filenames weren't defined in the info.ini, then search through all images in the given comic
-                # folder and add any you find to the list of image files.
-                # Skip any image files whose names start with an underscore.
-                image_files = []
-                for filename in os.listdir(page_path):
-                    if filename.startswith("_"):
-                        continue
-                    if re.search(r"\.(jpg|jpeg|png|tif|tiff|gif|bmp|webp|webv|svg|eps)$", filename):
-                        image_files.append(filename)
-                page_info["image_file_names"] = sorted(image_files)
-            page_info["page_name"] = os.path.basename(os.path.normpath(page_path))
+            if indexed_page is None:
+                image_file_names = get_image_file_names(page_path, page_info)
+                transcript_languages = get_transcript_languages(comic_folder, comic_info, page_name)
+                if index is not None:
+                    index.update_page(page_name, signature, page_info, image_file_names, transcript_languages)
+            page_info["image_file_names"] = image_file_names
+            page_info["image_dimensions"] = [image_dimensions_cache.get(os.path.join(page_path, f), unchanged)
+                                             for f in image_file_names]
+            page_info["page_name"] = page_name
+            page_info["post_datetime"] = post_date
             page_info["Storyline"] = page_info.get("Storyline", "")
             page_info["Characters"] = utils.str_to_list(page_info.get("Characters", ""))
             page_info["Tags"] = utils.str_to_list(page_info.get("Tags", ""))
@@ -239,21 +389,49 @@ def get_page_info_list(comic_folder: str, comic_info: RawConfigParser, delete_sc
             for key in page_info.copy():
                 if key.startswith("!"):
                     del page_info[key]
-            # Get list of transcript languages for the given page
-            transcripts = get_transcripts(comic_folder, comic_info, page_info["page_name"])
-            page_info["transcript_languages"] = list(transcripts.keys())
+            page_info["transcript_languages"] = transcript_languages
             hook_result = run_hook(theme, "extra_page_info_processing",
                                    [comic_folder, comic_info, page_path, page_info])
             if hook_result:
                 page_info = hook_result
-            print(page_info)
+                page_info.setdefault("post_datetime", post_date)
+            logger.debug("%s", page_info)
             page_info_list.append(page_info)
+    progress.finish()
+    if index is not None:
+        index.save()
+        index.close()
+    image_dimensions_cache.save()
+
+    page_info_list = sorted(page_info_list, key=lambda x: (x["post_datetime"], x["page_name"]))
+    if get_hook(theme, "extra_page_info_batch_processing") is not None:
+        page_info_list = run_batch_hook(theme, "extra_page_info_batch_processing", comic_folder, comic_info,
+                                        page_info_list)
+        # The hook might have changed post dates
+        page_info_list.sort(key=lambda x: (x["post_datetime"], x["page_name"]))
+    return page_info_list, scheduled_post_count, next_post_date
+
+
+def get_image_file_names(page_path: str, page_info: Dict) -> List[str]:
+    filenames = page_info.get("Filenames") or page_info.get("Filename", "")
+    if filenames:
+        return utils.str_to_list(filenames)
+    # If Filenames weren't defined in the info.ini, then search through all images in the given comic
+    # folder and add any you find to the list of image files.
+    # Skip any image files whose names start with an underscore.
+    image_files = []
+    for filename in os.listdir(page_path):
+        if filename.startswith("_"):
+            continue
+        if re.search(r"\.(jpg|jpeg|png|tif|tiff|gif|bmp|webp|webv|svg|eps)$", filename):
+            image_files.append(filename)
+    return sorted(image_files)
 
-    page_info_list = sorted(
-        page_info_list,
-        key=lambda x: (strptime(x["Post date"], date_format), x["page_name"])
-    )
-    return page_info_list, scheduled_post_count
+
+def json_default(o: Any) -> Any:
+    if isinstance(o, datetime):
+        return o.isoformat()
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
 
 
 def save_page_info_json_file(comic_folder: str, page_info_list: List, scheduled_post_count: int):
@@ -261,9 +439,7 @@ def save_page_info_json_file(comic_folder: str, page_info_list: List, scheduled_
         "page_info_list": page_info_list,
         "scheduled_post_count": scheduled_post_count
     }
-    os.makedirs(f"{comic_folder}comic", exist_ok=True)
-    with open(f"{comic_folder}comic/page_info_list.json", "w") as f:
-        f.write(dumps(d))
+    utils.write_output_file(f"{comic_folder}comic/page_info_list.json", dumps(d, default=json_default).encode("utf-8"))
 
 
 def get_ids(comic_list: List[Dict], index):
@@ -291,6 +467,43 @@ def get_transcripts(comic_folder: str, comic_info: RawConfigParser, page_name: s
     return transcripts
 
 
+def get_transcript_languages(comic_folder: str, comic_info: RawConfigParser, page_name: str) -> List[str]:
+    """
+    Gets the same list of languages as `get_transcripts(...).keys()`, without reading or converting any transcripts.
+    """
+    if not comic_info.getboolean("Transcripts", "Enable transcripts"):
+        return []
+    languages = OrderedDict()
+    if comic_info.getboolean("Transcripts", "Load transcripts from comic folder", fallback=True):
+        languages.update((language, None) for language, _ in
+                         find_transcripts_in_folder(f"your_content/{comic_folder}comics", page_name))
+    transcripts_dir = comic_info.get("Transcripts", "Transcripts folder", fallback="")
+    if transcripts_dir:
+        languages.update((language, None) for language, _ in find_transcripts_in_folder(transcripts_dir, page_name))
+    default_language = comic_info.get("Transcripts", "Default language", fallback="English")
+    if default_language in languages:
+        languages.move_to_end(default_language, last=False)
+    return list(languages)
+
+
+def find_transcripts_in_folder(transcripts_dir: str, page_name: str) -> List[Tuple[str, str]]:
+    """
+    Finds both *.txt and *.md files in the transcripts folder, as defined in the config file. *.md files are listed
+    after *.txt files, so if two files exist with the same name (e.g. English.txt and English.md), then the *.md file
+    will take precedence when they're loaded in order.
+    :return: A list of (language, transcript_path) tuples
+    """
+    extensions = ["*.txt", "*.md"]
+    transcripts = []
+    for ext in extensions:
+        for transcript_path in sorted(glob(os.path.join(transcripts_dir, page_name, ext))):
+            # Ignore the post.txt in the comic folders
+            if transcript_path.endswith("post.txt"):
+                continue
+            transcripts.append((os.path.splitext(os.path.basename(transcript_path))[0], transcript_path))
+    return transcripts
+
+
 def load_transcripts_from_folder(transcripts_dir: str, page_name: str):
     """
     Loads both *.txt and *.md files from the transcripts folder, as defined in the config file. If two files exist
@@ -299,21 +512,15 @@ def load_transcripts_from_folder(transcripts_dir: str, page_name: str):
     :param page_name:
     :return:
     """
-    extensions = ["*.txt", "*.md"]
     transcripts = {}
-    for ext in extensions:
-        for transcript_path in sorted(glob(os.path.join(transcripts_dir, page_name, ext))):
-            # Ignore the post.txt in the comic folders
-            if transcript_path.endswith("post.txt"):
-                continue
-            language = os.path.splitext(os.path.basename(transcript_path))[0]
-            with open(transcript_path, "rb") as f:
-                text = f.read()
-                try:
-                    text = text.decode("utf-8")
-                except UnicodeDecodeError:
-                    text = text.decode("latin-1")
-                transcripts[language] = MARKDOWN.convert(text)
+    for language, transcript_path in find_transcripts_in_folder(transcripts_dir, page_name):
+        with open(transcript_path, "rb") as f:
+            text = f.read()
+            try:
+                text = text.decode("utf-8")
+            except UnicodeDecodeError:
+                text = text.decode("latin-1")
+            transcripts[language] = get_markdown().convert(text)
     return transcripts
 
 
@@ -336,33 +543,24 @@ def format_user_variable(k: str) -> str:
     :param k:
     :return:
     """
+    return _format_user_variable(k)
+
+
+@lru_cache(maxsize=None)
+def _format_user_variable(k: str) -> str:
+    # Every page has mostly the same option names, so cache the formatted names instead of running the regex again
     k = re.sub(r"[^a-z0-9_]+", "_", k.lower()).strip("_")
     if k not in ["page_name"]:
         k = "_" + k
     return k
 
 
-def create_comic_data(comic_folder: str, comic_info: RawConfigParser, page_info: dict,
-                      first_id: str, previous_id: str, current_id: str, next_id: str, last_id: str):
-    t = strftime("%Y-%m-%d %H:%M:%S")
-    print(f"[{t}] Building page {page_info['page_name']}...")
-    page_dir = f"your_content/{comic_folder}comics/{page_info['page_name']}/"
-    archive_date_format = comic_info.get("Archive", "Date format")
-    if archive_date_format:
-        archive_post_date = strftime(
-            archive_date_format,
-            strptime(
-                page_info["Post date"],
-                comic_info.get("Comic Settings", "Date format")
-            )
-        )
-    else:
-        archive_post_date = page_info["Post date"]
+def get_post_html(comic_folder: str, page_name: str) -> str:
     post_html = []
     post_text_paths = [
         f"your_content/{comic_folder}before post text.txt",
         f"your_content/{comic_folder}before post text.html",
-        page_dir + "post.txt",
+        f"your_content/{comic_folder}comics/{page_name}/post.txt",
         f"your_content/{comic_folder}after post text.txt",
         f"your_content/{comic_folder}after post text.html",
     ]
@@ -370,7 +568,23 @@ def create_comic_data(comic_folder: str, comic_info: RawConfigParser, page_info:
         if os.path.exists(post_text_path):
             with open(post_text_path, "rb") as f:
                 post_html.append(f.read().decode("utf-8"))
-    post_html = MARKDOWN.convert("\n\n".join(post_html))
+    return get_markdown().convert("\n\n".join(post_html))
+
+
+def create_comic_data(comic_folder: str, comic_info: RawConfigParser, page_info: dict,
+                      first_id: str, previous_id: str, current_id: str, next_id: str, last_id: str,
+                      summary: bool = False):
+    """
+    :param summary: If True, the page's post and transcripts aren't loaded, and post_html and transcripts are left
+    empty. Used by the first pass of a streaming build.
+    """
+    logger.debug("Building page %s", page_info["page_name"])
+    page_dir = f"your_content/{comic_folder}comics/{page_info['page_name']}/"
+    archive_date_format = comic_info.get("Archive", "Date format")
+    if archive_date_format:
+        archive_post_date = page_info["post_datetime"].strftime(archive_date_format)
+    else:
+        archive_post_date = page_info["Post date"]
     # Figure out page_title from the info.ini or comic page file names
     if "Title" in page_info:
         page_title = page_info["Title"]
@@ -379,22 +593,23 @@ def create_comic_data(comic_folder: str, comic_info: RawConfigParser, page_info:
         page_title = os.path.splitext(page_info["image_file_names"][0])[0]
     else:
         page_title = ""
-    d = {
-        "page_title": page_title,
-        "comic_paths": [os.path.join(page_dir, f) for f in page_info["image_file_names"]],
-        "thumbnail_path": os.path.join(page_dir, "_thumbnail.jpg"),
-        "escaped_alt_text": html.escape(page_info["Alt text"]),
-        "first_id": first_id,
-        "previous_id": previous_id,
-        "current_id": current_id,
-        "next_id": next_id,
-        "last_id": last_id,
-        "archive_post_date": archive_post_date,
-        "post_html": post_html,
-        "transcripts": get_transcripts(comic_folder, comic_info, page_info["page_name"]),
-    }
+    d = PageRecord(
+        page_title=page_title,
+        comic_paths=[os.path.join(page_dir, f) for f in page_info["image_file_names"]],
+        thumbnail_path=os.path.join(page_dir, "_thumbnail.jpg"),
+        escaped_alt_text=html.escape(page_info["Alt text"]),
+        first_id=first_id,
+        previous_id=previous_id,
+        current_id=current_id,
+        next_id=next_id,
+        last_id=last_id,
+        archive_post_date=archive_post_date,
+        post_html="" if summary else get_post_html(comic_folder, page_info["page_name"]),
+        transcripts=OrderedDict() if summary else get_transcripts(comic_folder, comic_info, page_info["page_name"]),
+    )
     # Copy in existing page info options to the data dict, but format them so they're proper Jinja2 variable names
-    d.update({format_user_variable(k): v for k, v in page_info.items()})
+    for k, v in page_info.items():
+        d[format_user_variable(k)] = v
     # Add _title if it wasn't defined in page_info
     if "_title" not in page_info:
         d["_title"] = page_title
@@ -405,15 +620,123 @@ def create_comic_data(comic_folder: str, comic_info: RawConfigParser, page_info:
     theme = comic_info.get("Comic Settings", "Theme", fallback="default")
     hook_result = run_hook(theme, "extra_comic_dict_processing", [comic_folder, comic_info, d])
     if hook_result:
-        d = hook_result
+        # Hooks are allowed to return a plain dict
+        d = hook_result if isinstance(hook_result, PageRecord) else PageRecord(hook_result)
     return d
 
 
-def build_comic_data_dicts(comic_folder: str, comic_info: RawConfigParser, page_info_list: List[Dict]) -> List[Dict]:
-    return [
-        create_comic_data(comic_folder, comic_info, page_info, **get_ids(page_info_list, i))
-        for i, page_info in enumerate(page_info_list)
-    ]
+def build_comic_data_dicts(comic_folder: str, comic_info: RawConfigParser,
+                           page_info_list: List[Dict]) -> List[PageRecord]:
+    """
+    Builds the comic data dicts for every page, in worker processes if there are enough pages and the theme's
+    extra_comic_dict_processing hook (if it has one) is safe to call in them. Streaming builds only build summaries
+    of each page here, without their posts and transcripts.
+    """
+    theme = comic_info.get("Comic Settings", "Theme", fallback="default")
+    summary = is_streaming_build(comic_info)
+    jobs = JOBS if JOBS is not None else utils.get_cpu_count()
+    jobs = min(jobs, len(page_info_list) // COMIC_DATA_PAGES_PER_WORKER)
+    if jobs > 1 and not is_hook_worker_safe(theme, "extra_comic_dict_processing"):
+        logger.debug("Building comic data without worker processes, because the extra_comic_dict_processing hook "
+                     "isn't listed in WORKER_SAFE_HOOKS")
+        jobs = 1
+    if jobs <= 1:
+        comic_data_dicts = []
+        with Progress("Building comic data", len(page_info_list)) as progress:
+            for i, page_info in enumerate(page_info_list):
+                comic_data = create_comic_data(comic_folder, comic_info, page_info, **get_ids(page_info_list, i),
+                                               summary=summary)
+                comic_data_dicts.append(comic_data)
+                progress.update()
+    else:
+        comic_data_dicts = build_comic_data_dicts_in_parallel(comic_folder, comic_info, page_info_list, jobs,
+                                                              summary)
+    comic_data_dicts = run_batch_hook(theme, "extra_comic_dict_batch_processing", comic_folder, comic_info,
+                                      comic_data_dicts)
+    # Hooks are allowed to return plain dicts
+    return [d if isinstance(d, PageRecord) else PageRecord(d) for d in comic_data_dicts]
+
+
+def init_comic_data_worker(comic_folder: str, comic_info: RawConfigParser, summary: bool, log_level: int):
+    global COMIC_DATA_WORKER_ARGS
+    if not build_log.is_logging_set_up():
+        build_log.setup_logging(log_level)
+    COMIC_DATA_WORKER_ARGS = (comic_folder, comic_info, summary)
+
+
+def create_comic_data_batch_in_worker(pages: List[Tuple[Dict, Dict[str, str]]]) -> List[PageRecord]:
+    comic_folder, comic_info, summary = COMIC_DATA_WORKER_ARGS
+    return [create_comic_data(comic_folder, comic_info, page_info, **ids, summary=summary) for page_info, ids in pages]
+
+
+def build_comic_data_dicts_in_parallel(comic_folder: str, comic_info: RawConfigParser, page_info_list: List[Dict],
+                                       jobs: int, summary: bool = False) -> List[PageRecord]:
+    """
+    Splits the pages between worker processes, in order, and puts their comic data dicts back together in the same
+    order.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    pages = [(page_info, get_ids(page_info_list, i)) for i, page_info in enumerate(page_info_list)]
+    # Several batches per worker, so one slow batch doesn't hold up the rest
+    batch_size = max(1, len(pages) // (jobs * 4))
+    batches = [pages[i:i + batch_size] for i in range(0, len(pages), batch_size)]
+    logger.info(f"Building comic data with {jobs} worker(s)")
+    comic_data_dicts = []
+    initargs = (comic_folder, comic_info, summary, build_log.get_console_level())
+    with Progress("Building comic data", len(pages)) as progress, \
+            ProcessPoolExecutor(max_workers=jobs, initializer=init_comic_data_worker, initargs=initargs) as executor:
+        for batch in executor.map(create_comic_data_batch_in_worker, batches):
+            comic_data_dicts.extend(batch)
+            progress.update(len(batch))
+    return comic_data_dicts
+
+
+class ImageDimensionsCache:
+    """
+    Reads the width and height of comic images, and remembers them between builds by each image's size and
+    modification time, so unchanged images don't have to be opened again.
+    """
+
+    def __init__(self, comic_folder: str):
+        self.path = build_cache.get_comic_cache_path("image_dimensions", comic_folder, ".json")
+        self.old_entries = build_cache.load_json_file(self.path)
+        # Only images that are still in use are saved, so deleted images don't stay in the cache forever
+        self.entries = {}
+
+    def get(self, image_path: str, unchanged: bool = False) -> Optional[List[int]]:
+        """
+        :param unchanged: If True, the image is known not to have changed since the last build, so a cached entry is
+        used even if the image's modification time is different
+        :return: [width, height] of the given image, or None if it doesn't exist or Pillow can't read it (e.g. SVGs)
+        """
+        try:
+            stat = os.stat(image_path)
+        except OSError:
+            return None
+        entry = self.old_entries.get(image_path)
+        if entry is not None and unchanged and entry[0] == stat.st_size:
+            entry = [stat.st_size, stat.st_mtime_ns, entry[2]]
+        elif entry is None or entry[0] != stat.st_size or entry[1] != stat.st_mtime_ns:
+            entry = [stat.st_size, stat.st_mtime_ns, read_image_dimensions(image_path)]
+        self.entries[image_path] = entry
+        return entry[2]
+
+    def save(self):
+        if self.entries != self.old_entries:
+            build_cache.save_json_file(self.path, self.entries, indent=None)
+
+
+def read_image_dimensions(image_path: str) -> Optional[List[int]]:
+    from PIL import Image
+
+    try:
+        # Image.open() only reads the image's header. The pixel data isn't read or decoded until it's needed, which it
+        # never is here.
+        with Image.open(image_path) as im:
+            return list(im.size)
+    except OSError:
+        return None
 
 
 def resize(im, size):
@@ -441,6 +764,8 @@ def resize(im, size):
 
 
 def save_image(im, path):
+    from PIL import Image
+
     try:
         # If saving as JPEG, force-convert to RGB first
         if path.lower().endswith("jpg") or path.lower().endswith("jpeg"):
@@ -458,6 +783,8 @@ def save_image(im, path):
 
 
 def create_comic_thumbnail(comic_info, comic_page_path):
+    from PIL import Image
+
     section = "Image Reprocessing"
     comic_page_dir = os.path.dirname(comic_page_path)
     comic_page_name, comic_page_ext = os.path.splitext(os.path.basename(comic_page_path))
@@ -465,12 +792,12 @@ def create_comic_thumbnail(comic_info, comic_page_path):
         im = Image.open(f)
         thumbnail_path = os.path.join(comic_page_dir, "_thumbnail.jpg")
         if comic_info.getboolean(section, "Overwrite existing images") or not os.path.isfile(thumbnail_path):
-            print(f"Creating thumbnail for {comic_page_name}")
+            logger.debug(f"Creating thumbnail for {comic_page_name}")
             thumb_im = resize(im, comic_info.get(section, "Thumbnail size"))
             save_image(thumb_im, thumbnail_path)
 
 
-def process_comic_images(comic_info: RawConfigParser, comic_data_dicts: List[Dict]):
+def process_comic_images(comic_folder: str, comic_info: RawConfigParser, comic_data_dicts: List[Dict]):
     if comic_info.getboolean("Image Reprocessing", "Create thumbnails"):
         for comic_data in comic_data_dicts:
             if not comic_data["comic_paths"]:
@@ -480,30 +807,23 @@ def process_comic_images(comic_info: RawConfigParser, comic_data_dicts: List[Dic
                 )
             # We don't support multiple thumbnails per page, so pick the first image in the list
             create_comic_thumbnail(comic_info, comic_data["comic_paths"][0])
+    # Thumbnails are made from the original images first, because this points comic_paths at the optimized copies
+    optimize_images.optimize_comic_images(comic_folder, comic_info, comic_data_dicts, jobs=JOBS,
+                                         changes=GIT_CHANGES)
 
 
-def get_storylines(comic_info: RawConfigParser, comic_data_dicts: List[Dict]) -> OrderedDict:
-    # Start with an OrderedDict, so we can easily drop the pages we encounter in the proper buckets, while keeping
-    # their proper order
-    storylines_dict = OrderedDict()
+def get_storylines(comic_info: RawConfigParser, comic_data_dicts: List[Dict]) -> "storyline_index.StorylineIndex":
     show_uncategorized = comic_info.getboolean("Archive", "Show Uncategorized comics", fallback=True)
-    for comic_data in comic_data_dicts:
-        storyline = comic_data["_storyline"]
-        if not storyline:
-            if not show_uncategorized:
-                continue
-            storyline = "Uncategorized"
-        if storyline not in storylines_dict.keys():
-            storylines_dict[storyline] = []
-        storylines_dict[storyline].append(comic_data.copy())
-    if "Uncategorized" in storylines_dict:
-        storylines_dict.move_to_end("Uncategorized")
-    hooked_storylines_dict = run_hook(
-        comic_info.get("Comic Settings", "Theme", fallback="default"),
-        "extra_get_storylines_processing",
-        [comic_info, comic_data_dicts, storylines_dict]
+    storylines = storyline_index.StorylineIndex.build(comic_data_dicts, show_uncategorized)
+    hook = get_hook(comic_info.get("Comic Settings", "Theme", fallback="default"), "extra_get_storylines_processing")
+    if hook is None:
+        return storylines
+    # The hook has always been given an OrderedDict of storyline names to lists of pages, which it can change in place
+    storylines_dict = storylines.to_dict()
+    hooked_storylines_dict = hook(comic_info, comic_data_dicts, storylines_dict)
+    return storyline_index.from_hook_result(
+        comic_data_dicts, hooked_storylines_dict if hooked_storylines_dict is not None else storylines_dict
     )
-    return hooked_storylines_dict if hooked_storylines_dict is not None else storylines_dict
 
 
 def write_html_files(comic_folder: str, comic_info: RawConfigParser, comic_data_dicts: List[Dict], global_values: Dict):
@@ -514,24 +834,104 @@ def write_html_files(comic_folder: str, comic_info: RawConfigParser, comic_data_
         template_folders.insert(0, f"your_content/themes/{theme}/templates")
         if comic_folder:
             template_folders.insert(0, f"your_content/themes/{theme}/templates/{comic_folder}")
-    print(f"Template folders: {template_folders}")
+    logger.debug(f"Template folders: {template_folders}")
     utils.build_jinja_environment(comic_info, template_folders)
     utils.build_markdown_parser(comic_info)
-    # Write individual comic pages
-    print("Writing {} comic pages...".format(len(comic_data_dicts)))
-    for comic_data_dict in comic_data_dicts:
-        html_path = f"{comic_folder}comic/{comic_data_dict['page_name']}/index.html"
-        comic_data_dict.update(global_values)
-        utils.write_to_template("comic", html_path, comic_data_dict)
-    write_other_pages(comic_folder, comic_info, comic_data_dicts, global_values)
-    run_hook(global_values["theme"], "build_other_pages", [comic_folder, comic_info, comic_data_dicts])
+    utils.html_minifier = minify_html.HtmlMinifier(comic_folder) if minify_html_enabled(comic_info) else None
+    utils.output_writer = output_writer.OutputWriter()
+    try:
+        # Write individual comic pages
+        if is_streaming_build(comic_info):
+            stream_comic_pages(comic_folder, comic_info, comic_data_dicts, global_values)
+        else:
+            with Progress("Writing comic pages", len(comic_data_dicts)) as progress:
+                for comic_data_dict in comic_data_dicts:
+                    html_path = f"{comic_folder}comic/{comic_data_dict['page_name']}/index.html"
+                    comic_data_dict.add_global_values(global_values)
+                    utils.write_to_template("comic", html_path, comic_data_dict)
+                    progress.update()
+        write_other_pages(comic_folder, comic_info, comic_data_dicts, global_values)
+        run_hook(global_values["theme"], "build_other_pages", [comic_folder, comic_info, comic_data_dicts])
+    finally:
+        # Wait for everything to be written before the stage ends. Raises if any of the files couldn't be.
+        writer, utils.output_writer = utils.output_writer, None
+        writer.close()
+    if utils.html_minifier is not None:
+        for line in utils.html_minifier.get_stats_lines():
+            logger.info(line)
+        utils.html_minifier.save()
+        utils.html_minifier = None
+
+
+def minify_html_enabled(comic_info: RawConfigParser) -> bool:
+    return comic_info.getboolean("Comic Settings", "Minify HTML", fallback=False)
+
+
+def is_streaming_build(comic_info: RawConfigParser) -> bool:
+    """
+    Streaming builds keep memory use down for comics with huge archives, by building each page in two passes. The first
+    pass builds a summary of every page, without its post or transcripts, which is all the navigation, archive, tag
+    pages, and RSS feed need. The second pass loads each page's post and transcripts, writes the page, and lets it go
+    before loading the next one. The theme's extra_comic_dict_processing hook is called in the first pass, and every
+    hook that's given the list of comic data dicts is given the summaries.
+
+    Enable it with `Stream comic pages = True` in the [Comic Settings] section of comic_info.ini.
+    """
+    return comic_info.getboolean("Comic Settings", "Stream comic pages", fallback=False)
+
+
+def iter_full_comic_data(comic_folder: str, comic_info: RawConfigParser,
+                         comic_data_dicts: List[PageRecord]) -> Iterator[PageRecord]:
+    """
+    The second pass of a streaming build.
+    :param comic_data_dicts: The page summaries built in the first pass
+    :return: A full copy of each page's summary in turn, with its post and transcripts loaded
+    """
+    for summary in comic_data_dicts:
+        comic_data = summary.copy()
+        comic_data["post_html"] = get_post_html(comic_folder, summary["page_name"])
+        comic_data["transcripts"] = get_transcripts(comic_folder, comic_info, summary["page_name"])
+        yield comic_data
+
+
+def stream_comic_pages(comic_folder: str, comic_info: RawConfigParser, comic_data_dicts: List[PageRecord],
+                       global_values: Dict):
+    """
+    Writes every comic page in a streaming build, with one full page in memory at a time. The search index is built,
+    and the main comic's posts are kept for the RSS feed, as each page goes by. The latest page's summary is replaced
+    with its full copy at the end, since the index and latest pages show all of it.
+    """
+    global SPOOLED_POSTS
+    if SPOOLED_POSTS is not None:
+        SPOOLED_POSTS.close()
+        SPOOLED_POSTS = None
+    if not comic_folder and comic_info.getboolean("RSS Feed", "Build RSS feed"):
+        SPOOLED_POSTS = SpooledPosts()
+    search_index = SearchIndexBuilder(comic_folder) if is_search_index_enabled(comic_info) else None
+    comic_data_dict = None
+    with Progress("Writing comic pages", len(comic_data_dicts)) as progress:
+        for summary, comic_data_dict in zip(comic_data_dicts,
+                                            iter_full_comic_data(comic_folder, comic_info, comic_data_dicts)):
+            html_path = f"{comic_folder}comic/{comic_data_dict['page_name']}/index.html"
+            summary.add_global_values(global_values)
+            comic_data_dict.add_global_values(global_values)
+            utils.write_to_template("comic", html_path, comic_data_dict)
+            if search_index is not None:
+                search_index.add_page(comic_data_dict)
+            if SPOOLED_POSTS is not None:
+                SPOOLED_POSTS.add(comic_data_dict["page_name"], comic_data_dict["post_html"])
+            progress.update()
+    if search_index is not None:
+        search_index.write()
+    if comic_data_dict is not None:
+        comic_data_dicts[-1] = comic_data_dict
 
 
 def write_other_pages(comic_folder: str, comic_info: RawConfigParser, comic_data_dicts: List[Dict],
                       global_values: Dict):
     base_data_dict = {}
     if not comic_data_dicts:
-        print("You're publishing a website with no comic pages. Are you sure you want that??", file=sys.stderr)
+        logger.warning("You're publishing a website with no comic pages. Are you sure you want that??")
         # Set a default page title, in case of a situation like wanting to
         # TODO Replace with a default comic_data_dict
         base_data_dict.update({"_title": "Index"})
@@ -542,7 +942,7 @@ def write_other_pages(comic_folder: str, comic_info: RawConfigParser, comic_data
     for page in pages_list:
         # Special handling for tag pages
         if page["template_name"] == "tagged":
-            write_tagged_pages(comic_data_dicts, base_data_dict)
+            write_tagged_pages(comic_folder, comic_info, comic_data_dicts, base_data_dict, global_values)
             continue
         # If we're building the index or 404 pages, they should go in the root directory
         if page["template_name"].lower() in ("index", "404"):
@@ -559,19 +959,134 @@ def write_other_pages(comic_folder: str, comic_info: RawConfigParser, comic_data
         if page["title"]:
             data_dict["_title"] = page["title"]
         utils.write_to_template(page["template_name"], html_path, data_dict)
+        if page["template_name"] == "archive" and comic_info.getboolean("Archive", "Page per storyline",
+                                                                         fallback=False):
+            write_storyline_archive_pages(os.path.dirname(html_path), page["title"], data_dict)
 
 
-def write_tagged_pages(comic_data_dicts: List[Dict], global_values: Dict):
-    if not comic_data_dicts:
+def write_storyline_archive_pages(archive_folder: str, archive_title: str, archive_data_dict: Dict):
+    """
+    Writes an archive page for each storyline, e.g. archive/Chapter-1/index.html, with the same template as the main
+    archive page, but with only that storyline in `storylines`. The storyline is also available as `storyline`.
+    """
+    storylines = archive_data_dict["storylines"]
+    if not isinstance(storylines, storyline_index.StorylineIndex):
+        logger.warning("Can't write an archive page per storyline, because the extra_get_storylines_processing hook "
+                       "changed the storylines into something other than lists of pages")
         return
+    for name, storyline in storylines.items():
+        data_dict = archive_data_dict.copy()
+        data_dict.update({
+            "_title": f"{archive_title} - {name}" if archive_title else name,
+            "storyline": storyline,
+            "storylines": storyline_index.StorylineIndex(OrderedDict([(name, storyline)])),
+        })
+        html_path = os.path.join(archive_folder, name.replace(" ", "-"), "index.html")
+        utils.write_to_template("archive", html_path, data_dict)
+
+
+def write_tagged_pages(comic_folder: str, comic_info: RawConfigParser, comic_data_dicts: List[Dict],
+                       base_data_dict: Dict, global_values: Dict):
+    """
+    Writes a page for every character and tag. With reuse_unchanged_tagged_pages() turned on, the fingerprint of every
+    tag page is kept in TAGGED_PAGE_FINGERPRINTS, and tag pages whose fingerprints haven't changed since the last build
+    are linked from the last build into the staging folder instead of being rendered again. Pages of tags that no longer
+    exist are never linked into the staging folder, so they're gone once it's swapped into place.
+    """
     tags = defaultdict(list)
     for page in comic_data_dicts:
         for character in page.get("_characters", []):
             tags[character].append(page)
         for tag in page.get("_tags", []):
             tags[tag].append(page)
-    for tag, pages in tags.items():
-        data_dict = global_values.copy()
+
+    template_folders = list(utils.jinja_environment.loader.searchpath)
+    if reuse_unchanged_tagged_pages(comic_info):
+        previous_fingerprints = build_cache.load_build_state().get("tagged_pages", {}).get(comic_folder)
+        if not isinstance(previous_fingerprints, dict):
+            previous_fingerprints = {}
+        fingerprints = get_tagged_page_fingerprints(comic_info, tags, global_values, template_folders)
+        tags_to_write = [tag for tag in tags if fingerprints[tag] != previous_fingerprints.get(tag)
+                         or not keep_previous_tagged_page(tag)]
+    else:
+        fingerprints = {}
+        tags_to_write = list(tags)
+    logger.info(f"Writing {len(tags_to_write)} of {len(tags)} tag pages...")
+
+    jobs = JOBS if JOBS is not None else utils.get_cpu_count()
+    jobs = min(jobs, len(tags_to_write) // TAGGED_PAGES_PER_WORKER)
+    if jobs <= 1:
+        failed_tags = write_tagged_page_batch(base_data_dict, [(tag, tags[tag]) for tag in tags_to_write])
+    else:
+        failed_tags = write_tagged_pages_in_parallel(
+            comic_info, template_folders, base_data_dict, [(tag, tags[tag]) for tag in tags_to_write], jobs
+        )
+    # Failed pages will be retried on the next build
+    for tag in failed_tags:
+        fingerprints.pop(tag, None)
+    TAGGED_PAGE_FINGERPRINTS[comic_folder] = fingerprints
+
+
+def reuse_unchanged_tagged_pages(comic_info: RawConfigParser) -> bool:
+    """
+    Tag pages are normally all rendered again on every build. Comics with thousands of tags can turn on
+    `Reuse unchanged tag pages = True` in the [Comic Settings] section of comic_info.ini to only render the tag pages
+    whose fingerprints have changed (see get_tagged_page_fingerprints()).
+
+    Tag pages are given the latest page and every global value. To keep every new comic page from changing every tag
+    page's fingerprint, the fingerprints leave out the latest page and the global values built from every page
+    (PAGE_DERIVED_GLOBAL_VALUES, like storylines). So only turn this on if the theme's tagged and base templates don't
+    show any of those, e.g. a link to the latest page, a storyline sidebar, or thumbnails of other pages. Otherwise,
+    tag pages will show stale values until their own pages or the templates change.
+    """
+    return comic_info.getboolean("Comic Settings", "Reuse unchanged tag pages", fallback=False)
+
+
+def get_tagged_page_fingerprints(comic_info: RawConfigParser, tags: Dict[str, List[Dict]], global_values: Dict,
+                                 template_folders: List[str]) -> Dict[str, str]:
+    """
+    :return: A fingerprint of each tag's page, which covers the names, titles, and post dates of the tag's pages, the
+    global values that aren't in PAGE_DERIVED_GLOBAL_VALUES, and the theme's templates and pages
+    """
+    context_fingerprint = build_cache.get_values_fingerprint([
+        {k: v for k, v in global_values.items() if k not in PAGE_DERIVED_GLOBAL_VALUES},
+        build_cache.get_folders_fingerprint(template_folders + [f"your_content/themes/{global_values['theme']}/pages"]),
+        # Tag pages link to the hashed CSS and JS files, which are renamed whenever they change
+        utils.asset_urls,
+        minify_html_enabled(comic_info),
+    ])
+    return {
+        tag: build_cache.get_values_fingerprint([
+            context_fingerprint, tag, [(p["page_name"], p.get("_title"), p.get("_post_date")) for p in pages]
+        ])
+        for tag, pages in tags.items()
+    }
+
+
+def get_tagged_page_path(tag: str) -> str:
+    return f"tagged/{tag}/index.html"
+
+
+def keep_previous_tagged_page(tag: str) -> bool:
+    """
+    :return: False if the tag page from the last build is missing, and needs to be written again
+    """
+    if utils.output_directory:
+        return staged_output.link_previous_file(get_tagged_page_path(tag))
+    return os.path.isfile(get_tagged_page_path(tag))
+
+
+def write_tagged_page_batch(base_data_dict: Dict, tagged_pages: List[Tuple[str, List[Dict]]]) -> List[str]:
+    """
+    :return: The tags whose pages couldn't be written
+    """
+    failed_tags = []
+    tags_by_path = {}
+    if utils.output_writer is not None:
+        # Any other pages that are still being written aren't allowed to fail like tag pages are
+        utils.output_writer.flush_or_raise()
+    for tag, pages in tagged_pages:
+        data_dict = base_data_dict.copy()
         data_dict.update({
             "_title": f"Posts tagged with {tag}",
             "tag": tag,
@@ -579,12 +1094,63 @@ def write_tagged_pages(comic_data_dicts: List[Dict], global_values: Dict):
         })
         # Tag names can get weird, and it doesn't matter too much if their files don't get created.
         # Catch any exceptions and print the error, but let things continue if needed.
-        filename = f"tagged/{tag}/index.html"
+        filename = get_tagged_page_path(tag)
+        # The output writer reports errors by the path it wrote to, which is in the staging folder
+        tags_by_path[utils.output_path(filename)] = tag
         try:
             utils.write_to_template("tagged", filename, data_dict)
         except Exception:
-            print(f"Failed to create '{filename}' from 'tagged' template", file=sys.stderr)
-            print(traceback.format_exc(), file=sys.stderr)
+            logger.exception(f"Failed to create '{filename}' from 'tagged' template")
+            failed_tags.append(tag)
+    if utils.output_writer is not None:
+        for filename, e in utils.output_writer.flush():
+            logger.error(f"Failed to write '{filename}'", exc_info=e)
+            failed_tags.append(tags_by_path[filename])
+    return failed_tags
+
+
+def init_tagged_page_worker(comic_info: RawConfigParser, template_folders: List[str], base_data_dict: Dict,
+                            asset_urls: Dict[str, str], output_directory: str):
+    global TAGGED_PAGE_BASE_DATA_DICT
+    utils.asset_urls = asset_urls
+    utils.output_directory = output_directory
+    # Tag pages written in workers aren't cached or counted in the minifying stats, but they're still minified
+    utils.html_minifier = minify_html.HtmlMinifier(None) if minify_html_enabled(comic_info) else None
+    utils.output_writer = output_writer.OutputWriter()
+    utils.build_jinja_environment(comic_info, template_folders)
+    utils.build_markdown_parser(comic_info)
+    TAGGED_PAGE_BASE_DATA_DICT = base_data_dict
+
+
+def write_tagged_page_batch_in_worker(tagged_pages: List[Tuple[str, List[Dict]]]) -> List[str]:
+    return write_tagged_page_batch(TAGGED_PAGE_BASE_DATA_DICT, tagged_pages)
+
+
+def write_tagged_pages_in_parallel(comic_info: RawConfigParser, template_folders: List[str], base_data_dict: Dict,
+                                   tagged_pages: List[Tuple[str, List[Dict]]], jobs: int) -> List[str]:
+    """
+    Splits the tag pages between worker processes. The base data dict is only sent to each worker once, and comic data
+    dicts are sent without their global values attached, since those are in the base data dict already.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    plain_pages = {}
+    for _, pages in tagged_pages:
+        for page in pages:
+            if id(page) not in plain_pages:
+                plain_pages[id(page)] = dict(page.own_items()) if isinstance(page, PageRecord) else page
+    tagged_pages = [(tag, [plain_pages[id(page)] for page in pages]) for tag, pages in tagged_pages]
+    # Several batches per worker, so one slow batch doesn't hold up the rest
+    batch_size = max(1, len(tagged_pages) // (jobs * 4))
+    batches = [tagged_pages[i:i + batch_size] for i in range(0, len(tagged_pages), batch_size)]
+    logger.info(f"Writing tag pages with {jobs} worker(s)")
+    failed_tags = []
+    with ProcessPoolExecutor(max_workers=jobs, initializer=init_tagged_page_worker,
+                             initargs=(comic_info, template_folders, base_data_dict, utils.asset_urls,
+                                       utils.output_directory)) as executor:
+        for batch_failed_tags in executor.map(write_tagged_page_batch_in_worker, batches):
+            failed_tags.extend(batch_failed_tags)
+    return failed_tags
 
 
 def get_extra_comic_info(folder_name: str, comic_info: RawConfigParser):
@@ -601,26 +1167,249 @@ def get_extra_comic_info(folder_name: str, comic_info: RawConfigParser):
     return comic_info
 
 
+class ExtraComicBuildError(Exception):
+    def __init__(self, extra_comic: str, log: str):
+        super().__init__(extra_comic, log)
+        self.extra_comic = extra_comic
+        self.log = log
+
+    def __str__(self):
+        return f"Failed to build extra comic '{self.extra_comic}'. Build log:\n{self.log}"
+
+
+def build_extra_comic(extra_comic: str, comic_info: RawConfigParser, comic_url: str, base_directory: str,
+                      asset_urls: Dict[str, str], output_directory: str, changes: Optional[git_changes.ChangeSet],
+                      jobs: int, log_level: int, delete_scheduled_posts: bool,
+                      publish_all_comics: bool) -> Tuple[dict, str, Optional[datetime], Dict[str, str]]:
+    """
+    Builds and publishes a single extra comic. This is run in a worker process, so everything it needs is passed in,
+    and everything it prints is captured so it can be shown as one block in the main build log.
+    :param jobs: The number of worker processes this extra comic's own parallel stages can use
+    :return: A 4-tuple of the extra comic's last comic data dict (as a plain dict, with the global values it was built
+    with), the log of everything printed while building it, the post date of its next scheduled page, if any, and its
+    tag page fingerprints.
+    """
+    global BASE_DIRECTORY, PROCESSING_TIMES, MEMORY_USAGE, GIT_CHANGES, JOBS
+    BASE_DIRECTORY = base_directory
+    utils.asset_urls = asset_urls
+    utils.output_directory = output_directory
+    GIT_CHANGES = changes
+    # Worker processes that were started fresh, instead of forked from the main process, have to set up logging again
+    if not build_log.is_logging_set_up():
+        build_log.setup_logging(log_level)
+    # Keep the processing times and job count of the main build intact, in case this is run in the main process
+    main_processing_times, main_memory_usage, main_jobs = PROCESSING_TIMES, MEMORY_USAGE, JOBS
+    JOBS = jobs
+    log = io.StringIO()
+    with redirect_stdout(log), redirect_stderr(log):
+        try:
+            checkpoint("Start", clear=True)
+            extra_comic_info = get_extra_comic_info(extra_comic, comic_info)
+            os.makedirs(utils.output_path(extra_comic), exist_ok=True)
+            comic_data_dicts, global_values = build_and_publish_comic_pages(
+                comic_url, get_extra_comic_folder(extra_comic), extra_comic_info, delete_scheduled_posts,
+                publish_all_comics
+            )
+            print_processing_times()
+        except Exception:
+            logger.exception(f"Failed to build extra comic {extra_comic}")
+            raise ExtraComicBuildError(extra_comic, log.getvalue())
+        finally:
+            PROCESSING_TIMES, MEMORY_USAGE, JOBS = main_processing_times, main_memory_usage, main_jobs
+    summary = comic_data_dicts[-1].to_dict() if comic_data_dicts else {}
+    tagged_page_fingerprints = TAGGED_PAGE_FINGERPRINTS.get(get_extra_comic_folder(extra_comic), {})
+    return summary, log.getvalue(), global_values["next_post_date"], tagged_page_fingerprints
+
+
+def get_extra_comic_folder(extra_comic: str) -> str:
+    return extra_comic.strip("/") + "/"
+
+
+def build_extra_comics(comic_info: RawConfigParser, comic_url: str, delete_scheduled_posts: bool,
+                       publish_all_comics: bool, jobs: Optional[int] = None) -> Tuple[Dict[str, dict], List[datetime]]:
+    """
+    Builds all extra comics. Each extra comic has its own content and output folders, so they're built in parallel in
+    worker processes, unless there's only one of them, `jobs` is 1, or their themes have hooks that aren't listed in
+    WORKER_SAFE_HOOKS.
+    :return: A 2-tuple of a dict of extra comic folder names to the last comic data dict of that extra comic, and the
+    post dates of the next scheduled page of each extra comic that has one
+    """
+    extra_comics = get_extra_comics_list(comic_info)
+    if not extra_comics:
+        return {}, []
+    if jobs is None:
+        jobs = utils.get_cpu_count()
+    total_jobs = jobs
+    jobs = min(jobs, len(extra_comics))
+    if jobs > 1:
+        themes = {get_extra_comic_info(extra_comic, comic_info).get("Comic Settings", "Theme", fallback="default")
+                  for extra_comic in extra_comics}
+        unsafe_hooks = sorted({func for theme in themes for func in get_worker_unsafe_hooks(theme)})
+        if unsafe_hooks:
+            logger.info(f"Building extra comics in the main process, because these hooks aren't listed in "
+                        f"WORKER_SAFE_HOOKS: {', '.join(unsafe_hooks)}")
+            jobs = 1
+    # Each extra comic's own parallel stages (tag pages, comic data, and optimizing images) get an equal share of the
+    # jobs, instead of every extra comic's worker process starting `jobs` more processes of its own
+    extra_comic_jobs = max(1, total_jobs // jobs)
+    args = [comic_info, comic_url, BASE_DIRECTORY, utils.asset_urls, utils.output_directory, GIT_CHANGES,
+            extra_comic_jobs, build_log.get_console_level(), delete_scheduled_posts, publish_all_comics]
+    logger.info(f"Building {len(extra_comics)} extra comic(s) with {jobs} worker(s)")
+    extra_comic_values = {}
+    next_post_dates = []
+    if jobs <= 1:
+        results = (build_extra_comic(extra_comic, *args) for extra_comic in extra_comics)
+        for extra_comic, (summary, log, next_post_date, tagged_page_fingerprints) in zip(extra_comics, results):
+            print_extra_comic_log(extra_comic, log)
+            extra_comic_values[extra_comic] = summary
+            if next_post_date is not None:
+                next_post_dates.append(next_post_date)
+            TAGGED_PAGE_FINGERPRINTS[get_extra_comic_folder(extra_comic)] = tagged_page_fingerprints
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = [executor.submit(build_extra_comic, extra_comic, *args) for extra_comic in extra_comics]
+            # Print each log in the same order as the comics are listed, so the build log doesn't interleave them
+            for extra_comic, future in zip(extra_comics, futures):
+                summary, log, next_post_date, tagged_page_fingerprints = future.result()
+                print_extra_comic_log(extra_comic, log)
+                extra_comic_values[extra_comic] = summary
+                if next_post_date is not None:
+                    next_post_dates.append(next_post_date)
+                TAGGED_PAGE_FINGERPRINTS[get_extra_comic_folder(extra_comic)] = tagged_page_fingerprints
+    return extra_comic_values, next_post_dates
+
+
+def print_extra_comic_log(extra_comic: str, log: str):
+    logger.info(f"===== Extra comic: {extra_comic} =====")
+    if log.strip():
+        build_log.log_console_only(log.rstrip("\n"))
+    logger.info(f"===== End of extra comic: {extra_comic} =====")
+
+
 def checkpoint(s: str, clear: bool = False):
-    global PROCESSING_TIMES
+    global PROCESSING_TIMES, MEMORY_USAGE
     if clear:
         PROCESSING_TIMES = [(s, perf_counter_ns())]
+        MEMORY_USAGE = []
     else:
         PROCESSING_TIMES.append((s, perf_counter_ns()))
+    if tracemalloc.is_tracing():
+        MEMORY_USAGE.append(tracemalloc.get_traced_memory())
+        # Reset the peak so the next checkpoint reports the peak for its own stage only
+        tracemalloc.reset_peak()
+
+
+def record_top_allocations(limit: int = 10):
+    """
+    Records the source lines responsible for the most memory that's still allocated at this point of the build.
+    Only works when memory profiling is enabled.
+    """
+    global TOP_ALLOCATIONS
+    snapshot = tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    ])
+    TOP_ALLOCATIONS = snapshot.statistics("lineno")[:limit]
+
+
+def format_bytes(n: int) -> str:
+    return "{:.2f} MB".format(n / 1024 / 1024)
 
 
 def print_processing_times():
     last_processed_time = None
-    print("")
-    for name, t in PROCESSING_TIMES:
+    last_memory = None
+    logger.info("")
+    for i, (name, t) in enumerate(PROCESSING_TIMES):
+        memory = MEMORY_USAGE[i] if i < len(MEMORY_USAGE) else None
         if last_processed_time is not None:
-            print("{}: {:.2f} ms".format(name, (t - last_processed_time) / 1_000_000))
+            ms = (t - last_processed_time) / 1_000_000
+            line = "{}: {:.2f} ms".format(name, ms)
+            data = {}
+            if memory is not None and last_memory is not None:
+                current, peak = memory
+                line += " (peak: {}, retained: {}, change: {}{})".format(
+                    format_bytes(peak), format_bytes(current), "+" if current >= last_memory[0] else "-",
+                    format_bytes(abs(current - last_memory[0]))
+                )
+                data = {"peak_bytes": peak, "retained_bytes": current}
+            build_log.log_data(logging.INFO, line, event="stage", stage=name, ms=ms, **data)
         last_processed_time = t
-    print("{}: {:.2f} ms".format("Total time", (PROCESSING_TIMES[-1][1] - PROCESSING_TIMES[0][1]) / 1_000_000))
+        last_memory = memory
+    total_ms = (PROCESSING_TIMES[-1][1] - PROCESSING_TIMES[0][1]) / 1_000_000
+    build_log.log_data(logging.INFO, "{}: {:.2f} ms".format("Total time", total_ms), event="total", ms=total_ms)
+    if MEMORY_USAGE:
+        logger.info("{}: {}".format("Peak memory", format_bytes(max(peak for _, peak in MEMORY_USAGE))))
+    if TOP_ALLOCATIONS:
+        logger.info("\nTop allocation sites still held at the end of the build:")
+        for stat in TOP_ALLOCATIONS:
+            frame = stat.traceback[0]
+            logger.info("{}:{}: {} in {} blocks".format(frame.filename, frame.lineno, format_bytes(stat.size),
+                                                       stat.count))
+
+
+def get_git_change_set(comic_info: RawConfigParser) -> Optional[git_changes.ChangeSet]:
+    transcripts_folders = [
+        info.get("Transcripts", "Transcripts folder", fallback="")
+        for info in [comic_info] + [get_extra_comic_info(f, comic_info) for f in get_extra_comics_list(comic_info)]
+    ]
+    return git_changes.get_change_set(build_cache.load_build_state(), transcripts_folders)
+
+
+def get_tagged_page_state() -> Dict[str, Dict[str, str]]:
+    """
+    Every comic's tag pages are written to the same tagged/ folder, so a tag that more than one comic has ends up with
+    the page of whichever comic wrote it last. The main comic is always built last, so its fingerprints are kept for
+    those tags, but the extra comics' aren't, so they never reuse a page that isn't theirs.
+    :return: The tag page fingerprints of every comic, by comic folder, to save in the build state
+    """
+    tag_counts = defaultdict(int)
+    for fingerprints in TAGGED_PAGE_FINGERPRINTS.values():
+        for tag in fingerprints:
+            tag_counts[tag] += 1
+    return {
+        comic_folder: {tag: fingerprint for tag, fingerprint in fingerprints.items()
+                       if not comic_folder or tag_counts[tag] == 1}
+        for comic_folder, fingerprints in TAGGED_PAGE_FINGERPRINTS.items()
+    }
 
 
-def main(delete_scheduled_posts: bool = False, publish_all_comics: bool = False):
-    global BASE_DIRECTORY
+def get_build_args(delete_scheduled_posts: bool, publish_all_comics: bool) -> Dict[str, Any]:
+    """
+    The arguments that change the output of the build, used to decide whether a build can be skipped
+    """
+    return {"delete_scheduled_posts": delete_scheduled_posts, "publish_all_comics": publish_all_comics}
+
+
+def main(delete_scheduled_posts: bool = False, publish_all_comics: bool = False, profile_memory: bool = False,
+         jobs: Optional[int] = None, use_git: bool = False):
+    global TOP_ALLOCATIONS, JOBS, GIT_CHANGES, TAGGED_PAGE_FINGERPRINTS
+    TOP_ALLOCATIONS = []
+    JOBS = jobs
+    GIT_CHANGES = None
+    TAGGED_PAGE_FINGERPRINTS = {}
+    if not build_log.is_logging_set_up():
+        build_log.setup_logging()
+    if profile_memory:
+        tracemalloc.start()
+    try:
+        build_comic_site(delete_scheduled_posts, publish_all_comics, jobs, use_git)
+        if profile_memory:
+            record_top_allocations()
+    finally:
+        # Stop tracing even if the build fails, so later builds in the same process, like dev_server.py's, aren't
+        # slowed down by it
+        if profile_memory:
+            tracemalloc.stop()
+
+    print_processing_times()
+
+
+def build_comic_site(delete_scheduled_posts: bool, publish_all_comics: bool, jobs: Optional[int], use_git: bool):
+    global BASE_DIRECTORY, GIT_CHANGES, SPOOLED_POSTS
     checkpoint("Start", clear=True)
 
     # Get site-wide settings for this comic
@@ -635,37 +1424,74 @@ def main(delete_scheduled_posts: bool = False, publish_all_comics: bool = False)
 
     checkpoint("Preprocessing hook")
 
+    if use_git:
+        GIT_CHANGES = get_git_change_set(comic_info)
+        checkpoint("Find changes with git")
+    # Cached page info is updated as this build goes, so if it doesn't finish, the commit the last build was built from
+    # no longer tells the next build what's changed
+    build_cache.update_build_state(git_commit=None)
+
     # Set up the output file space
-    setup_output_file_space(comic_info)
+    setup_output_file_space()
     checkpoint("Setup output file space")
 
-    # Build any extra comics that may be needed
-    extra_comic_values = {}
-    for extra_comic in get_extra_comics_list(comic_info):
-        print(extra_comic)
-        extra_comic_info = get_extra_comic_info(extra_comic, comic_info)
-        os.makedirs(extra_comic, exist_ok=True)
-        comic_data_dicts, _ = build_and_publish_comic_pages(
-            comic_url, extra_comic.strip("/") + "/", extra_comic_info, delete_scheduled_posts,
-            publish_all_comics
+    try:
+        # Copy CSS and JS files to content-hashed file names, for the templates' asset_url() function
+        utils.asset_urls = build_assets.build_assets(comic_info)
+        checkpoint("Build hashed assets")
+
+        # Build any extra comics that may be needed
+        extra_comic_values, next_post_dates = build_extra_comics(
+            comic_info, comic_url, delete_scheduled_posts, publish_all_comics, jobs
         )
-        extra_comic_values[extra_comic] = comic_data_dicts[-1] if comic_data_dicts else {}
+        checkpoint("Build extra comics")
 
-    # Build and publish pages for the main comic
-    print("Main comic")
-    comic_data_dicts, global_values = build_and_publish_comic_pages(
-        comic_url, "", comic_info, delete_scheduled_posts, publish_all_comics, extra_comic_values
-    )
+        # Build and publish pages for the main comic
+        logger.info("Main comic")
+        comic_data_dicts, global_values = build_and_publish_comic_pages(
+            comic_url, "", comic_info, delete_scheduled_posts, publish_all_comics, extra_comic_values
+        )
 
-    # Build the RSS feed
-    build_rss_feed(comic_info, comic_data_dicts)
-    checkpoint("Build RSS feed")
+        # Build the RSS feed
+        build_rss_feed(comic_info, comic_data_dicts, SPOOLED_POSTS)
+        checkpoint("Build RSS feed")
+    except BaseException:
+        # Leave the live site as it was, which the saved tag page fingerprints still describe
+        staged_output.discard_staged_output()
+        raise
+    finally:
+        utils.output_directory = ""
+        if SPOOLED_POSTS is not None:
+            SPOOLED_POSTS.close()
+            SPOOLED_POSTS = None
+
+    # Replace the live site with the new build
+    staged_output.swap_staged_output(get_output_paths(comic_info))
+    build_cache.update_build_state(tagged_pages=get_tagged_page_state())
+    checkpoint("Swap staged output into place")
 
     run_hook(theme, "postprocess", [comic_info, comic_data_dicts, global_values])
 
     checkpoint("Postprocessing hook")
 
-    print_processing_times()
+    # Remember when the next scheduled page goes up, so `--if-due` can tell when it's time to build again
+    if global_values["next_post_date"] is not None:
+        next_post_dates.append(global_values["next_post_date"])
+    next_post_date = min(next_post_dates) if next_post_dates else None
+    if next_post_date is not None:
+        logger.info(f"Next scheduled post: {next_post_date}")
+
+    # Fingerprint the inputs after the build, since the build can create thumbnails and delete scheduled posts
+    build_args = get_build_args(delete_scheduled_posts, publish_all_comics)
+    build_cache.update_build_state(
+        version=VERSION,
+        build_args=build_args,
+        input_fingerprint=build_cache.get_input_fingerprint(build_args),
+        source_commit=build_cache.get_source_commit(),
+        next_post_date=next_post_date.isoformat() if next_post_date is not None else None,
+        **(git_changes.get_build_state_values() if use_git else {}),
+    )
+    checkpoint("Save build state")
 
 
 def parse_args():
@@ -683,9 +1509,119 @@ def parse_args():
         action="store_true",
         help="Will publish all comics, even ones with a publish date set in the future."
     )
+    parser.add_argument(
+        "--profile-memory",
+        action="store_true",
+        help="Tracks memory usage with tracemalloc, and prints the peak and retained memory for each stage of the "
+             "build next to its processing time. Makes the build noticeably slower."
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="The number of worker processes to build extra comics and tag pages in. Defaults to the number of CPUs. "
+             "Set to 1 to build everything in the main process."
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Skips the build if no files in your_content or comic_git_engine have changed since the last successful "
+             "build, using file sizes and modification times."
+    )
+    parser.add_argument(
+        "--if-due",
+        action="store_true",
+        help="Like --check, but also builds if a scheduled page's post date has passed since the last successful "
+             "build. Meant for builds that run on a schedule."
+    )
+    parser.add_argument(
+        "--git-changes",
+        action="store_true",
+        help="Asks git which files have changed since the commit the last build was built from, instead of using "
+             "file modification times, which are reset by every fresh checkout. Used by --check and --if-due, and to "
+             "reuse cached page info for pages that haven't changed."
+    )
+    parser.add_argument(
+        "-q",
+        "--quiet",
+        action="store_true",
+        help="Only shows warnings and errors."
+    )
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        action="store_true",
+        help="Shows a message for every page and file that's built, instead of a progress counter for each stage."
+    )
+    parser.add_argument(
+        "--log-file",
+        default=None,
+        help="Also writes every message, including the ones only shown with --verbose, to this file as one JSON "
+             "object per line, for other tools to read."
+    )
+    parser.add_argument(
+        "--import-cache",
+        default=None,
+        metavar="PATH",
+        help="Before building, replaces the build cache with the contents of this archive, made by --export-cache. "
+             "Archives made by a different engine version or with different settings, or that are corrupt, are "
+             "ignored."
+    )
+    parser.add_argument(
+        "--export-cache",
+        default=None,
+        metavar="PATH",
+        help="After building, saves the build cache to this archive, so a build on a fresh checkout of the comic can "
+             "start from it with --import-cache."
+    )
+    parser.add_argument(
+        "--cache-key",
+        action="store_true",
+        help="Prints the key of the cache archives that this engine version and these settings can use, and exits. "
+             "Meant for CI cache steps."
+    )
     return parser.parse_args()
 
 
+def set_github_output(name: str, value: str):
+    """
+    Sets an output of the current step when running in GitHub Actions, so later steps in the workflow can check it
+    """
+    if "GITHUB_OUTPUT" in os.environ:
+        with open(os.environ["GITHUB_OUTPUT"], "a") as f:
+            f.write(f"{name}={value}\n")
+
+
 if __name__ == "__main__":
     args = parse_args()
-    main(args.delete_scheduled_posts, args.publish_all_comics)
+    build_log.setup_logging(
+        logging.WARNING if args.quiet else logging.DEBUG if args.verbose else logging.INFO, args.log_file
+    )
+    # Cache archive paths are relative to where the script was run from, not the project root
+    import_cache_path = os.path.abspath(args.import_cache) if args.import_cache else None
+    export_cache_path = os.path.abspath(args.export_cache) if args.export_cache else None
+    if args.cache_key or import_cache_path or export_cache_path:
+        utils.find_project_root()
+        cache_key = cache_archive.get_cache_key(VERSION, read_info("your_content/comic_info.ini"))
+        if args.cache_key:
+            print(cache_key)
+            set_github_output("cache_key", cache_key)
+            sys.exit(0)
+    if import_cache_path:
+        cache_archive.import_cache(import_cache_path, cache_key)
+    skip_message = None
+    if args.check or args.if_due:
+        utils.find_project_root()
+        build_args = get_build_args(args.delete_scheduled_posts, args.publish_all_comics)
+        if args.check and build_cache.is_build_up_to_date(VERSION, build_args, use_git=args.git_changes):
+            skip_message = "Nothing has changed since the last build. Skipping build."
+        elif args.if_due and not build_cache.is_build_due(VERSION, build_args, use_git=args.git_changes):
+            skip_message = "Nothing has changed and no scheduled pages are due since the last build. Skipping build."
+    if skip_message:
+        logger.info(skip_message)
+        set_github_output("skipped", "true")
+    else:
+        main(args.delete_scheduled_posts, args.publish_all_comics, args.profile_memory, args.jobs, args.git_changes)
+    if export_cache_path:
+        cache_archive.export_cache(export_cache_path, cache_key)
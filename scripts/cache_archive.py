@@ -0,0 +1,161 @@
+"""
+Exports the build cache to a single compressed archive, and imports it again, so CI runs that start from a fresh
+checkout can still reuse the work of the last build:
+
+    python comic_git_engine/scripts/build_site.py --import-cache cache.tar.gz --export-cache cache.tar.gz
+
+Every archive is keyed by the engine version and a hash of the comic's settings. An archive with a different key, or
+with any file that's missing or doesn't match the hash recorded for it when it was exported, is ignored as a whole, so a
+stale or corrupt archive just means a cold build.
+"""
+
+import hashlib
+import io
+import json
+import os
+import shutil
+import tarfile
+from configparser import RawConfigParser
+from typing import Dict
+
+import build_cache
+from build_log import logger
+
+ARCHIVE_FORMAT = 1
+MANIFEST_NAME = "manifest.json"
+# Cache files are stored under this folder in the archive, next to the manifest
+FILES_FOLDER = "cache"
+# Left over from interrupted builds, and never worth keeping
+EXCLUDED_FOLDERS = {"staging", "previous_output"}
+IMPORT_FOLDER = build_cache.CACHE_DIRECTORY + ".import"
+
+
+class InvalidCacheArchive(Exception):
+    pass
+
+
+def get_settings_hash(comic_info: RawConfigParser) -> str:
+    return build_cache.get_values_fingerprint({s: dict(comic_info.items(s)) for s in comic_info.sections()})
+
+
+def get_cache_key(version: str, comic_info: RawConfigParser) -> str:
+    """
+    :return: The key for cache archives that can be used by a build with the given engine version and settings
+    """
+    return f"{version}-{get_settings_hash(comic_info)[:16]}"
+
+
+def get_file_hash(f) -> str:
+    h = hashlib.sha256()
+    for chunk in iter(lambda: f.read(1024 * 1024), b""):
+        h.update(chunk)
+    return h.hexdigest()
+
+
+def iter_cache_files():
+    if not os.path.isdir(build_cache.CACHE_DIRECTORY):
+        return
+    for folder, dirs, files in os.walk(build_cache.CACHE_DIRECTORY):
+        if folder == build_cache.CACHE_DIRECTORY:
+            dirs[:] = [d for d in dirs if d not in EXCLUDED_FOLDERS]
+        for file in files:
+            if folder == build_cache.CACHE_DIRECTORY and file == ".gitignore":
+                continue
+            path = os.path.join(folder, file)
+            yield path, os.path.relpath(path, build_cache.CACHE_DIRECTORY).replace(os.sep, "/")
+
+
+def export_cache(archive_path: str, cache_key: str) -> int:
+    """
+    Writes every file in the cache folder to a gzipped tar archive at archive_path.
+    :return: The number of files exported
+    """
+    files = {}
+    temp_path = archive_path + ".tmp"
+    with tarfile.open(temp_path, "w:gz") as tar:
+        for path, name in iter_cache_files():
+            with open(path, "rb") as f:
+                files[name] = get_file_hash(f)
+            tar.add(path, f"{FILES_FOLDER}/{name}", recursive=False)
+        manifest = json.dumps({"format": ARCHIVE_FORMAT, "key": cache_key, "files": files}, indent=2).encode("utf-8")
+        info = tarfile.TarInfo(MANIFEST_NAME)
+        info.size = len(manifest)
+        tar.addfile(info, io.BytesIO(manifest))
+    os.replace(temp_path, archive_path)
+    logger.info(f"Exported {len(files)} cache file(s) to {archive_path}")
+    return len(files)
+
+
+def read_manifest(tar: tarfile.TarFile, cache_key: str) -> Dict[str, str]:
+    try:
+        f = tar.extractfile(MANIFEST_NAME)
+    except KeyError:
+        f = None
+    if f is None:
+        raise InvalidCacheArchive("it has no manifest")
+    manifest = json.loads(f.read().decode("utf-8"))
+    if not isinstance(manifest, dict) or not isinstance(manifest.get("files"), dict):
+        raise InvalidCacheArchive("its manifest is corrupt")
+    if manifest.get("format") != ARCHIVE_FORMAT:
+        raise InvalidCacheArchive(f"it's in an unknown format ({manifest.get('format')})")
+    if manifest.get("key") != cache_key:
+        raise InvalidCacheArchive(f"it was made by a different engine version or settings ({manifest.get('key')})")
+    return manifest["files"]
+
+
+def extract_cache_files(tar: tarfile.TarFile, files: Dict[str, str], folder: str):
+    """
+    Extracts and checks every file listed in the manifest. Nothing outside `folder` is ever written, whatever the
+    archive contains.
+    """
+    for name, file_hash in files.items():
+        parts = name.split("/")
+        if name.startswith("/") or any(part in ("", ".", "..") for part in parts):
+            raise InvalidCacheArchive(f"it has an unsafe file name ({name})")
+        try:
+            member = tar.getmember(f"{FILES_FOLDER}/{name}")
+        except KeyError:
+            raise InvalidCacheArchive(f"{name} is missing")
+        if not member.isfile():
+            raise InvalidCacheArchive(f"{name} isn't a file")
+        path = os.path.join(folder, *parts)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with tar.extractfile(member) as source, open(path, "wb") as f:
+            shutil.copyfileobj(source, f)
+        with open(path, "rb") as f:
+            if get_file_hash(f) != file_hash:
+                raise InvalidCacheArchive(f"{name} is corrupt")
+        os.utime(path, (member.mtime, member.mtime))
+
+
+def import_cache(archive_path: str, cache_key: str) -> bool:
+    """
+    Replaces the cache folder with the files in the archive at archive_path, if it has the given key and every file in
+    it is intact. Otherwise, the cache folder is left as it is.
+    :return: True if the archive was imported
+    """
+    if not os.path.isfile(archive_path):
+        logger.info(f"No cache archive found at {archive_path}. Starting from a cold build.")
+        return False
+    shutil.rmtree(IMPORT_FOLDER, ignore_errors=True)
+    # Ignored by git from the start, in case the build is interrupted and the folder is left behind
+    build_cache.make_ignored_folder(IMPORT_FOLDER)
+    try:
+        with tarfile.open(archive_path, "r:gz") as tar:
+            files = read_manifest(tar, cache_key)
+            extract_cache_files(tar, files, IMPORT_FOLDER)
+    except (InvalidCacheArchive, tarfile.TarError, OSError, EOFError, ValueError) as e:
+        shutil.rmtree(IMPORT_FOLDER, ignore_errors=True)
+        logger.warning(f"Ignoring cache archive {archive_path}, because {describe_error(e)}. "
+                       f"Starting from a cold build.")
+        return False
+    shutil.rmtree(build_cache.CACHE_DIRECTORY, ignore_errors=True)
+    os.rename(IMPORT_FOLDER, build_cache.CACHE_DIRECTORY)
+    logger.info(f"Imported {len(files)} cache file(s) from {archive_path}")
+    return True
+
+
+def describe_error(e: Exception) -> str:
+    if isinstance(e, InvalidCacheArchive):
+        return str(e)
+    return f"it couldn't be read ({e!r})"
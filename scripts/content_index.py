@@ -0,0 +1,161 @@
+"""
+An optional SQLite index of the metadata for every comic page, which lets build_site.py skip reading info.ini files,
+listing page folders, and searching for transcripts for pages that haven't changed since the last build.
+
+Pages are checked for changes by the modification times and sizes of their info.ini file and folders, so the index is
+refreshed incrementally on every build. Enable it with `Use content index = True` in the [Comic Settings] section of
+comic_info.ini. Like everything else in the cache folder, the index can be deleted at any time.
+"""
+
+import json
+import os
+from configparser import RawConfigParser
+from typing import Dict, List, Optional, Tuple, Any
+
+from build_cache import get_comic_cache_path, make_cache_folder
+from build_log import logger
+
+# Bump this whenever the schema or the meaning of the stored values changes
+SCHEMA_VERSION = 2
+
+# Settings from comic_info.ini that change the values stored in the index
+INDEXED_SETTINGS = [
+    ("Comic Settings", "Date format"),
+    ("Comic Settings", "Timezone"),
+    ("Transcripts", "Enable transcripts"),
+    ("Transcripts", "Load transcripts from comic folder"),
+    ("Transcripts", "Transcripts folder"),
+    ("Transcripts", "Default language"),
+]
+
+# (info.ini mtime, info.ini size, page folder mtime, transcripts folder mtime)
+PageSignature = Tuple[int, int, int, int]
+
+
+class ContentIndex:
+    def __init__(self, path: str, comic_info: RawConfigParser, version: str):
+        import sqlite3
+
+        make_cache_folder(os.path.dirname(path))
+        self.connection = sqlite3.connect(path)
+        self.seen_pages = set()
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )
+        """)
+        settings = json.dumps({
+            "schema_version": SCHEMA_VERSION,
+            "engine_version": version,
+            "settings": [comic_info.get(section, option, fallback=None) for section, option in INDEXED_SETTINGS],
+        })
+        if self._get_meta("settings") != settings:
+            # Something that changes the stored values has changed, so everything has to be indexed again. The tables
+            # are dropped instead of emptied, since older schema versions had different ones.
+            logger.info("Content index is out of date. Rebuilding content index.")
+            self.connection.execute("DROP TABLE IF EXISTS pages")
+            self.connection.execute("DROP TABLE IF EXISTS page_tags")
+            self._set_meta("settings", settings)
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                page_name TEXT PRIMARY KEY,
+                signature TEXT NOT NULL,
+                page_info TEXT NOT NULL,
+                image_file_names TEXT NOT NULL,
+                transcript_languages TEXT NOT NULL
+            )
+        """)
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        row = self.connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: str):
+        self.connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def get_page(self, page_name: str, signature: PageSignature,
+                 check_signature: bool = True) -> Optional[Tuple[Dict[str, Any], List[str], List[str]]]:
+        """
+        :param check_signature: If False, the page is already known not to have changed (e.g. by git), so the indexed
+        values are used even if the signature is different, and the new signature is stored
+        :return: A 3-tuple of the info.ini dict, the image file names, and the transcript languages of the given page,
+        if it's in the index and hasn't changed since it was indexed. Otherwise, None.
+        """
+        self.seen_pages.add(page_name)
+        row = self.connection.execute(
+            "SELECT signature, page_info, image_file_names, transcript_languages FROM pages WHERE page_name = ?",
+            (page_name,)
+        ).fetchone()
+        if row is None:
+            return None
+        if row[0] != json.dumps(signature):
+            if check_signature:
+                return None
+            self.connection.execute("UPDATE pages SET signature = ? WHERE page_name = ?",
+                                    (json.dumps(signature), page_name))
+        return json.loads(row[1]), json.loads(row[2]), json.loads(row[3])
+
+    def update_page(self, page_name: str, signature: PageSignature, page_info: Dict[str, Any],
+                    image_file_names: List[str], transcript_languages: List[str]):
+        """
+        Stores a published page in the index.
+        :param page_info: The info.ini file as it was read, before any processing
+        """
+        self.seen_pages.add(page_name)
+        self.connection.execute(
+            "INSERT OR REPLACE INTO pages (page_name, signature, page_info, image_file_names, transcript_languages) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (page_name, json.dumps(signature), json.dumps(page_info), json.dumps(image_file_names),
+             json.dumps(transcript_languages))
+        )
+
+    def remove_page(self, page_name: str):
+        self.connection.execute("DELETE FROM pages WHERE page_name = ?", (page_name,))
+
+    def save(self):
+        """
+        Removes any pages that weren't looked up or updated during this build, because their folders have been deleted,
+        and saves all changes.
+        """
+        for (page_name,) in self.connection.execute("SELECT page_name FROM pages").fetchall():
+            if page_name not in self.seen_pages:
+                self.remove_page(page_name)
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+
+def get_page_signature(page_path: str, page_name: str, transcripts_dir: str) -> PageSignature:
+    """
+    Stats everything that the indexed values for a page are read from. Adding or removing images or transcripts
+    changes the modification time of the folder they're in, so the folders' contents don't need to be listed.
+    """
+    info_stat = os.stat(os.path.join(page_path, "info.ini"))
+    transcripts_mtime = 0
+    if transcripts_dir:
+        try:
+            transcripts_mtime = os.stat(os.path.join(transcripts_dir, page_name)).st_mtime_ns
+        except FileNotFoundError:
+            transcripts_mtime = -1
+    return info_stat.st_mtime_ns, info_stat.st_size, os.stat(page_path).st_mtime_ns, transcripts_mtime
+
+
+def open_content_index(comic_folder: str, comic_info: RawConfigParser, version: str) -> Optional[ContentIndex]:
+    """
+    :return: The content index for the given comic, or None if the content index isn't enabled
+    """
+    if not comic_info.getboolean("Comic Settings", "Use content index", fallback=False):
+        return None
+    # sqlite3 is only imported when the index is enabled, to keep it out of the startup time of every build
+    import sqlite3
+
+    path = get_comic_cache_path("content_index", comic_folder, ".sqlite3")
+    try:
+        return ContentIndex(path, comic_info, version)
+    except sqlite3.DatabaseError as e:
+        # The index is only a cache, so if it's been corrupted, throw it away and start again
+        logger.info(f"Content index at {path} is unreadable ({e}). Rebuilding content index.")
+        os.remove(path)
+        return ContentIndex(path, comic_info, version)
@@ -0,0 +1,173 @@
+"""
+Finds what's changed since the last build with git, instead of with file modification times, which are reset by every
+fresh checkout in CI. Turn it on with build_site.py's --git-changes option.
+
+Every build saves the commit it was built from in the build state, along with a hash of every input file that differed
+from that commit when the build finished, like uncommitted edits or thumbnails created by the build. The next build asks
+git which input files differ from the saved commit, and compares those hashes for any file that was in both lists, so
+only a handful of files ever need to be read.
+
+The changed files are then sorted into the pages they belong to, so unchanged pages can skip their modification time
+checks. If git isn't installed, the project isn't a git repository, or the saved commit can't be found, the build falls
+back to modification times.
+"""
+
+import hashlib
+import os
+import re
+import subprocess
+from collections import defaultdict
+from typing import Dict, List, Optional, Iterable, Set, Any
+
+from build_cache import INPUT_FOLDERS, INPUT_FILES
+from build_log import logger
+
+# your_content/comics/<page>/... for the main comic, or your_content/<extra comic>/comics/<page>/... for extra comics
+PAGE_PATH_PATTERN = re.compile(r"^your_content/(.*?)comics/([^/]+)/")
+
+
+def run_git(*args: str) -> Optional[str]:
+    """
+    :return: The output of the git command, or None if git isn't installed or the command failed
+    """
+    try:
+        result = subprocess.run(["git", *args], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.decode("utf-8", "surrogateescape")
+
+
+def get_head_commit() -> Optional[str]:
+    output = run_git("rev-parse", "--verify", "--quiet", "HEAD^{commit}")
+    return output.strip() if output else None
+
+
+def has_commit(commit: str) -> bool:
+    return run_git("cat-file", "-e", f"{commit}^{{commit}}") is not None
+
+
+def fetch_commit(commit: str) -> bool:
+    """
+    CI checkouts are usually shallow, so the last built commit might not have been fetched. Diffing two commits only
+    needs their trees, not the history between them, so fetching that one commit is enough.
+    """
+    if has_commit(commit):
+        return True
+    logger.debug(f"Fetching commit {commit} to compare against")
+    return run_git("fetch", "--quiet", "--depth=1", "origin", commit) is not None and has_commit(commit)
+
+
+def get_paths_changed_since(commit: str) -> Optional[Set[str]]:
+    """
+    :return: Every input file in the working tree that's different from the given commit, including untracked files,
+    or None if git couldn't tell
+    """
+    pathspec = ["--", *INPUT_FOLDERS, *INPUT_FILES]
+    changed = run_git("diff", "--name-only", "--no-renames", "-z", commit, *pathspec)
+    untracked = run_git("ls-files", "--others", "--exclude-standard", "-z", *pathspec)
+    if changed is None or untracked is None:
+        return None
+    return {path for path in (changed + untracked).split("\0") if path}
+
+
+def get_file_hash(path: str) -> Optional[str]:
+    """
+    :return: A hash of the file's contents (or the target of a symlink), or None if it doesn't exist
+    """
+    h = hashlib.sha1()
+    try:
+        if os.path.islink(path):
+            h.update(os.readlink(path).encode("utf-8", "surrogateescape"))
+        elif os.path.isdir(path):
+            # A submodule, which is identified by the commit it's checked out at
+            return "submodule " + (run_git("-C", path, "rev-parse", "HEAD") or "").strip()
+        else:
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    h.update(chunk)
+    except FileNotFoundError:
+        return None
+    return h.hexdigest()
+
+
+def get_build_state_values() -> Dict[str, Any]:
+    """
+    :return: The values to save in the build state at the end of a build, so the next build can tell what's changed
+    since, or an empty dict if git can't be used
+    """
+    head = get_head_commit()
+    if head is None:
+        return {}
+    dirty_paths = get_paths_changed_since(head)
+    if dirty_paths is None:
+        return {}
+    return {"git_commit": head, "git_dirty_files": {path: get_file_hash(path) for path in sorted(dirty_paths)}}
+
+
+def get_changed_paths(state: Dict[str, Any]) -> Optional[List[str]]:
+    """
+    :param state: The build state saved by the last build
+    :return: Every input file that's changed since the last build, or None if git can't tell
+    """
+    commit = state.get("git_commit")
+    if not commit or not fetch_commit(commit):
+        return None
+    paths_now = get_paths_changed_since(commit)
+    if paths_now is None:
+        return None
+    # Files that differed from the commit when the last build finished, and their hashes at the time
+    dirty_files = state.get("git_dirty_files") or {}
+    changed = []
+    for path in sorted(paths_now | dirty_files.keys()):
+        if path in paths_now and path in dirty_files:
+            if get_file_hash(path) == dirty_files[path]:
+                continue
+        changed.append(path)
+    return changed
+
+
+class ChangeSet:
+    """
+    The input files that have changed since the last build, and the pages they belong to.
+
+    Only pages are tracked on their own. Changes to settings, templates and the engine are left to the caches that
+    depend on them, which already key their entries on those inputs.
+    """
+
+    def __init__(self, paths: Iterable[str], transcripts_folders: Iterable[str] = ()):
+        self.paths = sorted(paths)
+        # Comic folder -> names of its pages whose folders have changed
+        self.pages: Dict[str, Set[str]] = defaultdict(set)
+        # Names of pages whose transcripts have changed, in a transcripts folder that any comic might use
+        self.transcript_pages: Set[str] = set()
+        transcripts_folders = [f.strip("/") + "/" for f in transcripts_folders if f]
+        for path in self.paths:
+            m = PAGE_PATH_PATTERN.match(path)
+            transcripts_folder = next((f for f in transcripts_folders if path.startswith(f)), None)
+            if m:
+                self.pages[m.group(1)].add(m.group(2))
+            elif transcripts_folder is not None and "/" in path[len(transcripts_folder):]:
+                self.transcript_pages.add(path[len(transcripts_folder):].split("/")[0])
+
+    def is_page_unchanged(self, comic_folder: str, page_name: str) -> bool:
+        """
+        :return: True if nothing in the page's folder or its transcripts has changed
+        """
+        return page_name not in self.pages.get(comic_folder, ()) and page_name not in self.transcript_pages
+
+    def get_summary(self) -> str:
+        page_count = sum(len(pages) for pages in self.pages.values())
+        return (f"{len(self.paths)} changed file(s), in {page_count} page(s) and {len(self.transcript_pages)} page(s) "
+                f"of transcripts")
+
+
+def get_change_set(state: Dict[str, Any], transcripts_folders: Iterable[str] = ()) -> Optional[ChangeSet]:
+    paths = get_changed_paths(state)
+    if paths is None:
+        logger.info("Couldn't find what's changed since the last build with git. Falling back to modification times.")
+        return None
+    change_set = ChangeSet(paths, transcripts_folders)
+    logger.info(f"Since commit {str(state['git_commit'])[:10]}: {change_set.get_summary()}")
+    for path in change_set.paths:
+        logger.debug("Changed: %s", path)
+    return change_set
@@ -0,0 +1,517 @@
+"""
+Imports a comic from a WordPress export file (Tools > Export in the WordPress dashboard), e.g.:
+
+    python comic_git_engine/scripts/import_wordpress.py mycomic.WordPress.2020-06-13.xml
+
+Every comic post in the export becomes a page folder in your_content/comics, with its info.ini, post.txt, transcripts,
+and comic images, all written in a single pass over the export. The export is streamed instead of being loaded whole,
+and every post is dropped from memory as soon as its files are written, so even exports of comics with many thousands of
+pages can be imported on a small machine.
+
+Images are downloaded on a pool of threads while the rest of the export is still being read. Importing can safely be run
+again after it's been interrupted. Images that were already downloaded are skipped, and images that were partly
+downloaded are resumed where they left off, if the server supports it.
+
+Comic posts are the posts made by the Webcomic plugin (post types webcomic1, webcomic2, etc.) unless other post types
+are given with --post-type. A comic's images are the attachments uploaded to its post. Attachments that weren't uploaded
+to any post are matched to comics by name instead, e.g. "page-12.png" or "page_12-2.png" for the post "page-12".
+"""
+
+import argparse
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from configparser import RawConfigParser
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple, Iterator, Iterable, Set, Pattern, Union
+from urllib.error import HTTPError
+from urllib.parse import urlparse, unquote
+from urllib.request import Request, urlopen
+from xml.etree import ElementTree as ET
+
+import utils
+from build_log import logger, setup_logging
+
+# Every version of the WordPress export format uses a namespace starting with this, e.g. .../export/1.2/
+WP_NAMESPACE = "http://wordpress.org/export/"
+CONTENT_NAMESPACE = "http://purl.org/rss/1.0/modules/content/"
+WEBCOMIC_POST_TYPE_PATTERN = re.compile(r"webcomic\d+")
+ATTACHMENT_POST_TYPE = "attachment"
+TRANSCRIPT_POST_TYPE = "webcomic_transcript"
+# Posts with these statuses were never published or scheduled, so they're left out
+SKIPPED_STATUSES = {"draft", "auto-draft", "pending", "trash"}
+WP_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+DEFAULT_DATE_FORMAT = "%B %d, %Y"
+DEFAULT_LANGUAGE = "English"
+
+DOWNLOAD_THREADS = 8
+MAX_PENDING_DOWNLOADS = 64
+DOWNLOAD_ATTEMPTS = 3
+DOWNLOAD_RETRY_DELAY = 2.0
+DOWNLOAD_TIMEOUT = 60
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+PARTIAL_DOWNLOAD_SUFFIX = ".part"
+USER_AGENT = "comic_git WordPress importer"
+
+
+class IncompleteDownload(Exception):
+    pass
+
+
+def get_field_name(tag: str) -> Optional[str]:
+    """
+    :return: The name a child of an <item> is stored under by parse_item(), or None if it isn't needed
+    """
+    if not tag.startswith("{"):
+        return tag
+    namespace, name = tag[1:].split("}", 1)
+    if namespace == CONTENT_NAMESPACE:
+        return "content"
+    if namespace.startswith(WP_NAMESPACE):
+        return "excerpt" if namespace.endswith("/excerpt/") else name
+    return None
+
+
+def parse_item(item: ET.Element) -> Dict:
+    """
+    :return: The fields of an <item> in the export, with categories as a list of (domain, name) tuples and post meta
+    as a dict
+    """
+    fields = {"categories": [], "meta": {}}
+    for child in item:
+        name = get_field_name(child.tag)
+        if name == "category":
+            fields["categories"].append((child.get("domain", ""), (child.text or "").strip()))
+        elif name == "postmeta":
+            meta = {get_field_name(c.tag): c.text or "" for c in child}
+            if meta.get("meta_key"):
+                fields["meta"][meta["meta_key"]] = meta.get("meta_value", "")
+        elif name is not None:
+            fields[name] = child.text or ""
+    return fields
+
+
+def iter_items(export_path: str) -> Iterator[Dict]:
+    """
+    Streams the items in a WordPress export, clearing each one as soon as it's been parsed, so only one item is ever
+    held in memory at once.
+    """
+    channel = None
+    for event, elem in ET.iterparse(export_path, events=("start", "end")):
+        if event == "start":
+            if elem.tag == "channel":
+                channel = elem
+            continue
+        if elem.tag == "item":
+            yield parse_item(elem)
+            elem.clear()
+            if channel is not None:
+                channel.remove(elem)
+
+
+def get_attachment_page_name(post_name: str) -> str:
+    """
+    WordPress gives uploads the same name as an existing post a numbered suffix, and uploads are often named with
+    underscores, e.g. "page_12-2" for the image of "page-12".
+    """
+    return re.sub(r"-\d+$", "", post_name.replace("_", "-"))
+
+
+def get_url_filename(url: str) -> str:
+    return os.path.basename(unquote(urlparse(url).path))
+
+
+def clean_info_value(value: str) -> str:
+    """
+    Collapses newlines and runs of whitespace, which would otherwise break the info.ini file
+    """
+    return " ".join(value.split())
+
+
+def format_post_date(post_date: str, date_format: str) -> str:
+    try:
+        return datetime.strptime(post_date.strip(), WP_DATE_FORMAT).strftime(date_format)
+    except ValueError:
+        return post_date.strip()
+
+
+def download_file(url: str, path: str, timeout: float = DOWNLOAD_TIMEOUT) -> bool:
+    """
+    Downloads url to path. The file is downloaded to path + ".part" first, and is only renamed to path once it's
+    complete, so an interrupted download is resumed with a Range request the next time it's downloaded.
+    :return: False if the file had already been downloaded
+    """
+    if os.path.isfile(path):
+        return False
+    part_path = path + PARTIAL_DOWNLOAD_SUFFIX
+    offset = os.path.getsize(part_path) if os.path.isfile(part_path) else 0
+    request = Request(url, headers={"User-Agent": USER_AGENT})
+    if offset:
+        request.add_header("Range", f"bytes={offset}-")
+    try:
+        response = urlopen(request, timeout=timeout)
+    except HTTPError as e:
+        # The partial download already has every byte of the file
+        if e.code == 416 and offset:
+            os.replace(part_path, path)
+            return True
+        raise
+    with response:
+        # Servers that don't support Range requests send the whole file again
+        resumed = offset and response.status == 206
+        expected_size = response.headers.get("Content-Length")
+        written = 0
+        with open(part_path, "ab" if resumed else "wb") as f:
+            for chunk in iter(lambda: response.read(DOWNLOAD_CHUNK_SIZE), b""):
+                f.write(chunk)
+                written += len(chunk)
+    if expected_size is not None and written != int(expected_size):
+        raise IncompleteDownload(f"Only received {written} of {expected_size} bytes")
+    os.replace(part_path, path)
+    return True
+
+
+def is_retryable(e: Exception) -> bool:
+    if isinstance(e, HTTPError):
+        return e.code >= 500 or e.code in (408, 429)
+    return isinstance(e, (OSError, IncompleteDownload))
+
+
+class AttachmentDownloader:
+    """
+    Downloads files on a pool of threads. At most max_pending downloads are queued at once, and download() blocks until
+    there's room for another one. Failed downloads are retried, and any that still fail are returned by close().
+    """
+
+    def __init__(self, threads: int = DOWNLOAD_THREADS, max_pending: int = MAX_PENDING_DOWNLOADS,
+                 attempts: int = DOWNLOAD_ATTEMPTS, retry_delay: float = DOWNLOAD_RETRY_DELAY,
+                 timeout: float = DOWNLOAD_TIMEOUT):
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="wordpress-download")
+        self.pending_slots = threading.BoundedSemaphore(max_pending)
+        self.attempts = attempts
+        self.retry_delay = retry_delay
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.futures = set()
+        self.queued_paths: Set[str] = set()
+        self.downloaded = 0
+        self.skipped = 0
+        self.errors: List[Tuple[str, Exception]] = []
+
+    def download(self, url: str, path: str):
+        if path in self.queued_paths:
+            return
+        self.queued_paths.add(path)
+        self.pending_slots.acquire()
+        future = self.executor.submit(self._download, url, path)
+        with self.lock:
+            self.futures.add(future)
+        future.add_done_callback(self._done)
+
+    def _done(self, future):
+        with self.lock:
+            self.futures.discard(future)
+        self.pending_slots.release()
+
+    def _download(self, url: str, path: str):
+        for attempt in range(1, self.attempts + 1):
+            try:
+                downloaded = download_file(url, path, self.timeout)
+            except Exception as e:
+                if attempt < self.attempts and is_retryable(e):
+                    logger.debug(f"Retrying {url} after {e!r}")
+                    time.sleep(self.retry_delay * attempt)
+                    continue
+                logger.error(f"Failed to download {url}: {e!r}")
+                with self.lock:
+                    self.errors.append((url, e))
+                return
+            with self.lock:
+                if downloaded:
+                    self.downloaded += 1
+                else:
+                    self.skipped += 1
+            logger.debug("%s %s", "Downloaded" if downloaded else "Already downloaded", path)
+            return
+
+    def close(self) -> List[Tuple[str, Exception]]:
+        """
+        Waits for every queued download to finish.
+        :return: A list of (url, exception) tuples for every download that failed
+        """
+        with self.lock:
+            futures = list(self.futures)
+        wait(futures)
+        self.executor.shutdown()
+        return self.errors
+
+
+class WordPressImporter:
+    """
+    Writes the files for each comic post as soon as it's read from the export. Attachments and transcripts are usually
+    exported before or after the posts they belong to, so any that are read before their post are held until it's read,
+    and a comic's info.ini is written again if more of its images are read after it.
+    """
+
+    def __init__(self, comics_folder: str, downloader: AttachmentDownloader,
+                 post_types: Union[Iterable[str], Pattern] = WEBCOMIC_POST_TYPE_PATTERN,
+                 date_format: str = DEFAULT_DATE_FORMAT, default_language: str = DEFAULT_LANGUAGE):
+        self.comics_folder = comics_folder
+        self.downloader = downloader
+        self.post_types = post_types if isinstance(post_types, Pattern) else set(post_types)
+        self.date_format = date_format
+        self.default_language = default_language
+        # Post ID -> the info of every comic page that's been imported, minus its post and transcripts
+        self.pages: Dict[str, Dict] = {}
+        self.page_ids_by_name: Dict[str, str] = {}
+        # Attachments and transcripts that were read before their posts, by the ID or name of the post
+        self.pending_attachments: Dict[str, List[Dict]] = {}
+        self.pending_attachments_by_name: Dict[str, List[Dict]] = {}
+        self.pending_transcripts: Dict[str, List[Dict]] = {}
+        # (post ID, language) of every transcript written so far, so multiple transcripts in one language are combined
+        self.written_transcripts: Set[Tuple[str, str]] = set()
+        self.transcript_count = 0
+
+    def is_comic_post_type(self, post_type: str) -> bool:
+        if isinstance(self.post_types, Pattern):
+            return self.post_types.fullmatch(post_type) is not None
+        return post_type in self.post_types
+
+    def import_export(self, export_path: str):
+        for item in iter_items(export_path):
+            post_type = item.get("post_type", "")
+            if post_type == ATTACHMENT_POST_TYPE:
+                self.add_attachment(item)
+            elif post_type == TRANSCRIPT_POST_TYPE:
+                self.add_transcript(item)
+            elif self.is_comic_post_type(post_type):
+                self.add_page(item)
+        unmatched = sum(len(a) for a in self.pending_attachments_by_name.values())
+        if unmatched:
+            logger.debug(f"{unmatched} attachment(s) didn't belong to any comic")
+        orphaned = sum(len(t) for t in self.pending_transcripts.values())
+        if orphaned:
+            logger.warning(f"{orphaned} transcript(s) didn't belong to any comic, and weren't imported")
+
+    def add_page(self, item: Dict):
+        if item.get("status") in SKIPPED_STATUSES:
+            logger.debug(f"Skipping {item.get('status')} post {item.get('title')!r}")
+            return
+        post_id = item.get("post_id", "")
+        page_name = unquote(item.get("post_name") or "") or post_id
+        page = {
+            "page_name": page_name,
+            "title": clean_info_value(item.get("title", "")),
+            "post_date": format_post_date(item.get("post_date", ""), self.date_format),
+            "filenames": [],
+            "alt_text": "",
+            "storyline": "",
+            "characters": [],
+            "tags": [],
+        }
+        for domain, name in item["categories"]:
+            if domain.endswith("storyline"):
+                page["storyline"] = clean_info_value(name)
+            elif domain.endswith("character"):
+                page["characters"].append(clean_info_value(name))
+            elif domain.endswith("tag"):
+                page["tags"].append(clean_info_value(name))
+        self.pages[post_id] = page
+        self.page_ids_by_name[page_name] = post_id
+        page_folder = self.get_page_folder(page)
+        os.makedirs(page_folder, exist_ok=True)
+        with open(os.path.join(page_folder, "post.txt"), "wb") as f:
+            f.write(item.get("content", "").encode("utf-8"))
+        logger.debug(f"Imported {page_name}")
+        attachments = self.pending_attachments.pop(post_id, []) + \
+            self.pending_attachments_by_name.pop(page_name, [])
+        for attachment in attachments:
+            self.add_page_image(page, attachment)
+        self.write_info_file(page)
+        for transcript in self.pending_transcripts.pop(post_id, []):
+            self.write_transcript(post_id, transcript)
+
+    def get_page_folder(self, page: Dict) -> str:
+        return os.path.join(self.comics_folder, page["page_name"])
+
+    def add_attachment(self, item: Dict):
+        url = item.get("attachment_url", "").strip()
+        if not url:
+            return
+        attachment = {
+            "url": url,
+            "alt_text": clean_info_value(item.get("excerpt") or item["meta"].get("_wp_attachment_image_alt", "")),
+        }
+        parent_id = item.get("post_parent", "0")
+        name = get_attachment_page_name(unquote(item.get("post_name") or ""))
+        if parent_id in self.pages:
+            page = self.pages[parent_id]
+        elif parent_id == "0" and name in self.page_ids_by_name:
+            page = self.pages[self.page_ids_by_name[name]]
+        elif parent_id != "0":
+            self.pending_attachments.setdefault(parent_id, []).append(attachment)
+            return
+        else:
+            self.pending_attachments_by_name.setdefault(name, []).append(attachment)
+            return
+        self.add_page_image(page, attachment)
+        self.write_info_file(page)
+
+    def add_page_image(self, page: Dict, attachment: Dict):
+        filename = get_url_filename(attachment["url"])
+        if not filename or filename in page["filenames"]:
+            return
+        page["filenames"].append(filename)
+        if not page["alt_text"]:
+            page["alt_text"] = attachment["alt_text"]
+        self.downloader.download(attachment["url"], os.path.join(self.get_page_folder(page), filename))
+
+    def write_info_file(self, page: Dict):
+        lines = [
+            f"Title = {page['title']}",
+            f"Post date = {page['post_date']}",
+        ]
+        if len(page["filenames"]) == 1:
+            lines.append(f"Filename = {page['filenames'][0]}")
+        elif page["filenames"]:
+            lines.append(f"Filenames = {', '.join(page['filenames'])}")
+        lines.extend([
+            f"Alt text = {page['alt_text']}",
+            f"Storyline = {page['storyline']}",
+            f"Characters = {', '.join(page['characters'])}",
+            f"Tags = {', '.join(page['tags'])}",
+        ])
+        with open(os.path.join(self.get_page_folder(page), "info.ini"), "wb") as f:
+            f.write(("\n".join(lines) + "\n").encode("utf-8"))
+
+    def add_transcript(self, item: Dict):
+        if item.get("status") in SKIPPED_STATUSES:
+            return
+        language = next((name for domain, name in item["categories"] if "language" in domain), None)
+        if language is None:
+            language = next((name for _, name in item["categories"] if name), self.default_language)
+        transcript = {"language": language, "text": item.get("content", "")}
+        parent_id = item.get("post_parent", "0")
+        if parent_id in self.pages:
+            self.write_transcript(parent_id, transcript)
+        else:
+            self.pending_transcripts.setdefault(parent_id, []).append(transcript)
+
+    def write_transcript(self, post_id: str, transcript: Dict):
+        """
+        Writes a transcript next to the page's post.txt, where it's loaded from by default. A page with more than one
+        transcript in the same language has them combined into one file.
+        """
+        key = (post_id, transcript["language"])
+        path = os.path.join(self.get_page_folder(self.pages[post_id]), transcript["language"] + ".txt")
+        with open(path, "ab" if key in self.written_transcripts else "wb") as f:
+            if key in self.written_transcripts:
+                f.write(b"\n\n")
+            f.write(transcript["text"].encode("utf-8"))
+        self.written_transcripts.add(key)
+        self.transcript_count += 1
+
+
+def import_wordpress(export_path: str, comics_folder: str, threads: int = DOWNLOAD_THREADS,
+                     post_types: Union[Iterable[str], Pattern] = WEBCOMIC_POST_TYPE_PATTERN,
+                     date_format: str = DEFAULT_DATE_FORMAT, default_language: str = DEFAULT_LANGUAGE,
+                     **downloader_kwargs) -> List[Tuple[str, Exception]]:
+    """
+    :param comics_folder: The folder to create a folder in for every comic page, e.g. your_content/comics
+    :param downloader_kwargs: Passed on to AttachmentDownloader
+    :return: A list of (url, exception) tuples for every image that couldn't be downloaded
+    """
+    downloader = AttachmentDownloader(threads=threads, **downloader_kwargs)
+    importer = WordPressImporter(comics_folder, downloader, post_types, date_format, default_language)
+    try:
+        importer.import_export(export_path)
+    finally:
+        errors = downloader.close()
+    logger.info(f"Imported {len(importer.pages)} page(s) and {importer.transcript_count} transcript(s). "
+                f"Downloaded {downloader.downloaded} image(s), skipped {downloader.skipped} that were already "
+                f"downloaded, and failed to download {len(errors)}.")
+    return errors
+
+
+def get_comic_date_format(comic_folder: str) -> str:
+    """
+    :return: The date format that the comic's info.ini files are read with, or DEFAULT_DATE_FORMAT if the comic has
+    no comic_info.ini yet
+    """
+    path = f"your_content/{comic_folder}comic_info.ini"
+    if not os.path.isfile(path):
+        return DEFAULT_DATE_FORMAT
+    comic_info: RawConfigParser = utils.read_info(path)
+    return comic_info.get("Comic Settings", "Date format", fallback=DEFAULT_DATE_FORMAT)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Imports a comic from a WordPress export file into comic_git")
+    parser.add_argument(
+        "export_path",
+        help="The WordPress export (WXR) file, made with Tools > Export in the WordPress dashboard."
+    )
+    parser.add_argument(
+        "--extra-comic",
+        default="",
+        help="Imports the pages into this extra comic's folder, instead of the main comic's."
+    )
+    parser.add_argument(
+        "--post-type",
+        action="append",
+        default=None,
+        help="The WordPress post type of comic pages. Can be given more than once. Defaults to the post types made "
+             "by the Webcomic plugin."
+    )
+    parser.add_argument(
+        "--date-format",
+        default=None,
+        help="The format to write post dates in. Defaults to the Date format in comic_info.ini."
+    )
+    parser.add_argument(
+        "--default-language",
+        default=DEFAULT_LANGUAGE,
+        help="The language of transcripts that don't have one set."
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=DOWNLOAD_THREADS,
+        help=f"The number of images to download at once. Defaults to {DOWNLOAD_THREADS}."
+    )
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        action="store_true",
+        help="Shows a message for every page imported and image downloaded."
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    setup_logging(logging.DEBUG if args.verbose else logging.INFO)
+    # The export path is relative to where the script was run from, not the project root
+    export_path = os.path.abspath(args.export_path)
+    utils.find_project_root()
+    comic_folder = args.extra_comic + "/" if args.extra_comic else ""
+    errors = import_wordpress(
+        export_path,
+        f"your_content/{comic_folder}comics",
+        threads=args.jobs,
+        post_types=args.post_type or WEBCOMIC_POST_TYPE_PATTERN,
+        date_format=args.date_format or get_comic_date_format(comic_folder),
+        default_language=args.default_language,
+    )
+    if errors:
+        logger.error("Run the import again to retry the images that couldn't be downloaded.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Optionally minifies the HTML pages written by utils.write_to_template(), since the templates are heavily commented and
+indented, and every page also carries the AUTOGENERATE_WARNING comment.
+
+Comments are removed and runs of whitespace are collapsed to a single space or newline, which browsers render the same
+way. The contents of <pre>, <textarea>, <script> and <style> tags, and the values of attributes, are never changed.
+
+Minified pages are cached by the hash of the rendered HTML, so pages that render the same as they did in the last
+build aren't minified again. Enable it with `Minify HTML = True` in the [Comic Settings] section of comic_info.ini.
+"""
+
+import hashlib
+import re
+from collections import defaultdict
+from time import perf_counter_ns
+from typing import Dict, List, Optional
+
+import build_cache
+
+# Bump this whenever the way pages are minified changes, so cached pages are minified again
+MINIFIER_VERSION = 2
+# The inside of a tag, where a ">" in a quoted attribute value doesn't end the tag. Tags with an unbalanced quote fall
+# back to ending at the first ">".
+TAG_BODY = r"(?:(?:\"[^\"]*\"|'[^']*'|[^'\">])*|[^>]*)"
+# Comments, tags whose contents must be left alone, other tags, and text, in the order they appear in the page
+TOKEN_PATTERN = re.compile(
+    r"(?P<comment><!--(?!\[if).*?-->)"
+    rf"|(?P<raw><(?P<raw_tag>pre|textarea|script|style)\b{TAG_BODY}>.*?</(?P=raw_tag)\s*>)"
+    rf"|(?P<tag><{TAG_BODY}>)"
+    r"|(?P<text>[^<]+|<)",
+    re.IGNORECASE | re.DOTALL
+)
+# Quoted attribute values are matched first, so only whitespace outside of them is collapsed
+TAG_WHITESPACE_PATTERN = re.compile(r"(\"[^\"]*\"|'[^']*')|\s+")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def collapse_whitespace(text: str) -> str:
+    return WHITESPACE_PATTERN.sub(lambda m: "\n" if "\n" in m.group() else " ", text)
+
+
+def minify(html: str) -> str:
+    output = []
+    # Text on either side of a removed comment is collapsed together
+    text = []
+    for m in TOKEN_PATTERN.finditer(html):
+        kind = m.lastgroup if m.lastgroup != "raw_tag" else "raw"
+        if kind == "comment":
+            continue
+        if kind == "text":
+            text.append(m.group())
+            continue
+        if text:
+            output.append(collapse_whitespace("".join(text)))
+            text = []
+        if kind == "tag":
+            output.append(TAG_WHITESPACE_PATTERN.sub(lambda t: t.group(1) or " ", m.group()))
+        else:
+            output.append(m.group())
+    if text:
+        output.append(collapse_whitespace("".join(text)))
+    return "".join(output).strip()
+
+
+class PageTypeStats:
+    def __init__(self):
+        self.pages = 0
+        self.cached = 0
+        self.original_bytes = 0
+        self.minified_bytes = 0
+        self.time_ns = 0
+
+
+class HtmlMinifier:
+    def __init__(self, comic_folder: Optional[str]):
+        """
+        :param comic_folder: The comic whose pages are being minified, or None to not use the cache
+        """
+        self.cache_path = None
+        self.old_cache = {}
+        if comic_folder is not None:
+            self.cache_path = build_cache.get_comic_cache_path("minified_html", comic_folder, ".json")
+            self.old_cache = build_cache.load_json_file(self.cache_path)
+        self.cache: Dict[str, str] = {}
+        self.stats: Dict[str, PageTypeStats] = defaultdict(PageTypeStats)
+
+    def minify(self, page_type: str, html: str) -> str:
+        """
+        :param page_type: The name of the template the page was rendered from, which its stats are grouped by
+        """
+        start = perf_counter_ns()
+        stats = self.stats[page_type]
+        encoded = html.encode("utf-8")
+        key = hashlib.sha256(f"{MINIFIER_VERSION}\0".encode("utf-8") + encoded).hexdigest()
+        minified = self.cache.get(key)
+        if minified is None:
+            minified = self.old_cache.get(key)
+            if minified is None:
+                minified = minify(html)
+            else:
+                stats.cached += 1
+            if self.cache_path is not None:
+                self.cache[key] = minified
+        else:
+            stats.cached += 1
+        stats.pages += 1
+        stats.original_bytes += len(encoded)
+        stats.minified_bytes += len(minified.encode("utf-8"))
+        stats.time_ns += perf_counter_ns() - start
+        return minified
+
+    def save(self):
+        # Only pages from this build are kept, so the cache doesn't grow forever
+        if self.cache_path is not None and self.cache.keys() != self.old_cache.keys():
+            build_cache.save_json_file(self.cache_path, self.cache, indent=None)
+
+    def get_stats_lines(self) -> List[str]:
+        lines = []
+        for page_type, stats in self.stats.items():
+            saved = stats.original_bytes - stats.minified_bytes
+            percent = saved / stats.original_bytes * 100 if stats.original_bytes else 0
+            lines.append(
+                f"Minified {stats.pages} {page_type} page(s) ({stats.cached} cached): {stats.original_bytes} -> "
+                f"{stats.minified_bytes} bytes ({percent:.1f}% smaller) in {stats.time_ns / 1_000_000:.2f} ms"
+            )
+        return lines
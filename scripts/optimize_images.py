@@ -0,0 +1,240 @@
+"""
+Optionally recompresses comic images before they're published, since they're otherwise served exactly as they were
+uploaded, and unoptimized PNGs are often several times bigger than they need to be.
+
+PNGs are optimized losslessly, and JPEGs are saved as progressive JPEGs with their original quality settings. With
+`Convert to WebP` turned on, both are converted to WebP instead (lossless for PNGs). An optimized copy is only used if
+it's actually smaller than the original. Otherwise, the page keeps using the original image, just like it does for
+images that can't be optimized, like GIFs, SVGs, and animated images.
+
+Optimized images are cached by the hash of the original image's contents and the optimization settings, so images
+that haven't changed are never recompressed. The hash of each original image is remembered by its size and modification
+time, so unchanged images aren't even read again. The cached copies are linked into each page's folder in the comic/
+output folder, and the page's comic_paths point at them. The original images in your_content are never changed.
+
+Enable it with `Optimize images = True` in the [Image Reprocessing] section of comic_info.ini.
+"""
+
+import hashlib
+import os
+import shutil
+from configparser import RawConfigParser
+from typing import Dict, List, Optional, Tuple, Any, TYPE_CHECKING
+
+import build_cache
+import utils
+from build_log import logger
+
+if TYPE_CHECKING:
+    from git_changes import ChangeSet
+
+# Bump this whenever the way images are optimized changes, so cached images are made again
+OPTIMIZER_VERSION = 2
+SECTION = "Image Reprocessing"
+OPTIMIZED_EXTENSIONS = {".png", ".jpg", ".jpeg"}
+# An empty file with this extension is cached for images that couldn't be made any smaller, so they aren't tried again
+UNOPTIMIZED_EXTENSION = ".original"
+
+
+def get_optimize_settings(comic_info: RawConfigParser) -> Optional[Dict[str, Any]]:
+    """
+    :return: The settings that change what optimized images look like, or None if image optimization is turned off
+    """
+    if not comic_info.getboolean(SECTION, "Optimize images", fallback=False):
+        return None
+    return {
+        "version": OPTIMIZER_VERSION,
+        "webp": comic_info.getboolean(SECTION, "Convert to WebP", fallback=False),
+        "webp_quality": comic_info.getint(SECTION, "WebP quality", fallback=90),
+    }
+
+
+def get_optimized_extension(source_path: str, settings: Dict[str, Any]) -> Optional[str]:
+    """
+    :return: The file extension of the optimized copy of the given image, or None if it's a type of image that isn't
+    optimized (e.g. GIFs and SVGs)
+    """
+    ext = os.path.splitext(source_path)[1].lower()
+    if ext not in OPTIMIZED_EXTENSIONS:
+        return None
+    return ".webp" if settings["webp"] else ext
+
+
+def get_file_hash(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class SourceHashCache:
+    """
+    Remembers the hash of each original image between builds by the image's size and modification time, so unchanged
+    images don't have to be read again to look up their optimized copies.
+    """
+
+    def __init__(self, comic_folder: str):
+        self.path = build_cache.get_comic_cache_path("optimized_image_sources", comic_folder, ".json")
+        self.old_entries = build_cache.load_json_file(self.path)
+        # Only images that are still in use are saved, so deleted images don't stay in the cache forever
+        self.entries = {}
+
+    def get(self, source_path: str, unchanged: bool = False) -> str:
+        """
+        :param unchanged: If True, the image is known not to have changed since the last build, so a cached entry is
+        used even if the image's modification time is different
+        :return: The hash of the image's contents
+        """
+        stat = os.stat(source_path)
+        entry = self.old_entries.get(source_path)
+        if entry is not None and unchanged and entry[0] == stat.st_size:
+            entry = [stat.st_size, stat.st_mtime_ns, entry[2]]
+        elif entry is None or entry[0] != stat.st_size or entry[1] != stat.st_mtime_ns:
+            entry = [stat.st_size, stat.st_mtime_ns, get_file_hash(source_path)]
+        self.entries[source_path] = entry
+        return entry[2]
+
+    def save(self):
+        if self.entries != self.old_entries:
+            build_cache.save_json_file(self.path, self.entries, indent=None)
+
+
+def get_cache_key(source_hash: str, settings: Dict[str, Any]) -> str:
+    return build_cache.get_values_fingerprint([settings, source_hash])
+
+
+def optimize_image(source_path: str, output_path: str, settings: Dict[str, Any]) -> bool:
+    """
+    Saves an optimized copy of the image at source_path to output_path.
+    :return: False if the optimized image isn't any smaller, or the image can't be optimized, in which case nothing is
+    saved
+    """
+    from PIL import Image
+
+    temp_path = output_path + ".tmp"
+    try:
+        with Image.open(source_path) as im:
+            # Pillow would only save the first frame of an animated image
+            if getattr(im, "is_animated", False):
+                raise ValueError("Animated images aren't optimized")
+            save_args = {}
+            if "icc_profile" in im.info:
+                save_args["icc_profile"] = im.info["icc_profile"]
+            if settings["webp"]:
+                if im.format == "PNG":
+                    im.save(temp_path, "WEBP", lossless=True, method=6, **save_args)
+                else:
+                    im.save(temp_path, "WEBP", quality=settings["webp_quality"], method=6, **save_args)
+            elif im.format == "PNG":
+                im.save(temp_path, "PNG", optimize=True, **save_args)
+            elif im.format == "JPEG":
+                # "keep" reuses the original image's quantization tables, so the image isn't made any worse
+                im.save(temp_path, "JPEG", quality="keep", optimize=True, progressive=True, **save_args)
+            else:
+                raise ValueError(f"{im.format} images aren't optimized")
+        if os.path.getsize(temp_path) >= os.path.getsize(source_path):
+            os.remove(temp_path)
+            return False
+    except (OSError, ValueError):
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return False
+    # Cached images are only ever complete, even if the build is stopped part way through
+    os.replace(temp_path, output_path)
+    return True
+
+
+def optimize_image_in_worker(args: Tuple[str, str, Dict[str, Any]]) -> bool:
+    return optimize_image(*args)
+
+
+def link_or_copy(source_path: str, output_path: str):
+    if os.path.exists(output_path):
+        os.remove(output_path)
+    try:
+        # The cache and the output folder are almost always on the same drive, so hard links save copying every image
+        os.link(source_path, output_path)
+    except OSError:
+        shutil.copyfile(source_path, output_path)
+
+
+def delete_unused_cached_images(cache_dir: str, used_cache_paths: set):
+    for entry in os.scandir(cache_dir):
+        if entry.path not in used_cache_paths:
+            os.remove(entry.path)
+
+
+def optimize_comic_images(comic_folder: str, comic_info: RawConfigParser, comic_data_dicts: List[Dict],
+                          jobs: Optional[int] = None, changes: Optional["ChangeSet"] = None):
+    """
+    Makes optimized copies of the images for every page in comic_data_dicts, and points each page's comic_paths at
+    them.
+    :param jobs: The number of processes to optimize images with. Only images that aren't cached yet are optimized.
+    :param changes: What's changed since the last build according to git, if known
+    """
+    settings = get_optimize_settings(comic_info)
+    if settings is None:
+        return
+
+    cache_dir = build_cache.get_comic_cache_path("optimized_images", comic_folder, "")
+    build_cache.make_cache_folder(cache_dir)
+    source_hashes = SourceHashCache(comic_folder)
+    # (comic data dict, index in comic_paths, cache path, output path)
+    optimized_images = []
+    used_cache_paths = set()
+    output_paths = set()
+    to_optimize = {}
+    for comic_data in comic_data_dicts:
+        unchanged = changes is not None and changes.is_page_unchanged(comic_folder, comic_data["page_name"])
+        for i, source_path in enumerate(comic_data["comic_paths"]):
+            ext = get_optimized_extension(source_path, settings)
+            if ext is None or not os.path.isfile(source_path):
+                continue
+            cache_key = get_cache_key(source_hashes.get(source_path, unchanged), settings)
+            cache_path = os.path.join(cache_dir, cache_key + ext)
+            unoptimized_path = os.path.join(cache_dir, cache_key + UNOPTIMIZED_EXTENSION)
+            used_cache_paths.update((cache_path, unoptimized_path))
+            if os.path.isfile(unoptimized_path):
+                continue
+            name = os.path.splitext(os.path.basename(source_path))[0]
+            output_path = f"{comic_folder}comic/{comic_data['page_name']}/{name}{ext}"
+            if output_path in output_paths:
+                # e.g. page.png and page.jpg in the same folder, when both are converted to WebP
+                output_path = f"{comic_folder}comic/{comic_data['page_name']}/{os.path.basename(source_path)}{ext}"
+            output_paths.add(output_path)
+            optimized_images.append((comic_data, i, cache_path, output_path))
+            if not os.path.isfile(cache_path):
+                to_optimize[cache_path] = (source_path, cache_path, settings)
+    source_hashes.save()
+
+    if to_optimize:
+        logger.info(f"Optimizing {len(to_optimize)} image(s)")
+        if jobs and jobs > 1 and len(to_optimize) > 1:
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                # list() so any errors in the workers are raised here
+                results = list(executor.map(optimize_image_in_worker, to_optimize.values()))
+        else:
+            results = [optimize_image(*args) for args in to_optimize.values()]
+        for cache_path, optimized in zip(to_optimize, results):
+            if not optimized:
+                # Remembered, so the image isn't tried again next time
+                with open(os.path.splitext(cache_path)[0] + UNOPTIMIZED_EXTENSION, "wb"):
+                    pass
+
+    original_size = optimized_size = optimized_count = 0
+    for comic_data, i, cache_path, output_path in optimized_images:
+        if not os.path.isfile(cache_path):
+            # Couldn't be made any smaller, so the page keeps the original image
+            continue
+        optimized_count += 1
+        original_size += os.path.getsize(comic_data["comic_paths"][i])
+        optimized_size += os.path.getsize(cache_path)
+        os.makedirs(os.path.dirname(utils.output_path(output_path)), exist_ok=True)
+        link_or_copy(cache_path, utils.output_path(output_path))
+        comic_data["comic_paths"][i] = output_path
+    delete_unused_cached_images(cache_dir, used_cache_paths)
+    logger.info(f"Optimized images: {optimized_count} image(s), {len(to_optimize)} recompressed, "
+                f"{original_size} bytes -> {optimized_size} bytes")
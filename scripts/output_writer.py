@@ -0,0 +1,116 @@
+"""
+Writes output files on a small pool of background threads, so pages can be rendered on the main thread without waiting
+for the filesystem, which is slow on some CI runners and network drives.
+
+At most MAX_PENDING_WRITES rendered files are held in memory at once. When that many are waiting to be written,
+write() blocks until one of them has been. Errors are collected instead of raised, and are returned by flush() at the
+end of each build stage, so they can be reported with the files they happened to.
+
+When the build writes into a staging folder, files that are identical to the same file in the last build are hard-linked
+to it instead of written again, so the staging folder costs next to nothing for pages that haven't changed.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import List, Tuple, Set, Optional
+
+WRITER_THREADS = 4
+MAX_PENDING_WRITES = 64
+
+
+class OutputWriteError(Exception):
+    def __init__(self, errors: List[Tuple[str, Exception]]):
+        self.errors = errors
+        super().__init__(
+            f"Failed to write {len(errors)} file(s):\n" + "\n".join(f"{path}: {e!r}" for path, e in errors)
+        )
+
+
+def is_same_file_contents(path: str, contents: bytes) -> bool:
+    try:
+        if os.path.getsize(path) != len(contents):
+            return False
+        with open(path, "rb") as f:
+            return f.read() == contents
+    except OSError:
+        return False
+
+
+def write_file(path: str, contents: bytes, previous_path: Optional[str] = None):
+    """
+    Writes `contents` to `path`. If the file at `previous_path` already has the same contents, it's hard-linked to
+    `path` instead, falling back to writing the file if hard links aren't supported.
+    """
+    if previous_path is not None:
+        # If the file was already linked to the last build's copy, writing to it would change that copy too
+        if os.path.lexists(path):
+            os.remove(path)
+        if is_same_file_contents(previous_path, contents):
+            try:
+                os.link(previous_path, path)
+                return
+            except OSError:
+                pass
+    with open(path, "wb") as f:
+        f.write(contents)
+
+
+class OutputWriter:
+    def __init__(self, threads: int = WRITER_THREADS, max_pending: int = MAX_PENDING_WRITES):
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="output-writer")
+        self.pending_slots = threading.BoundedSemaphore(max_pending)
+        self.lock = threading.Lock()
+        self.pending = set()
+        self.errors: List[Tuple[str, Exception]] = []
+        # Folders that are known to exist, to save calling os.makedirs() for every page in the same folder
+        self.created_folders: Set[str] = set()
+
+    def write(self, path: str, contents: bytes, previous_path: Optional[str] = None):
+        """
+        :param previous_path: The same file in the last build, to hard-link to if it hasn't changed
+        """
+        self.pending_slots.acquire()
+        future = self.executor.submit(self._write, path, contents, previous_path)
+        with self.lock:
+            self.pending.add(future)
+        future.add_done_callback(self._done)
+
+    def _done(self, future):
+        with self.lock:
+            self.pending.discard(future)
+        self.pending_slots.release()
+
+    def _write(self, path: str, contents: bytes, previous_path: Optional[str]):
+        try:
+            folder = os.path.dirname(path)
+            if folder and folder not in self.created_folders:
+                os.makedirs(folder, exist_ok=True)
+                self.created_folders.add(folder)
+            write_file(path, contents, previous_path)
+        except Exception as e:
+            with self.lock:
+                self.errors.append((path, e))
+
+    def flush(self) -> List[Tuple[str, Exception]]:
+        """
+        Waits for every file handed to write() so far to be written.
+        :return: The path and the exception of every file that couldn't be written since the last flush
+        """
+        with self.lock:
+            pending = list(self.pending)
+        wait(pending)
+        with self.lock:
+            errors, self.errors = self.errors, []
+        return errors
+
+    def flush_or_raise(self):
+        errors = self.flush()
+        if errors:
+            raise OutputWriteError(errors)
+
+    def close(self):
+        try:
+            self.flush_or_raise()
+        finally:
+            self.executor.shutdown()
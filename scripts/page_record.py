@@ -0,0 +1,147 @@
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterator, Optional
+
+# The keys that every comic page has, which are stored in slots instead of a per-page dict. These are the same names
+# that templates and hooks have always used to look up values in a comic data dict.
+CORE_KEYS = (
+    "page_name",
+    "page_title",
+    "_title",
+    "_post_date",
+    "_post_datetime",
+    "_alt_text",
+    "_storyline",
+    "_characters",
+    "_tags",
+    "_image_file_names",
+    "_image_dimensions",
+    "_transcript_languages",
+    "_on_comic_click",
+    "archive_post_date",
+    "comic_paths",
+    "thumbnail_path",
+    "escaped_alt_text",
+    "first_id",
+    "previous_id",
+    "current_id",
+    "next_id",
+    "last_id",
+    "post_html",
+    "transcripts",
+)
+_CORE_KEY_SET = frozenset(CORE_KEYS)
+
+
+class PageRecord(MutableMapping):
+    """
+    A compact record of the data for one comic page, which is what build_site.py passes around as a "comic data dict".
+
+    The core values that every page has are stored in slots. Any other values, like user-defined options from the
+    page's info.ini file or values added by hooks, are stored in the `user_values` dict. Once global values are
+    attached with `add_global_values()`, they can also be looked up through the record, without being copied into it.
+
+    PageRecord behaves like a dict, so Jinja2 templates and hooks can keep using `page._title`, `page["page_name"]`,
+    `page.get("_tags", [])`, `dict(page)`, and so on.
+    """
+    __slots__ = CORE_KEYS + ("user_values", "global_values")
+
+    def __init__(self, values: Optional[Dict[str, Any]] = None, **kwargs):
+        self.user_values = {}
+        self.global_values = None
+        if values:
+            self.update(values)
+        if kwargs:
+            self.update(kwargs)
+
+    def __getitem__(self, key: str) -> Any:
+        if key in _CORE_KEY_SET:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                pass
+        elif key in self.user_values:
+            return self.user_values[key]
+        if self.global_values is not None:
+            return self.global_values[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any):
+        if key in _CORE_KEY_SET:
+            setattr(self, key, value)
+        else:
+            self.user_values[key] = value
+
+    def __delitem__(self, key: str):
+        if key in _CORE_KEY_SET:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        else:
+            del self.user_values[key]
+
+    def __contains__(self, key: object) -> bool:
+        if key in _CORE_KEY_SET:
+            if hasattr(self, key):
+                return True
+        elif key in self.user_values:
+            return True
+        return self.global_values is not None and key in self.global_values
+
+    def own_keys(self) -> Iterator[str]:
+        """
+        The keys stored in this record, not counting any attached global values
+        """
+        for key in CORE_KEYS:
+            if hasattr(self, key):
+                yield key
+        yield from self.user_values
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self.own_keys()
+        if self.global_values is not None:
+            own_key_set = self._own_key_set()
+            for key in self.global_values:
+                if key not in own_key_set:
+                    yield key
+
+    def _own_key_set(self):
+        return {key for key in CORE_KEYS if hasattr(self, key)} | self.user_values.keys()
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({dict(self.own_items())!r})"
+
+    def own_items(self) -> Iterator[tuple]:
+        for key in self.own_keys():
+            yield key, self[key]
+
+    def add_global_values(self, global_values: Dict[str, Any]):
+        """
+        Makes the global template values visible through this record. This replaces `comic_data_dict.update(
+        global_values)`, and keeps the same precedence: a global value replaces a page value with the same name.
+        """
+        for key in self._own_key_set() & global_values.keys():
+            self[key] = global_values[key]
+        self.global_values = global_values
+
+    def copy(self) -> "PageRecord":
+        new_record = PageRecord(dict(self.own_items()))
+        new_record.global_values = self.global_values
+        return new_record
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Flattens this record and its global values into a plain dict, which is much faster for Jinja2 to render from.
+        Own values are added last, since colliding global values were already copied in by add_global_values().
+        """
+        d = dict(self.global_values) if self.global_values is not None else {}
+        for key in CORE_KEYS:
+            try:
+                d[key] = getattr(self, key)
+            except AttributeError:
+                pass
+        d.update(self.user_values)
+        return d
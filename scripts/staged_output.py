@@ -0,0 +1,114 @@
+"""
+Builds the site into a staging folder instead of the live site, and swaps the staged files into place once the whole
+build has succeeded. Until then, the live site is left exactly as the last build left it, so a build that fails halfway
+never leaves the site half-deleted, and a dev server or deploy that reads the site mid-build never sees missing pages.
+
+Files that haven't changed since the last build are hard-linked from the live site into the staging folder instead of
+being written again (see output_writer.write_file()), so building into the staging folder and swapping it into place
+costs next to nothing extra, even for comics with thousands of pages.
+
+The staging folder is kept in the cache folder, so it's never mistaken for part of the site if a build is interrupted.
+It's deleted at the start of the next build.
+"""
+
+import os
+import shutil
+from typing import Iterable, Set
+
+from build_cache import CACHE_DIRECTORY, make_cache_folder
+from build_log import logger
+
+STAGING_FOLDER = os.path.join(CACHE_DIRECTORY, "staging")
+# The last build's files are moved here while they're swapped out, and then deleted
+PREVIOUS_FOLDER = os.path.join(CACHE_DIRECTORY, "previous_output")
+
+
+def remove_path(path: str):
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path)
+    elif os.path.lexists(path):
+        os.remove(path)
+
+
+def start_staging() -> str:
+    """
+    Creates an empty staging folder, deleting anything left over from an interrupted build.
+    :return: The path to the staging folder
+    """
+    remove_path(STAGING_FOLDER)
+    remove_path(PREVIOUS_FOLDER)
+    make_cache_folder(STAGING_FOLDER)
+    return STAGING_FOLDER
+
+
+def link_previous_file(path: str) -> bool:
+    """
+    Hard-links a file from the live site into the staging folder, for output files that don't need to be built again.
+    Falls back to copying the file if hard links aren't supported.
+    :param path: The path of the file, relative to the root of the site
+    :return: False if the file isn't in the live site
+    """
+    if not os.path.isfile(path):
+        return False
+    staged_path = os.path.join(STAGING_FOLDER, path)
+    os.makedirs(os.path.dirname(staged_path), exist_ok=True)
+    # e.g. a tag page written by an extra comic, which the main comic's copy from the last build replaces
+    if os.path.lexists(staged_path):
+        os.remove(staged_path)
+    try:
+        os.link(path, staged_path)
+    except OSError:
+        shutil.copyfile(path, staged_path)
+    return True
+
+
+def swap_staged_output(output_paths: Iterable[str]):
+    """
+    Moves every output file and folder from the staging folder into the live site. Output paths that weren't built
+    this time are deleted from the live site. Single files are replaced atomically, and folders are swapped with two
+    renames, so each one is only missing for an instant.
+
+    Anything else in the staging folder, like pages written by a theme's hooks, is moved into the live site file by
+    file, so nothing else in the folders it's written to is deleted.
+    :param output_paths: Every file and folder the build writes, relative to the root of the site
+    """
+    output_paths = list(output_paths)
+    for path in output_paths:
+        staged_path = os.path.join(STAGING_FOLDER, path)
+        staged_is_file = os.path.isfile(staged_path)
+        if staged_is_file and not os.path.isdir(path):
+            os.replace(staged_path, path)
+            continue
+        if os.path.lexists(path):
+            previous_path = os.path.join(PREVIOUS_FOLDER, path)
+            os.makedirs(os.path.dirname(previous_path), exist_ok=True)
+            os.rename(path, previous_path)
+        if os.path.lexists(staged_path):
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.rename(staged_path, path)
+    swapped_paths = {os.path.normpath(path) for path in output_paths}
+    for folder, _, files in os.walk(STAGING_FOLDER):
+        for file in files:
+            staged_path = os.path.join(folder, file)
+            path = os.path.relpath(staged_path, STAGING_FOLDER)
+            if is_in_paths(path, swapped_paths):
+                continue
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(staged_path, path)
+    logger.debug("Swapped the staged build into place")
+    discard_staged_output()
+
+
+def is_in_paths(path: str, paths: Set[str]) -> bool:
+    while path:
+        if path in paths:
+            return True
+        path = os.path.dirname(path)
+    return False
+
+
+def discard_staged_output():
+    remove_path(STAGING_FOLDER)
+    remove_path(PREVIOUS_FOLDER)
@@ -0,0 +1,142 @@
+"""
+The `storylines` template variable. Instead of a list of pages per storyline, each storyline holds ranges of indexes into
+the one ordered list of comic data dicts, along with its first page, last page, and page count, so building it costs
+next to nothing however many pages the comic has.
+
+Storylines still act like lists of pages in templates, so `{% for page in pages %}`, `pages[0]`, and `pages | length`
+all work as they always have, and `pages.first`, `pages.last`, and `pages.count` are there too.
+"""
+
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, Optional
+
+UNCATEGORIZED = "Uncategorized"
+
+
+class Storyline:
+    def __init__(self, name: str, pages: List[Dict], ranges: List[List[int]]):
+        """
+        :param pages: The full, ordered list of pages that the ranges index into
+        :param ranges: [start, stop) ranges of indexes into pages, in the order the storyline's pages are in
+        """
+        self.name = name
+        self.pages = pages
+        self.ranges = ranges
+        self.count = sum(stop - start for start, stop in ranges)
+        self.first: Optional[Dict] = pages[ranges[0][0]] if self.count else None
+        self.last: Optional[Dict] = pages[ranges[-1][1] - 1] if self.count else None
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __bool__(self) -> bool:
+        return self.count > 0
+
+    def __iter__(self) -> Iterator[Dict]:
+        for start, stop in self.ranges:
+            for i in range(start, stop):
+                yield self.pages[i]
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return list(self)[i]
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError("storyline index out of range")
+        for start, stop in self.ranges:
+            if i < stop - start:
+                return self.pages[start + i]
+            i -= stop - start
+
+    def __repr__(self) -> str:
+        return f"Storyline({self.name!r}, {self.count} pages)"
+
+
+class StorylineIndex(Mapping):
+    """
+    An ordered mapping of storyline names to Storylines.
+    """
+
+    def __init__(self, storylines: "OrderedDict[str, Storyline]"):
+        self.storylines = storylines
+
+    def __getitem__(self, name: str) -> Storyline:
+        return self.storylines[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.storylines)
+
+    def __len__(self) -> int:
+        return len(self.storylines)
+
+    def __repr__(self) -> str:
+        return f"StorylineIndex({list(self.storylines.values())!r})"
+
+    @classmethod
+    def build(cls, pages: List[Dict], show_uncategorized: bool = True) -> "StorylineIndex":
+        """
+        :param pages: Comic data dicts, in order
+        :param show_uncategorized: If False, pages without a storyline are left out, instead of being put in an
+        "Uncategorized" storyline at the end
+        """
+        ranges = OrderedDict()
+        for i, page in enumerate(pages):
+            name = page["_storyline"]
+            if not name:
+                if not show_uncategorized:
+                    continue
+                name = UNCATEGORIZED
+            storyline_ranges = ranges.setdefault(name, [])
+            if storyline_ranges and storyline_ranges[-1][1] == i:
+                storyline_ranges[-1][1] = i + 1
+            else:
+                storyline_ranges.append([i, i + 1])
+        if UNCATEGORIZED in ranges:
+            ranges.move_to_end(UNCATEGORIZED)
+        return cls(OrderedDict((name, Storyline(name, pages, r)) for name, r in ranges.items()))
+
+    def to_dict(self) -> "OrderedDict[str, List[Dict]]":
+        """
+        :return: The storylines as an OrderedDict of storyline names to lists of pages, as they used to be
+        """
+        return OrderedDict((name, list(storyline)) for name, storyline in self.storylines.items())
+
+    @classmethod
+    def from_dict(cls, pages: List[Dict], storylines_dict: Mapping) -> "StorylineIndex":
+        """
+        Turns a dict of storyline names to lists of pages back into a StorylineIndex. Pages that are in `pages` are
+        stored as ranges into it. Storylines with any other pages in them, like copies of pages, keep their own list.
+        """
+        positions = {id(page): i for i, page in enumerate(pages)}
+        storylines = OrderedDict()
+        for name, storyline_pages in storylines_dict.items():
+            indexes = [positions.get(id(page)) for page in storyline_pages]
+            if None in indexes:
+                storyline_pages = list(storyline_pages)
+                storylines[name] = Storyline(name, storyline_pages, [[0, len(storyline_pages)]])
+                continue
+            ranges = []
+            for i in indexes:
+                if ranges and ranges[-1][1] == i:
+                    ranges[-1][1] = i + 1
+                else:
+                    ranges.append([i, i + 1])
+            storylines[name] = Storyline(name, pages, ranges)
+        return cls(storylines)
+
+
+def from_hook_result(pages: List[Dict], storylines: Any) -> Any:
+    """
+    Turns whatever the extra_get_storylines_processing() hook returned back into a StorylineIndex, if it's still a dict
+    of storyline names to lists of pages. Anything else, like a dict of volumes to dicts of chapters, is passed to the
+    templates as it is.
+    """
+    if isinstance(storylines, StorylineIndex):
+        return storylines
+    if isinstance(storylines, Mapping) and all(
+            isinstance(pages_list, list) and all(isinstance(page, Mapping) for page in pages_list)
+            for pages_list in storylines.values()):
+        return StorylineIndex.from_dict(pages, storylines)
+    return storylines
@@ -1,25 +1,53 @@
 import os
 import re
 from configparser import RawConfigParser
-from time import strftime
-from typing import List, Dict, Optional
+from datetime import datetime, tzinfo
+from typing import List, Dict, Optional, TYPE_CHECKING
 
-from jinja2 import Environment, FileSystemLoader, StrictUndefined, TemplateNotFound
-from markdown2 import Markdown
+from build_log import logger
+from page_record import PageRecord
 
-jinja_environment: Optional[Environment] = None
-markdown_parser: Optional[Markdown] = None
+if TYPE_CHECKING:
+    from jinja2 import Environment
+    from markdown2 import Markdown
+    from minify_html import HtmlMinifier
+    from output_writer import OutputWriter
+
+jinja_environment: Optional["Environment"] = None
+markdown_parser: Optional["Markdown"] = None
+# Original paths of CSS and JS files -> paths of their content-hashed copies, set by build_assets.build_assets()
+asset_urls: Dict[str, str] = {}
+# Set by build_site.py when `Minify HTML` is turned on
+html_minifier: Optional["HtmlMinifier"] = None
+# Set by build_site.py while writing HTML files, so they're written on background threads
+output_writer: Optional["OutputWriter"] = None
+# Set by build_site.py to the staging folder that the build is written into, before it's swapped into place. Paths of
+# output files are always relative to the root of the site, and are turned into paths in this folder by output_path().
+output_directory: str = ""
 
 
 def build_jinja_environment(comic_info: RawConfigParser, template_folders: List[str]):
+    from jinja2 import Environment, FileSystemLoader, StrictUndefined
+
     global jinja_environment
     if comic_info.getboolean("Comic Settings", "Allow missing variables in templates", fallback=False):
         jinja_environment = Environment(loader=FileSystemLoader(template_folders))  # noqa
     else:
         jinja_environment = Environment(loader=FileSystemLoader(template_folders), undefined=StrictUndefined)  # noqa
+    jinja_environment.globals["asset_url"] = asset_url
+
+
+def asset_url(path: str) -> str:
+    """
+    :param path: The path to a CSS or JS file from the root of the site, e.g. "comic_git_engine/css/base.css"
+    :return: The path to the content-hashed copy of that file, or the path as it is if there isn't one
+    """
+    return asset_urls.get(path, path)
 
 
 def build_markdown_parser(comic_info: RawConfigParser):
+    from markdown2 import Markdown
+
     global markdown_parser
     extras = comic_info.get("Comic Settings", "Markdown extras", fallback="")
     markdown_parser = Markdown(extras=["metadata"] + str_to_list(extras))
@@ -61,10 +89,50 @@ def get_comic_url(comic_info: RawConfigParser):
     if base_directory:
         base_directory = "/" + base_directory
     comic_url = comic_domain + base_directory
-    print(f"Base URL: {comic_url}, base subdirectory: {base_directory}")
+    logger.info(f"Base URL: {comic_url}, base subdirectory: {base_directory}")
     return comic_url, base_directory
 
 
+def output_path(path: str) -> str:
+    """
+    :param path: The path of an output file, relative to the root of the site, e.g. "comic/page_info_list.json"
+    :return: The path that file should be written to while the site is being built
+    """
+    return os.path.join(output_directory, path) if output_directory else path
+
+
+def write_output_file(path: str, contents: bytes):
+    """
+    Writes an output file, creating its folder if needed. If the build is being written into a staging folder and the
+    live copy of the file hasn't changed, it's hard-linked instead.
+    :param path: The path of the output file, relative to the root of the site
+    """
+    from output_writer import write_file
+
+    staged_path = output_path(path)
+    dir_name = os.path.dirname(staged_path)
+    if dir_name:
+        os.makedirs(dir_name, exist_ok=True)
+    write_file(staged_path, contents, path if output_directory else None)
+
+
+def open_output_file(path: str):
+    """
+    Opens an output file to be written bit by bit, for files that are too big to build in memory first, creating its
+    folder if needed.
+    :param path: The path of the output file, relative to the root of the site
+    :return: The file, opened for writing in binary mode
+    """
+    staged_path = output_path(path)
+    dir_name = os.path.dirname(staged_path)
+    if dir_name:
+        os.makedirs(dir_name, exist_ok=True)
+    # If the file was hard-linked to the last build's copy, writing to it would change that copy too
+    if os.path.lexists(staged_path):
+        os.remove(staged_path)
+    return open(staged_path, "wb")
+
+
 def str_to_list(s: str, delimiter: str=",") -> List[str]:
     """
     split(), but with extra stripping of white space and leading/trailing delimiters
@@ -77,6 +145,17 @@ def str_to_list(s: str, delimiter: str=",") -> List[str]:
     return [item.strip(" ") for item in s.strip(delimiter + " ").split(delimiter)]
 
 
+def get_cpu_count() -> int:
+    """
+    The number of CPUs this process is allowed to run on, which can be fewer than the machine has (e.g. in containers)
+    """
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        # sched_getaffinity isn't available on Windows or macOS
+        return os.cpu_count() or 1
+
+
 def find_project_root():
     while not os.path.exists("your_content"):
         last_cwd = os.getcwd()
@@ -124,12 +203,18 @@ def write_to_template(template_name: str, html_path: str, data_dict: Dict=None)
     directory (e.g. ...github.io/comic_git/cool_stuff/), then add "index.html" at the end.
     (e.g., "cool_stuff/index.html")
     :param data_dict: The dictionary of values to pass to the template when it's rendered.
-    :return: None
+    :return: None. If `output_writer` is set, the file is written in the background, and any error writing it is
+    returned by `output_writer.flush()` instead of being raised here.
     """
+    from jinja2 import TemplateNotFound
+
     if jinja_environment is None:
         raise RuntimeError("Jinja environment was not initialized before write_to_template was called.")
     if data_dict is None:
         data_dict = {}
+    elif isinstance(data_dict, PageRecord):
+        # Jinja2 renders much faster from a plain dict
+        data_dict = data_dict.to_dict()
     file_contents = build_md_page(template_name, data_dict)
     if file_contents is None:
         for ext in (".html", ".tpl"):
@@ -141,18 +226,104 @@ def write_to_template(template_name: str, html_path: str, data_dict: Dict=None)
         else:
             raise TemplateNotFound(f"Template matching '{template_name}' not found")
 
-    dir_name = os.path.dirname(html_path)
-    if dir_name:
-        os.makedirs(dir_name, exist_ok=True)
-    t = strftime("%Y-%m-%d %H:%M:%S")
-    print(f"[{t}] Writing {html_path}")
-    with open(html_path, "wb") as f:
-        f.write(bytes(file_contents, "utf-8"))
+    if html_minifier is not None:
+        file_contents = html_minifier.minify(template_name, file_contents)
+
+    logger.debug("Writing %s", html_path)
+    if output_writer is not None:
+        output_writer.write(output_path(html_path), bytes(file_contents, "utf-8"),
+                            html_path if output_directory else None)
+        return
+    write_output_file(html_path, bytes(file_contents, "utf-8"))
+
+
+# Date formats that datetime.fromisoformat() can parse much faster than datetime.strptime()
+ISO_DATE_FORMATS = {"%Y-%m-%d", "%Y-%m-%d %H:%M", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M", "%Y-%m-%dT%H:%M:%S"}
+
+
+def parse_post_date(post_date: str, date_format: str, tz_info: Optional[tzinfo] = None) -> datetime:
+    """
+    Parses a "Post date" value from an info.ini file. If the date format is a plain ISO-8601 format, the faster
+    datetime.fromisoformat() is tried first. It accepts much more than the date format does, like dates without times
+    and UTC offsets, so its result is only used if it's written exactly the same way in the date format. Otherwise,
+    datetime.strptime() decides, just as it does for every other date format.
+    :param post_date: The date string to parse
+    :param date_format: The "Date format" value from the [Comic Settings] section of comic_info.ini
+    :param tz_info: A pytz timezone to attach to the parsed date. If None, the returned date will be naive.
+    :return: The parsed datetime
+    """
+    dt = None
+    if date_format in ISO_DATE_FORMATS:
+        try:
+            dt = datetime.fromisoformat(post_date)
+        except ValueError:
+            pass
+        else:
+            if dt.tzinfo is not None or dt.strftime(date_format) != post_date:
+                dt = None
+    if dt is None:
+        dt = datetime.strptime(post_date, date_format)
+    if tz_info is not None and dt.tzinfo is None:
+        dt = tz_info.localize(dt)
+    return dt
+
+
+# The same patterns RawConfigParser uses for option lines and section headers, with its default "=" and ":" delimiters
+INFO_OPTION_PATTERN = re.compile(r"(?P<option>.*?)\s*(?P<vi>[=:])\s*(?P<value>.*)$")
+INFO_SECTION_PATTERN = re.compile(r"\[(?P<header>.+)]")
+
+
+def parse_info_string(info_string: str) -> Optional[Dict[str, str]]:
+    """
+    A lightweight parser for info.ini files that contain a single set of options and no section header, which is what
+    nearly every info.ini file looks like. It gives the same results as read_info() does with RawConfigParser for
+    these files, including full-line comments and multi-line values, but is much faster than creating a new
+    RawConfigParser for every page.
+    :param info_string: The contents of the info.ini file
+    :return: A dict of the options in the file, or None if the file contains anything this parser doesn't handle
+    (section headers, options without values, duplicate options), in which case RawConfigParser should be used instead.
+    """
+    values: Dict[str, List[str]] = {}
+    option = None
+    indent_level = 0
+    for line in info_string.split("\n"):
+        stripped_line = line.strip()
+        if not stripped_line:
+            # Empty lines are kept in multi-line values, then stripped from the end of the value afterwards
+            if option is not None:
+                values[option].append("")
+            continue
+        if stripped_line[0] in "#;":
+            continue
+        cur_indent_level = len(line) - len(line.lstrip())
+        if option is not None and cur_indent_level > indent_level:
+            # Continuation of a multi-line value
+            values[option].append(stripped_line)
+            continue
+        indent_level = cur_indent_level
+        if INFO_SECTION_PATTERN.match(stripped_line):
+            return None
+        m = INFO_OPTION_PATTERN.match(stripped_line)
+        if m is None:
+            return None
+        option = m.group("option")
+        if not option or option in values:
+            return None
+        values[option] = [m.group("value")]
+    return {k: "\n".join(v).rstrip() for k, v in values.items()}
 
 
 def read_info(filepath, to_dict=False):
     with open(filepath, "rb") as f:
         info_string = f.read().decode("utf-8")
+    if to_dict:
+        info = parse_info_string(info_string)
+        if info is not None:
+            return info
+    return read_info_string(info_string, to_dict)
+
+
+def read_info_string(info_string: str, to_dict=False):
     if not re.search(r"^\[.*?]", info_string):
         # print(filepath + " has no section")
         info_string = "[DEFAULT]\n" + info_string
@@ -28,12 +28,12 @@
     {%- block head %}
     <meta charset="UTF-8">
     <link rel="preconnect" href="https://fonts.gstatic.com">
-    <link rel="stylesheet" type="text/css" href="{{ base_dir }}/your_content/themes/{{ theme }}/css/fonts.css">
-    <link rel="stylesheet" type="text/css" href="{{ base_dir }}/comic_git_engine/css/base.css">
-    <link rel="stylesheet" type="text/css" href="{{ base_dir }}/your_content/themes/{{ theme }}/css/stylesheet.css">
+    <link rel="stylesheet" type="text/css" href="{{ base_dir }}/{{ asset_url("your_content/themes/" ~ theme ~ "/css/fonts.css") }}">
+    <link rel="stylesheet" type="text/css" href="{{ base_dir }}/{{ asset_url("comic_git_engine/css/base.css") }}">
+    <link rel="stylesheet" type="text/css" href="{{ base_dir }}/{{ asset_url("your_content/themes/" ~ theme ~ "/css/stylesheet.css") }}">
     {%- if comic_folder != "" %}
     {# Allows for setting specific CSS for an extra comic. #}
-    <link rel="stylesheet" type="text/css" href="{{ base_dir }}/your_content/themes/{{ theme }}/css/{{ comic_folder.strip('/') }}.css">
+    <link rel="stylesheet" type="text/css" href="{{ base_dir }}/{{ asset_url("your_content/themes/" ~ theme ~ "/css/" ~ comic_folder.strip("/") ~ ".css") }}">
     {%- endif %}
     <link rel="icon" href="{{ base_dir }}/favicon.ico" type="image/x-icon" />
     <meta property="og:title" content="{{ comic_title }}" />
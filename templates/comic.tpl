@@ -7,7 +7,7 @@
        next line is added to the end. #}
     {{- super() }}
     <link rel="next" href="{{ comic_base_dir }}/comic/{{ next_id }}/">
-    <link rel="stylesheet" type="text/css" href="{{ base_dir }}/comic_git_engine/css/comic.css">
+    <link rel="stylesheet" type="text/css" href="{{ base_dir }}/{{ asset_url("comic_git_engine/css/comic.css") }}">
 {%- endblock %}
 {# This is the start of the `content` block. It's part of the <body> of the page. This is where all the visible
    parts of the website after the links bar and before the "Powered by comic_git" footer go. #}
@@ -34,13 +34,21 @@
         {% else %}
         <a href="{{ comic_base_dir }}/comic/{{ next_id }}/#comic-page">
         {% endif %}
-            <img class="comic-image" src="{{ base_dir }}/{{ comic_path }}" title="{{ escaped_alt_text }}"/>
+            {#- Setting the image's size lets the browser lay out the page before the image has downloaded. Pages
+                can have more than one image, and only the first one will be on screen right away, so the rest are
+                only downloaded when they're about to be scrolled into view. #}
+            {%- set dimensions = _image_dimensions[loop.index0]
+                if _image_dimensions is defined and _image_dimensions|length > loop.index0 else None %}
+            <img class="comic-image" src="{{ base_dir }}/{{ comic_path }}" title="{{ escaped_alt_text }}"
+                {%- if dimensions %} width="{{ dimensions[0] }}" height="{{ dimensions[1] }}"{% endif %}
+                {%- if not loop.first %} loading="lazy"{% endif %}/>
         </a>
         {%- endfor %}
     </div>
 
     <div id="comic-page-overlay" hidden>
-        <img id="comic-overlay-image" src="{{ base_dir }}/{{ comic_paths[0] }}" title="{{ escaped_alt_text }}"/>
+        <img id="comic-overlay-image" src="{{ base_dir }}/{{ comic_paths[0] }}" title="{{ escaped_alt_text }}"
+             loading="lazy"/>
     </div>
     {% endif %}
 
@@ -118,10 +126,10 @@
 {%- endblock %}
 {%- block script %}
 <script type="module">
-    import { init_overlay } from "{{ base_dir }}/comic_git_engine/js/comic.js";
+    import { init_overlay } from "{{ base_dir }}/{{ asset_url("comic_git_engine/js/comic.js") }}";
     init_overlay();
 {% if transcripts %}
-    import { init_transcript } from "{{ base_dir }}/comic_git_engine/js/transcript.js";
+    import { init_transcript } from "{{ base_dir }}/{{ asset_url("comic_git_engine/js/transcript.js") }}";
     init_transcript();
 {% endif %}
 </script>
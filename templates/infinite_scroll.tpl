@@ -6,7 +6,7 @@
     {# `super()` means that everything that's currently in the `head` block in base.tpl is added first, and then the
        next line is added to the end. #}
     {{- super() }}
-    <link rel="stylesheet" type="text/css" href="{{ base_dir }}/comic_git_engine/css/infinite_scroll.css">
+    <link rel="stylesheet" type="text/css" href="{{ base_dir }}/{{ asset_url("comic_git_engine/css/infinite_scroll.css") }}">
 {%- endblock %}
 {# This is the start of the `content` block. It's part of the <body> of the page. This is where all the visible
    parts of the website after the links bar and before the "Powered by comic_git" footer go. #}
@@ -21,13 +21,13 @@
         {%- for name, pages in storylines.items() %}
             {# When text is surrounded by {{ these double curly braces }}, it's representing a variable that's passed in by
                the Python script that generates the HTML file. That value is dropped into the existing HTML with no changes.
-               For example, if `pages` is a list of items and the first item has a variable on it called `page_name`,
-               and the value of that is `Chapter 3`, then `href="#{{ pages[0].page_name }}"` becomes
+               For example, if `pages` is a storyline whose first page has a variable on it called `page_name`,
+               and the value of that is `Chapter 3`, then `href="#{{ pages.first.page_name }}"` becomes
                `href="#Chapter 3"` #}
             {%- if name != "Uncategorized" %}
             {# `| replace(" ", "-")` takes the value in the variable, in this case `name`, and replaces all
                spaces with hyphens. This is important when building links to other parts of the site. #}
-            <a class="button chapter-links" href="#{{ pages[0].page_name }}" id="infinite-scroll-{{ name | replace(' ', '-') }}">{{ name }}</a>
+            <a class="button chapter-links" href="#{{ pages.first.page_name }}" id="infinite-scroll-{{ name | replace(' ', '-') }}">{{ name }}</a>
             {%- endif %}
         {%- endfor %}
     </div>
@@ -45,7 +45,7 @@
 {% endblock %}
 {% block script %}
 <script type="module">
-    import { load_page } from "{{ base_dir }}/comic_git_engine/js/infinite_scroll.js";
+    import { load_page } from "{{ base_dir }}/{{ asset_url("comic_git_engine/js/infinite_scroll.js") }}";
     load_page("{{ comic_base_dir }}", "{{ content_base_dir }}");
 </script>
 {% endblock %}
@@ -0,0 +1,27 @@
+{# This template extends the base.tpl template, meaning that base.tpl provides a large framework
+   that this template then adds to. See base.tpl for more information. #}
+{% extends "base.tpl" %}
+{# This is the start of the `content` block. It's part of the <body> of the page. This is where all the visible
+   parts of the website after the links bar and before the "Powered by comic_git" footer go. #}
+{% block content %}
+    <h1 id="post-title">{{ _title }}</h1>
+
+    <div id="blurb">
+        {# The search page only works if the search index is being built. To turn it on, add a [Search] section to
+           your comic_info.ini file with `Build search index = True` in it. #}
+        <form id="search-form">
+            <input type="search" id="search-input" name="q" aria-label="Search">
+            <button type="submit">Search</button>
+        </form>
+        <p id="search-status"></p>
+        <div id="tagged">
+            <ul id="search-results"></ul>
+        </div>
+    </div>
+{% endblock %}
+{% block script %}
+<script type="module">
+    import { load_page } from "{{ base_dir }}/{{ asset_url("comic_git_engine/js/search.js") }}";
+    load_page("{{ comic_base_dir }}");
+</script>
+{% endblock %}
@@ -0,0 +1,80 @@
+import os
+from configparser import RawConfigParser
+
+from scripts import build_assets, utils
+from working_directory import TempDirTestCase
+
+
+class TestBuildAssets(TempDirTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.write("comic_git_engine/css/base.css", 'body { background: url("../img/bg.png?v=1"); }\n'
+                                                    '@import "other.css";\n'
+                                                    '.a { background: url(data:image/png;base64,AAAA); }')
+        self.write("comic_git_engine/css/other.css", "p { color: red; }")
+        self.write("comic_git_engine/js/main.js", 'import { f } from "./utils.js";\nimport "https://example.com/x.js";')
+        self.write("comic_git_engine/js/utils.js", "export function f() {}")
+        self.write("your_content/themes/default/css/stylesheet.css", "h1 { color: blue; }")
+        self.comic_info = RawConfigParser()
+
+    @staticmethod
+    def write(path, text):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text)
+
+    @staticmethod
+    def read(path):
+        with open(path) as f:
+            return f.read()
+
+    def test_build_assets(self):
+        hashed_paths = build_assets.build_assets(self.comic_info)
+        self.assertEqual({
+            "comic_git_engine/css/base.css", "comic_git_engine/css/other.css", "comic_git_engine/js/main.js",
+            "comic_git_engine/js/utils.js", "your_content/themes/default/css/stylesheet.css",
+        }, hashed_paths.keys())
+        self.assertRegex(hashed_paths["comic_git_engine/css/other.css"],
+                         r"^assets/comic_git_engine/css/other\.[0-9a-f]{10}\.css$")
+        for hashed_path in hashed_paths.values():
+            self.assertTrue(os.path.isfile(hashed_path))
+
+        other_name = os.path.basename(hashed_paths["comic_git_engine/css/other.css"])
+        self.assertEqual(
+            'body { background: url("../../../comic_git_engine/img/bg.png?v=1"); }\n'
+            f'@import "./{other_name}";\n'
+            '.a { background: url(data:image/png;base64,AAAA); }',
+            self.read(hashed_paths["comic_git_engine/css/base.css"])
+        )
+        utils_name = os.path.basename(hashed_paths["comic_git_engine/js/utils.js"])
+        self.assertEqual(
+            f'import {{ f }} from "./{utils_name}";\nimport "https://example.com/x.js";',
+            self.read(hashed_paths["comic_git_engine/js/main.js"])
+        )
+
+    def test_hashes_follow_contents(self):
+        first = build_assets.build_assets(self.comic_info)
+        self.assertEqual(first, build_assets.build_assets(self.comic_info))
+        # Changing a file changes its hash, and the hash of every file that imports it
+        self.write("comic_git_engine/js/utils.js", "export function f() { return 1; }")
+        second = build_assets.build_assets(self.comic_info)
+        self.assertNotEqual(first["comic_git_engine/js/utils.js"], second["comic_git_engine/js/utils.js"])
+        self.assertNotEqual(first["comic_git_engine/js/main.js"], second["comic_git_engine/js/main.js"])
+        self.assertEqual(first["comic_git_engine/css/base.css"], second["comic_git_engine/css/base.css"])
+
+    def test_import_cycle(self):
+        self.write("comic_git_engine/js/utils.js", 'import { g } from "./main.js";\nexport function f() {}')
+        hashed_paths = build_assets.build_assets(self.comic_info)
+        # One side of the cycle has to import the original file
+        texts = [self.read(hashed_paths[f"comic_git_engine/js/{name}.js"]) for name in ("main", "utils")]
+        self.assertTrue(any('"../../../comic_git_engine/js/' in text for text in texts))
+
+    def test_asset_url(self):
+        utils.asset_urls = build_assets.build_assets(self.comic_info)
+        try:
+            self.assertRegex(utils.asset_url("comic_git_engine/css/base.css"), r"^assets/.*\.css$")
+            self.assertEqual("your_content/themes/default/css/fonts.css",
+                             utils.asset_url("your_content/themes/default/css/fonts.css"))
+        finally:
+            utils.asset_urls = {}
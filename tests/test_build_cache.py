@@ -0,0 +1,122 @@
+import os
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+from scripts import build_cache
+from scripts.page_record import PageRecord
+from working_directory import TempDirTestCase
+
+
+class TestBuildCache(TempDirTestCase):
+
+    def setUp(self):
+        super().setUp()
+        os.makedirs("your_content/comics/Page 1")
+        with open("your_content/comics/Page 1/info.ini", "w") as f:
+            f.write("Title = Page 1\n")
+
+    def test_get_input_fingerprint(self):
+        build_args = {"publish_all_comics": False}
+        fingerprint = build_cache.get_input_fingerprint(build_args)
+        self.assertEqual(fingerprint, build_cache.get_input_fingerprint(build_args))
+        # Different build args
+        self.assertNotEqual(fingerprint, build_cache.get_input_fingerprint({"publish_all_comics": True}))
+        # Changing a file's contents
+        with open("your_content/comics/Page 1/info.ini", "w") as f:
+            f.write("Title = Page One\n")
+        changed_fingerprint = build_cache.get_input_fingerprint(build_args)
+        self.assertNotEqual(fingerprint, changed_fingerprint)
+        # Adding a file
+        os.makedirs("your_content/comics/Page 2")
+        with open("your_content/comics/Page 2/info.ini", "w") as f:
+            f.write("Title = Page 2\n")
+        self.assertNotEqual(changed_fingerprint, build_cache.get_input_fingerprint(build_args))
+
+    def test_get_input_fingerprint_ignores_cache_directory(self):
+        fingerprint = build_cache.get_input_fingerprint({})
+        build_cache.save_build_state({"version": "1.0.0"})
+        os.makedirs(os.path.join("your_content", build_cache.CACHE_DIRECTORY))
+        with open(os.path.join("your_content", build_cache.CACHE_DIRECTORY, "state.json"), "w") as f:
+            f.write("{}")
+        self.assertEqual(fingerprint, build_cache.get_input_fingerprint({}))
+
+    def test_is_build_up_to_date(self):
+        build_args = {"publish_all_comics": False}
+        self.assertFalse(build_cache.is_build_up_to_date("1.0.0", build_args))
+        os.makedirs("comic")
+        with open("comic/page_info_list.json", "w") as f:
+            f.write("{}")
+        build_cache.update_build_state(
+            version="1.0.0", input_fingerprint=build_cache.get_input_fingerprint(build_args)
+        )
+        self.assertTrue(build_cache.is_build_up_to_date("1.0.0", build_args))
+        self.assertFalse(build_cache.is_build_up_to_date("1.0.1", build_args))
+        self.assertFalse(build_cache.is_build_up_to_date("1.0.0", {"publish_all_comics": True}))
+        # Deleted output means the build has to run again
+        os.remove("comic/page_info_list.json")
+        self.assertFalse(build_cache.is_build_up_to_date("1.0.0", build_args))
+
+    def test_get_folders_fingerprint(self):
+        fingerprint = build_cache.get_folders_fingerprint(["your_content"])
+        self.assertEqual(fingerprint, build_cache.get_folders_fingerprint(["your_content", "missing_folder"]))
+        with open("your_content/comics/Page 1/info.ini", "a") as f:
+            f.write("Tags = Cat\n")
+        self.assertNotEqual(fingerprint, build_cache.get_folders_fingerprint(["your_content"]))
+
+    def test_get_values_fingerprint(self):
+        values = {"comic_title": "Test", "post_datetime": datetime(2020, 1, 1), "tags": {"b", "a"},
+                  "page": PageRecord(page_name="Page 1", _title="Page 1")}
+        fingerprint = build_cache.get_values_fingerprint(values)
+        self.assertEqual(fingerprint, build_cache.get_values_fingerprint(dict(reversed(values.items()))))
+        # Attached global values aren't part of a page's fingerprint, which also keeps it from being circular
+        values["page"].add_global_values(values)
+        self.assertEqual(fingerprint, build_cache.get_values_fingerprint(values))
+        values["page"]["_title"] = "Page One"
+        self.assertNotEqual(fingerprint, build_cache.get_values_fingerprint(values))
+        # Values that can't be compared between builds are always treated as changed
+        a, b = object(), object()
+        self.assertNotEqual(build_cache.get_values_fingerprint([a]), build_cache.get_values_fingerprint([b]))
+
+    def test_get_comic_cache_path(self):
+        self.assertEqual(os.path.join(".comic_git_cache", "content_index.sqlite3"),
+                         build_cache.get_comic_cache_path("content_index", "", ".sqlite3"))
+        self.assertEqual(os.path.join(".comic_git_cache", "search_terms_extra_comic.json"),
+                         build_cache.get_comic_cache_path("search_terms", "extra_comic/", ".json"))
+
+    def test_cache_folder_ignored_by_git(self):
+        build_cache.save_build_state({"version": "1.0.0"})
+        with open(os.path.join(build_cache.CACHE_DIRECTORY, ".gitignore")) as f:
+            self.assertEqual("*\n", f.read())
+        # Folders inside the cache folder are covered by the same .gitignore
+        build_cache.make_cache_folder(os.path.join(build_cache.CACHE_DIRECTORY, "optimized_images"))
+        self.assertEqual([".gitignore", "build_state.json", "optimized_images"],
+                         sorted(os.listdir(build_cache.CACHE_DIRECTORY)))
+
+    def test_is_build_due(self):
+        build_args = {"publish_all_comics": False}
+        now = datetime(2020, 1, 1, tzinfo=timezone.utc)
+        self.assertTrue(build_cache.is_build_due("1.0.0", build_args, now))
+        os.makedirs("comic")
+        with open("comic/page_info_list.json", "w") as f:
+            f.write("{}")
+        state = {
+            "version": "1.0.0",
+            "build_args": build_args,
+            "input_fingerprint": build_cache.get_input_fingerprint(build_args),
+            "next_post_date": None,
+        }
+        self.assertFalse(build_cache.is_build_due("1.0.0", build_args, now, state))
+        self.assertTrue(build_cache.is_build_due("1.0.0", {"publish_all_comics": True}, now, state))
+        # A scheduled page becomes due
+        state["next_post_date"] = "2020-01-01T12:00:00-05:00"
+        self.assertFalse(build_cache.is_build_due("1.0.0", build_args, now, state))
+        self.assertTrue(build_cache.is_build_due("1.0.0", build_args, datetime(2020, 1, 1, 17, tzinfo=timezone.utc),
+                                                 state))
+        # A fresh checkout of the same commit counts as unchanged, even though every file's modification time is new
+        state["input_fingerprint"] = "changed"
+        self.assertTrue(build_cache.is_build_due("1.0.0", build_args, now, state))
+        state["source_commit"] = "abc123"
+        with patch.dict(os.environ, {"GITHUB_SHA": "abc123"}):
+            self.assertFalse(build_cache.is_build_due("1.0.0", build_args, now, state))
+        with patch.dict(os.environ, {"GITHUB_SHA": "def456"}):
+            self.assertTrue(build_cache.is_build_due("1.0.0", build_args, now, state))
@@ -0,0 +1,66 @@
+import io
+import json
+import logging
+import os
+import tempfile
+from contextlib import redirect_stdout, redirect_stderr
+from unittest import TestCase
+
+from scripts import build_log
+
+
+class TestBuildLog(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.json_log_path = os.path.join(self.temp_dir.name, "build.jsonl")
+
+    def tearDown(self):
+        for handler in build_log.logger.handlers[:]:
+            build_log.logger.removeHandler(handler)
+            handler.close()
+        self.temp_dir.cleanup()
+
+    def read_json_log(self):
+        for handler in build_log.logger.handlers:
+            handler.flush()
+        with open(self.json_log_path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f]
+
+    def test_console_levels(self):
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            build_log.setup_logging(logging.INFO)
+            build_log.logger.debug("Writing page")
+            build_log.logger.info("Stage done")
+            build_log.logger.warning("Missing file")
+            build_log.setup_logging(logging.WARNING)
+            build_log.logger.info("Hidden")
+        self.assertEqual("Stage done\n", stdout.getvalue())
+        self.assertEqual("Missing file\n", stderr.getvalue())
+
+    def test_json_log(self):
+        stdout = io.StringIO()
+        with redirect_stdout(stdout):
+            build_log.setup_logging(logging.INFO, self.json_log_path)
+            build_log.logger.debug("Writing page")
+            build_log.log_data(logging.INFO, "Stage: 1.00 ms", event="stage", stage="Stage", ms=1.0)
+            build_log.log_console_only("Captured output")
+        self.assertEqual("Stage: 1.00 ms\nCaptured output\n", stdout.getvalue())
+        records = self.read_json_log()
+        self.assertEqual(["debug", "info"], [r["level"] for r in records])
+        self.assertEqual("Writing page", records[0]["message"])
+        self.assertEqual({"event": "stage", "stage": "Stage", "ms": 1.0},
+                         {k: records[1][k] for k in ("event", "stage", "ms")})
+
+    def test_progress(self):
+        stdout = io.StringIO()
+        with redirect_stdout(stdout):
+            build_log.setup_logging(logging.INFO, self.json_log_path)
+            with build_log.Progress("Writing pages", 3) as progress:
+                for _ in range(3):
+                    progress.update()
+        # Only the final count is printed when the output isn't a terminal
+        self.assertEqual("Writing pages: 3/3\n", stdout.getvalue())
+        record = self.read_json_log()[0]
+        self.assertEqual(("progress", 3, 3), (record["event"], record["count"], record["total"]))
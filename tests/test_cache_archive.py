@@ -0,0 +1,64 @@
+import io
+import json
+import os
+import tarfile
+
+from scripts import build_cache, cache_archive
+from working_directory import TempDirTestCase
+
+
+class TestCacheArchive(TempDirTestCase):
+
+    def setUp(self):
+        super().setUp()
+        build_cache.save_json_file(build_cache.BUILD_STATE_PATH, {"version": "1.0.0"})
+        os.makedirs(os.path.join(build_cache.CACHE_DIRECTORY, "optimized_images"))
+        with open(os.path.join(build_cache.CACHE_DIRECTORY, "optimized_images", "abc.png"), "wb") as f:
+            f.write(b"image")
+        os.makedirs(os.path.join(build_cache.CACHE_DIRECTORY, "staging"))
+        with open(os.path.join(build_cache.CACHE_DIRECTORY, "staging", "index.html"), "wb") as f:
+            f.write(b"left over")
+
+    def reset_cache(self):
+        build_cache.save_json_file(build_cache.BUILD_STATE_PATH, {"version": "0.0.1"})
+
+    def test_round_trip(self):
+        self.assertEqual(2, cache_archive.export_cache("cache.tar.gz", "key"))
+        self.reset_cache()
+        self.assertTrue(cache_archive.import_cache("cache.tar.gz", "key"))
+        self.assertEqual({"version": "1.0.0"}, build_cache.load_build_state())
+        # The imported cache folder is still ignored by git
+        self.assertEqual([".gitignore", "build_state.json", "optimized_images"],
+                         sorted(os.listdir(build_cache.CACHE_DIRECTORY)))
+        self.assertFalse(os.path.exists(cache_archive.IMPORT_FOLDER))
+
+    def test_invalid_archives(self):
+        cache_archive.export_cache("cache.tar.gz", "key")
+        self.reset_cache()
+        # Different engine version or settings
+        self.assertFalse(cache_archive.import_cache("cache.tar.gz", "other key"))
+        # Missing or unreadable archives
+        self.assertFalse(cache_archive.import_cache("missing.tar.gz", "key"))
+        with open("broken.tar.gz", "wb") as f:
+            f.write(b"not an archive")
+        self.assertFalse(cache_archive.import_cache("broken.tar.gz", "key"))
+        # A file that doesn't match the manifest
+        with tarfile.open("cache.tar.gz", "r:gz") as tar, tarfile.open("corrupt.tar.gz", "w:gz") as corrupt:
+            for member in tar.getmembers():
+                data = tar.extractfile(member).read()
+                if member.name.endswith("abc.png"):
+                    data = b"imagf"
+                corrupt.addfile(member, io.BytesIO(data))
+        self.assertFalse(cache_archive.import_cache("corrupt.tar.gz", "key"))
+        # The existing cache is left alone every time
+        self.assertEqual({"version": "0.0.1"}, build_cache.load_build_state())
+        self.assertFalse(os.path.exists(cache_archive.IMPORT_FOLDER))
+
+    def test_unsafe_file_names(self):
+        manifest = json.dumps({"format": cache_archive.ARCHIVE_FORMAT, "key": "key", "files": {"../evil": ""}})
+        with tarfile.open("evil.tar.gz", "w:gz") as tar:
+            info = tarfile.TarInfo(cache_archive.MANIFEST_NAME)
+            info.size = len(manifest)
+            tar.addfile(info, io.BytesIO(manifest.encode("utf-8")))
+        self.assertFalse(cache_archive.import_cache("evil.tar.gz", "key"))
+        self.assertFalse(os.path.exists("evil"))
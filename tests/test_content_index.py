@@ -0,0 +1,107 @@
+import os
+from configparser import RawConfigParser
+
+from scripts import content_index
+from working_directory import TempDirTestCase
+
+
+class TestContentIndex(TempDirTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.comic_info = RawConfigParser()
+        self.comic_info.read_string("[Comic Settings]\nUse content index = True\nDate format = %Y-%m-%d\n")
+        for page_name in ("Page 1", "Page 2"):
+            os.makedirs(f"your_content/comics/{page_name}")
+            with open(f"your_content/comics/{page_name}/info.ini", "w") as f:
+                f.write(f"Title = {page_name}\n")
+
+    def get_signature(self, page_name):
+        return content_index.get_page_signature(f"your_content/comics/{page_name}/", page_name, "")
+
+    def index_page(self, index, page_name, page_info):
+        index.update_page(page_name, self.get_signature(page_name), page_info, ["page.png"], ["English"])
+
+    def test_open_content_index_disabled(self):
+        self.assertIsNone(content_index.open_content_index("", RawConfigParser(), "1.0.0"))
+
+    def test_get_page(self):
+        index = content_index.open_content_index("", self.comic_info, "1.0.0")
+        page_path = "your_content/comics/Page 1/"
+        signature = content_index.get_page_signature(page_path, "Page 1", "")
+        self.assertIsNone(index.get_page("Page 1", signature))
+        self.index_page(index, "Page 1", {"Title": "Page 1"})
+        index.save()
+        index.close()
+
+        index = content_index.open_content_index("", self.comic_info, "1.0.0")
+        self.assertEqual(({"Title": "Page 1"}, ["page.png"], ["English"]), index.get_page("Page 1", signature))
+        # Changing the info.ini file means the page has to be read again
+        with open(f"{page_path}info.ini", "w") as f:
+            f.write("Title = Page One\n")
+        self.assertIsNone(index.get_page("Page 1", content_index.get_page_signature(page_path, "Page 1", "")))
+        # Adding or removing files in the page folder updates its modification time, which does too
+        os.utime(page_path, ns=(0, 0))
+        self.assertNotEqual(signature, content_index.get_page_signature(page_path, "Page 1", ""))
+        index.close()
+
+    def test_get_unchanged_page(self):
+        index = content_index.open_content_index("", self.comic_info, "1.0.0")
+        self.index_page(index, "Page 1", {"Title": "Page 1"})
+        # e.g. a fresh checkout, where git knows the page hasn't changed, but every modification time has
+        page_path = "your_content/comics/Page 1/"
+        os.utime(f"{page_path}info.ini", ns=(0, 0))
+        signature = content_index.get_page_signature(page_path, "Page 1", "")
+        self.assertIsNone(index.get_page("Page 1", signature))
+        self.assertEqual(({"Title": "Page 1"}, ["page.png"], ["English"]),
+                         index.get_page("Page 1", signature, check_signature=False))
+        # The new signature is stored, so later builds don't need git to tell
+        self.assertIsNotNone(index.get_page("Page 1", signature))
+        index.close()
+
+    def test_settings_change(self):
+        index = content_index.open_content_index("", self.comic_info, "1.0.0")
+        self.index_page(index, "Page 1", {"Title": "Page 1"})
+        index.save()
+        index.close()
+        # A new engine version empties the index
+        index = content_index.open_content_index("", self.comic_info, "1.0.1")
+        self.assertIsNone(index.get_page("Page 1", self.get_signature("Page 1")))
+        index.close()
+
+    def test_old_schema(self):
+        import sqlite3
+
+        # The first version of the index had more columns in the pages table, and a page_tags table
+        path = os.path.join(".comic_git_cache", "content_index.sqlite3")
+        os.makedirs(".comic_git_cache")
+        connection = sqlite3.connect(path)
+        connection.executescript("""
+            CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE pages (page_name TEXT PRIMARY KEY, signature TEXT NOT NULL, page_info TEXT NOT NULL,
+                image_file_names TEXT NOT NULL, transcript_languages TEXT NOT NULL, storyline TEXT NOT NULL,
+                post_date TEXT NOT NULL);
+            CREATE TABLE page_tags (page_name TEXT NOT NULL, tag_type TEXT NOT NULL, tag TEXT NOT NULL);
+        """)
+        connection.close()
+        index = content_index.open_content_index("", self.comic_info, "1.0.0")
+        self.index_page(index, "Page 1", {"Title": "Page 1"})
+        self.assertIsNotNone(index.get_page("Page 1", self.get_signature("Page 1")))
+        index.close()
+
+    def test_save_removes_deleted_pages(self):
+        index = content_index.open_content_index("", self.comic_info, "1.0.0")
+        self.index_page(index, "Page 1", {"Title": "Page 1"})
+        self.index_page(index, "Page 2", {"Title": "Page 2"})
+        index.save()
+        index.close()
+
+        # Pages that aren't looked up during a build have been deleted, so they're removed when the index is saved
+        index = content_index.open_content_index("", self.comic_info, "1.0.0")
+        index.get_page("Page 1", self.get_signature("Page 1"))
+        index.save()
+        index.close()
+        index = content_index.open_content_index("", self.comic_info, "1.0.0")
+        self.assertIsNotNone(index.get_page("Page 1", self.get_signature("Page 1")))
+        self.assertIsNone(index.get_page("Page 2", self.get_signature("Page 2")))
+        index.close()
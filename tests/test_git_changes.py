@@ -0,0 +1,82 @@
+import os
+import shutil
+import subprocess
+from unittest import TestCase, skipUnless
+
+from scripts import git_changes
+from working_directory import TempDirTestCase
+
+
+def git(*args: str):
+    subprocess.run(["git", "-c", "user.name=Test", "-c", "user.email=test@example.com", *args], check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def write(path: str, contents: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(contents)
+
+
+class TestChangeSet(TestCase):
+
+    def test_change_set(self):
+        change_set = git_changes.ChangeSet([
+            "your_content/comics/Page 1/info.ini",
+            "your_content/comics/Page 2/page.png",
+            "your_content/extra_comic/comics/Page 1/info.ini",
+            "your_content/transcripts/Page 3/English.txt",
+            "your_content/comic_info.ini",
+            "your_content/themes/default/templates/comic.tpl",
+            "comic_git_engine",
+            "your_content/images/banner.png",
+        ], ["your_content/transcripts"])
+        self.assertEqual({"": {"Page 1", "Page 2"}, "extra_comic/": {"Page 1"}}, dict(change_set.pages))
+        self.assertEqual({"Page 3"}, change_set.transcript_pages)
+        self.assertEqual("8 changed file(s), in 3 page(s) and 1 page(s) of transcripts", change_set.get_summary())
+        self.assertFalse(change_set.is_page_unchanged("", "Page 1"))
+        self.assertFalse(change_set.is_page_unchanged("extra_comic/", "Page 3"))
+        self.assertTrue(change_set.is_page_unchanged("extra_comic/", "Page 2"))
+
+
+@skipUnless(shutil.which("git"), "git isn't installed")
+class TestGitChanges(TempDirTestCase):
+
+    def setUp(self):
+        super().setUp()
+        git("init", "-q")
+        write("your_content/comics/Page 1/info.ini", "Title = Page 1\n")
+        write("your_content/comics/Page 2/info.ini", "Title = Page 2\n")
+        write("comic/Page 1/index.html", "output")
+        git("add", ".")
+        git("commit", "-q", "-m", "First")
+
+    def test_no_repository(self):
+        shutil.rmtree(".git")
+        self.assertEqual({}, git_changes.get_build_state_values())
+        self.assertIsNone(git_changes.get_changed_paths({"git_commit": "0" * 40}))
+
+    def test_changed_paths(self):
+        # A thumbnail made by the build, which isn't committed yet
+        write("your_content/comics/Page 1/thumbnail.png", "thumbnail")
+        state = git_changes.get_build_state_values()
+        self.assertEqual(["your_content/comics/Page 1/thumbnail.png"], list(state["git_dirty_files"]))
+        self.assertEqual([], git_changes.get_changed_paths(state))
+
+        # Output files aren't inputs, and committing a file that hasn't changed since the build doesn't change it
+        write("comic/Page 1/index.html", "new output")
+        git("add", ".")
+        git("commit", "-q", "-m", "Auto-build")
+        self.assertEqual([], git_changes.get_changed_paths(state))
+
+        write("your_content/comics/Page 2/info.ini", "Title = Page Two\n")
+        write("your_content/comics/Page 3/info.ini", "Title = Page 3\n")
+        self.assertEqual(["your_content/comics/Page 2/info.ini", "your_content/comics/Page 3/info.ini"],
+                         git_changes.get_changed_paths(state))
+
+    def test_reverted_change(self):
+        write("your_content/comics/Page 1/info.ini", "Title = Page One\n")
+        state = git_changes.get_build_state_values()
+        # The last build used the uncommitted change, so undoing it is a change too
+        git("checkout", "-q", "--", "your_content")
+        self.assertEqual(["your_content/comics/Page 1/info.ini"], git_changes.get_changed_paths(state))
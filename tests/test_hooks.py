@@ -0,0 +1,111 @@
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from configparser import RawConfigParser
+from unittest.mock import patch
+
+from scripts import build_site
+from working_directory import TempDirTestCase
+
+HOOKS = """
+WORKER_SAFE_HOOKS = ["extra_comic_dict_processing", "extra_page_info_processing"]
+calls = []
+
+
+def extra_comic_dict_processing(comic_folder, comic_info, comic_data_dict):
+    return comic_data_dict
+
+
+def extra_page_info_processing(comic_folder, comic_info, page_path, page_info):
+    return page_info
+
+
+def extra_comic_dict_batch_processing(comic_folder, comic_info, comic_data_dicts):
+    calls.append(len(comic_data_dicts))
+    return [dict(d, _batch=True) for d in comic_data_dicts]
+
+
+def extra_page_info_batch_processing(comic_folder, comic_info, page_info_list):
+    for page_info in page_info_list:
+        page_info["Batch"] = True
+"""
+
+
+class TestHooks(TempDirTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.old_sys_path = sys.path[:]
+        # A different theme name for each test, since hooks modules are only imported once
+        self.theme = self.id().rsplit(".", 1)[-1]
+        os.makedirs(f"your_content/themes/{self.theme}/scripts")
+        with open(f"your_content/themes/{self.theme}/scripts/hooks.py", "w") as f:
+            f.write(HOOKS)
+
+    def tearDown(self):
+        sys.path[:] = self.old_sys_path
+
+    def test_is_hook_worker_safe(self):
+        self.assertTrue(build_site.is_hook_worker_safe(self.theme, "extra_comic_dict_processing"))
+        # Only hooks that build_site.py calls in worker processes can be declared safe to call in them
+        self.assertFalse(build_site.is_hook_worker_safe(self.theme, "extra_page_info_processing"))
+        self.assertFalse(build_site.is_hook_worker_safe(self.theme, "extra_comic_dict_batch_processing"))
+        # Hooks the theme doesn't have are never a problem
+        self.assertTrue(build_site.is_hook_worker_safe(self.theme, "build_other_pages"))
+        self.assertTrue(build_site.is_hook_worker_safe("missing_theme", "extra_comic_dict_processing"))
+
+    def test_run_batch_hook(self):
+        comic_info = RawConfigParser()
+        pages = [{"page_name": "1"}, {"page_name": "2"}]
+        # Hooks can change the pages in place...
+        self.assertIs(pages, build_site.run_batch_hook(
+            self.theme, "extra_page_info_batch_processing", "", comic_info, pages
+        ))
+        self.assertEqual([True, True], [p["Batch"] for p in pages])
+        # ...or return new ones
+        result = build_site.run_batch_hook(self.theme, "extra_comic_dict_batch_processing", "", comic_info, pages)
+        self.assertEqual([True, True], [p["_batch"] for p in result])
+        self.assertIs(pages, build_site.run_batch_hook(self.theme, "missing_hook", "", comic_info, pages))
+
+    def test_get_worker_unsafe_hooks(self):
+        # Listed hooks are safe to call in an extra comic's worker process, even if they aren't called in page workers
+        self.assertEqual(["extra_page_info_batch_processing", "extra_comic_dict_batch_processing"],
+                         build_site.get_worker_unsafe_hooks(self.theme))
+        self.assertEqual([], build_site.get_worker_unsafe_hooks("missing_theme"))
+
+    def test_extra_comics_built_in_main_process(self):
+        comic_info = RawConfigParser()
+        comic_info.read_dict({"Comic Settings": {"Theme": self.theme, "Extra comics": "one, two"}, "Pages": {}})
+        with patch.object(build_site, "build_extra_comic", return_value=({}, "", None, {})) as m, \
+                patch("concurrent.futures.ProcessPoolExecutor") as executor:
+            build_site.build_extra_comics(comic_info, "", False, False, jobs=2)
+        executor.assert_not_called()
+        self.assertEqual(["one", "two"], [call.args[0] for call in m.call_args_list])
+        # Built one at a time, so each of them can use every job
+        self.assertEqual([2, 2], [call.args[7] for call in m.call_args_list])
+
+    def test_extra_comic_jobs(self):
+        comic_info = RawConfigParser()
+        comic_info.read_dict({"Comic Settings": {"Theme": "missing_theme", "Extra comics": "one, two"}, "Pages": {}})
+        executor = ThreadPoolExecutor(max_workers=2)
+        with patch.object(build_site, "build_extra_comic", return_value=({}, "", None, {})) as m, \
+                patch("concurrent.futures.ProcessPoolExecutor", return_value=executor):
+            build_site.build_extra_comics(comic_info, "", False, False, jobs=5)
+        # Two workers share the five jobs, so neither of them starts five more processes of its own
+        self.assertEqual([2, 2], [call.args[7] for call in m.call_args_list])
+
+    def test_batch_hook_called_once(self):
+        comic_info = RawConfigParser()
+        comic_info.read_dict({"Comic Settings": {"Theme": self.theme}})
+        page_info_list = [{"page_name": "1"}, {"page_name": "2"}, {"page_name": "3"}]
+        def create_comic_data(comic_folder, comic_info, page_info, **ids):
+            return build_site.PageRecord(page_name=page_info["page_name"], **ids)
+
+        with patch.object(build_site, "create_comic_data", create_comic_data):
+            comic_data_dicts = build_site.build_comic_data_dicts("", comic_info, page_info_list)
+        hooks = build_site.get_hooks_module(self.theme)
+        self.assertEqual([3], hooks.calls)
+        # Plain dicts returned by the hook are turned back into PageRecords
+        self.assertTrue(all(isinstance(d, build_site.PageRecord) for d in comic_data_dicts))
+        self.assertEqual(["1", "2", "3"], [d["page_name"] for d in comic_data_dicts])
+        self.assertEqual(["2", "3", "3"], [d["next_id"] for d in comic_data_dicts])
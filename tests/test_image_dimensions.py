@@ -0,0 +1,49 @@
+from unittest.mock import patch
+
+from PIL import Image
+
+from scripts import build_site
+from working_directory import TempDirTestCase
+
+
+class TestImageDimensions(TempDirTestCase):
+
+    def setUp(self):
+        super().setUp()
+        Image.new("RGB", (30, 20)).save("page.png")
+        with open("page.svg", "w") as f:
+            f.write('<svg xmlns="http://www.w3.org/2000/svg" width="10" height="10"></svg>')
+
+    def test_get(self):
+        cache = build_site.ImageDimensionsCache("")
+        self.assertEqual([30, 20], cache.get("page.png"))
+        # Files Pillow can't read, and files that don't exist, don't have dimensions
+        self.assertIsNone(cache.get("page.svg"))
+        self.assertIsNone(cache.get("missing.png"))
+
+    def test_cached_between_builds(self):
+        cache = build_site.ImageDimensionsCache("")
+        cache.get("page.png")
+        cache.get("page.svg")
+        cache.save()
+        cache = build_site.ImageDimensionsCache("")
+        with patch.object(build_site, "read_image_dimensions") as m:
+            self.assertEqual([30, 20], cache.get("page.png"))
+            self.assertIsNone(cache.get("page.svg"))
+        m.assert_not_called()
+
+    def test_changed_image(self):
+        cache = build_site.ImageDimensionsCache("")
+        cache.get("page.png")
+        cache.save()
+        Image.new("RGB", (300, 200)).save("page.png")
+        cache = build_site.ImageDimensionsCache("")
+        self.assertEqual([300, 200], cache.get("page.png"))
+
+    def test_unused_images_dropped(self):
+        cache = build_site.ImageDimensionsCache("")
+        cache.get("page.png")
+        cache.save()
+        cache = build_site.ImageDimensionsCache("")
+        cache.save()
+        self.assertEqual({}, build_site.ImageDimensionsCache("").old_entries)
@@ -0,0 +1,204 @@
+import os
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from unittest import TestCase
+
+from scripts import import_wordpress
+
+IMAGE_1 = bytes(range(256)) * 40
+IMAGE_2 = b"second image" * 100
+
+EXPORT = """<?xml version="1.0" encoding="UTF-8" ?>
+<rss version="2.0"
+    xmlns:excerpt="http://wordpress.org/export/1.2/excerpt/"
+    xmlns:content="http://purl.org/rss/1.0/modules/content/"
+    xmlns:wp="http://wordpress.org/export/1.2/">
+<channel>
+    <title>Test Comic</title>
+    <wp:wxr_version>1.2</wp:wxr_version>
+    <item>
+        <title>page-1</title>
+        <excerpt:encoded><![CDATA[Alt text for
+page 1]]></excerpt:encoded>
+        <wp:post_id>10</wp:post_id>
+        <wp:post_name>page-1</wp:post_name>
+        <wp:status>inherit</wp:status>
+        <wp:post_parent>11</wp:post_parent>
+        <wp:post_type>attachment</wp:post_type>
+        <wp:attachment_url>{url}/uploads/page-1.png</wp:attachment_url>
+    </item>
+    <item>
+        <title>Page 1</title>
+        <content:encoded><![CDATA[The <b>first</b> page.]]></content:encoded>
+        <wp:post_id>11</wp:post_id>
+        <wp:post_date>2020-05-31 12:30:00</wp:post_date>
+        <wp:post_name>page-1</wp:post_name>
+        <wp:status>publish</wp:status>
+        <wp:post_parent>0</wp:post_parent>
+        <wp:post_type>webcomic1</wp:post_type>
+        <category domain="webcomic1_storyline" nicename="chapter-1"><![CDATA[Chapter 1]]></category>
+        <category domain="webcomic1_character" nicename="alice"><![CDATA[Alice]]></category>
+        <category domain="webcomic1_character" nicename="bob"><![CDATA[Bob]]></category>
+        <category domain="post_tag" nicename="intro"><![CDATA[Intro]]></category>
+    </item>
+    <item>
+        <title>Page 1 transcript</title>
+        <content:encoded><![CDATA[Alice: Hello!]]></content:encoded>
+        <wp:post_id>12</wp:post_id>
+        <wp:status>publish</wp:status>
+        <wp:post_parent>11</wp:post_parent>
+        <wp:post_type>webcomic_transcript</wp:post_type>
+        <category domain="webcomic_transcript_language" nicename="es"><![CDATA[Spanish]]></category>
+    </item>
+    <item>
+        <title>Page 2 transcript</title>
+        <content:encoded><![CDATA[Bob: Hi!]]></content:encoded>
+        <wp:post_id>13</wp:post_id>
+        <wp:status>publish</wp:status>
+        <wp:post_parent>14</wp:post_parent>
+        <wp:post_type>webcomic_transcript</wp:post_type>
+    </item>
+    <item>
+        <title>Page 2</title>
+        <content:encoded><![CDATA[]]></content:encoded>
+        <wp:post_id>14</wp:post_id>
+        <wp:post_date>2020-06-07 12:30:00</wp:post_date>
+        <wp:post_name>page-2</wp:post_name>
+        <wp:status>future</wp:status>
+        <wp:post_parent>0</wp:post_parent>
+        <wp:post_type>webcomic1</wp:post_type>
+    </item>
+    <item>
+        <title>page_2</title>
+        <wp:post_id>15</wp:post_id>
+        <wp:post_name>page_2-2</wp:post_name>
+        <wp:status>inherit</wp:status>
+        <wp:post_parent>0</wp:post_parent>
+        <wp:post_type>attachment</wp:post_type>
+        <wp:attachment_url>{url}/uploads/page_2.jpg</wp:attachment_url>
+        <wp:postmeta>
+            <wp:meta_key>_wp_attachment_image_alt</wp:meta_key>
+            <wp:meta_value><![CDATA[Alt text for page 2]]></wp:meta_value>
+        </wp:postmeta>
+    </item>
+    <item>
+        <title>Draft</title>
+        <wp:post_id>16</wp:post_id>
+        <wp:post_name>draft</wp:post_name>
+        <wp:status>draft</wp:status>
+        <wp:post_type>webcomic1</wp:post_type>
+    </item>
+    <item>
+        <title>About</title>
+        <wp:post_id>17</wp:post_id>
+        <wp:post_name>about</wp:post_name>
+        <wp:status>publish</wp:status>
+        <wp:post_type>page</wp:post_type>
+    </item>
+</channel>
+</rss>
+"""
+
+
+class FileServer(BaseHTTPRequestHandler):
+    """
+    Serves FILES, with support for Range requests, and records every request it gets in REQUESTS
+    """
+    FILES = {
+        "/uploads/page-1.png": IMAGE_1,
+        "/uploads/page_2.jpg": IMAGE_2,
+    }
+    REQUESTS = []
+
+    def do_GET(self):
+        self.REQUESTS.append((self.path, self.headers.get("Range")))
+        contents = self.FILES.get(self.path)
+        if contents is None:
+            self.send_error(404)
+            return
+        status = 200
+        range_header = self.headers.get("Range")
+        if range_header:
+            start = int(range_header[len("bytes="):].rstrip("-"))
+            contents = contents[start:]
+            status = 206
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(contents)))
+        self.end_headers()
+        self.wfile.write(contents)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestImportWordpress(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.comics_folder = os.path.join(self.temp_dir.name, "comics")
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), FileServer)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        FileServer.REQUESTS.clear()
+        self.export_path = os.path.join(self.temp_dir.name, "export.xml")
+        with open(self.export_path, "w", encoding="utf-8") as f:
+            f.write(EXPORT.format(url=f"http://127.0.0.1:{self.server.server_address[1]}"))
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.temp_dir.cleanup()
+
+    def run_import(self):
+        return import_wordpress.import_wordpress(self.export_path, self.comics_folder, threads=2, retry_delay=0)
+
+    def read(self, *path, mode="r"):
+        with open(os.path.join(self.comics_folder, *path), mode) as f:
+            return f.read()
+
+    def test_import(self):
+        self.assertEqual([], self.run_import())
+        self.assertEqual(["page-1", "page-2"], sorted(os.listdir(self.comics_folder)))
+        self.assertEqual(
+            "Title = Page 1\n"
+            "Post date = May 31, 2020\n"
+            "Filename = page-1.png\n"
+            "Alt text = Alt text for page 1\n"
+            "Storyline = Chapter 1\n"
+            "Characters = Alice, Bob\n"
+            "Tags = Intro\n",
+            self.read("page-1", "info.ini")
+        )
+        self.assertEqual("The <b>first</b> page.", self.read("page-1", "post.txt"))
+        self.assertEqual("Alice: Hello!", self.read("page-1", "Spanish.txt"))
+        self.assertEqual(IMAGE_1, self.read("page-1", "page-1.png", mode="rb"))
+        # The transcript came before its page, and the attachment after it, and was matched by name
+        self.assertEqual("Bob: Hi!", self.read("page-2", "English.txt"))
+        self.assertIn("Filename = page_2.jpg\nAlt text = Alt text for page 2\n", self.read("page-2", "info.ini"))
+        self.assertEqual(IMAGE_2, self.read("page-2", "page_2.jpg", mode="rb"))
+
+    def test_resume(self):
+        os.makedirs(os.path.join(self.comics_folder, "page-1"))
+        os.makedirs(os.path.join(self.comics_folder, "page-2"))
+        with open(os.path.join(self.comics_folder, "page-1", "page-1.png.part"), "wb") as f:
+            f.write(IMAGE_1[:1000])
+        with open(os.path.join(self.comics_folder, "page-2", "page_2.jpg"), "wb") as f:
+            f.write(IMAGE_2)
+        self.assertEqual([], self.run_import())
+        # Only the rest of the partial download was requested, and the finished download wasn't requested at all
+        self.assertEqual([("/uploads/page-1.png", "bytes=1000-")], FileServer.REQUESTS)
+        self.assertEqual(IMAGE_1, self.read("page-1", "page-1.png", mode="rb"))
+        self.assertFalse(os.path.exists(os.path.join(self.comics_folder, "page-1", "page-1.png.part")))
+
+    def test_failed_download(self):
+        del FileServer.FILES["/uploads/page_2.jpg"]
+        try:
+            errors = self.run_import()
+        finally:
+            FileServer.FILES["/uploads/page_2.jpg"] = IMAGE_2
+        self.assertEqual(1, len(errors))
+        self.assertTrue(errors[0][0].endswith("/uploads/page_2.jpg"))
+        # The page itself is still imported, so running the import again only needs to download the image
+        self.assertIn("Filename = page_2.jpg\n", self.read("page-2", "info.ini"))
+        self.assertEqual([], self.run_import())
+        self.assertEqual(IMAGE_2, self.read("page-2", "page_2.jpg", mode="rb"))
@@ -0,0 +1,64 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+from scripts import minify_html
+from working_directory import temp_working_directory
+
+
+class TestMinifyHtml(TestCase):
+
+    def test_minify(self):
+        html = (
+            "<!--\n!! DO NOT EDIT THIS FILE !!\n-->\n"
+            "<!DOCTYPE html>\n<html>\n    <head>\n"
+            "    <!--[if IE]><p>Old browser</p><![endif]-->\n"
+            "    <script>\n        let  x =  \"<b>  </b>\";  // <!-- not a comment -->\n    </script>\n"
+            "    </head>\n"
+            "    <body>\n"
+            "        <p   class=\"a  b\"\n           title='c  d'>Some    text <!-- comment -->\n\n  here</p>\n"
+            "        <pre>  keep\n    this  </pre>\n"
+            "        <textarea>  and\n  this </textarea>\n"
+            "    </body>\n</html>\n"
+        )
+        self.assertEqual(
+            "<!DOCTYPE html>\n<html>\n<head>\n"
+            "<!--[if IE]><p>Old browser</p><![endif]-->\n"
+            "<script>\n        let  x =  \"<b>  </b>\";  // <!-- not a comment -->\n    </script>\n"
+            "</head>\n"
+            "<body>\n"
+            "<p class=\"a  b\" title='c  d'>Some text\nhere</p>\n"
+            "<pre>  keep\n    this  </pre>\n"
+            "<textarea>  and\n  this </textarea>\n"
+            "</body>\n</html>",
+            minify_html.minify(html)
+        )
+
+    def test_minify_quoted_greater_than(self):
+        # A ">" in a quoted attribute value doesn't end the tag, so the rest of the value isn't collapsed as text
+        self.assertEqual('<img title="a   >   b" alt=\'c  >  d\'> e',
+                         minify_html.minify('<img   title="a   >   b"\n  alt=\'c  >  d\'>   e'))
+        self.assertEqual('<script data-x="a > b">  x  </script>',
+                         minify_html.minify('<script data-x="a > b">  x  </script>'))
+        # Tags with an unbalanced quote still end at the first ">"
+        self.assertEqual("<p class=a'b> c</p>", minify_html.minify("<p  class=a'b>   c</p>"))
+
+    def test_html_minifier(self):
+        with temp_working_directory():
+            minifier = minify_html.HtmlMinifier("")
+            self.assertEqual("<p>a b</p>", minifier.minify("comic", "<p>a   b</p>"))
+            self.assertEqual("<p>a b</p>", minifier.minify("comic", "<p>a   b</p>"))
+            self.assertEqual("<p>c</p>", minifier.minify("archive", "<p>c</p>\n"))
+            minifier.save()
+            self.assertEqual(2, minifier.stats["comic"].pages)
+            self.assertEqual(1, minifier.stats["comic"].cached)
+            self.assertEqual(24, minifier.stats["comic"].original_bytes)
+            self.assertEqual(20, minifier.stats["comic"].minified_bytes)
+            self.assertEqual(2, len(minifier.get_stats_lines()))
+
+            # Pages from the last build are loaded from the cache
+            minifier = minify_html.HtmlMinifier("")
+            with patch.object(minify_html, "minify") as m:
+                self.assertEqual("<p>a b</p>", minifier.minify("comic", "<p>a   b</p>"))
+            m.assert_not_called()
+            minifier.save()
+            self.assertEqual(1, len(minify_html.HtmlMinifier("").old_cache))
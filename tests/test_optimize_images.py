@@ -0,0 +1,101 @@
+import os
+from configparser import RawConfigParser
+from unittest.mock import patch
+
+from PIL import Image
+
+from scripts import optimize_images
+from working_directory import TempDirTestCase
+
+
+class TestOptimizeImages(TempDirTestCase):
+
+    def setUp(self):
+        super().setUp()
+        os.makedirs("your_content/comics/Page 1")
+        # Saved without any compression, so there's plenty to optimize away
+        Image.new("RGB", (64, 64), "red").save("your_content/comics/Page 1/page.png", compress_level=0)
+        Image.new("RGB", (64, 64), "blue").save("your_content/comics/Page 1/photo.jpg", quality=90)
+        with open("your_content/comics/Page 1/drawing.svg", "w") as f:
+            f.write('<svg xmlns="http://www.w3.org/2000/svg"></svg>')
+        self.comic_info = RawConfigParser()
+        self.comic_info.read_string("[Image Reprocessing]\nOptimize images = True\n")
+
+    def get_comic_data_dicts(self):
+        return [{"page_name": "Page 1", "comic_paths": [
+            "your_content/comics/Page 1/page.png",
+            "your_content/comics/Page 1/photo.jpg",
+            "your_content/comics/Page 1/drawing.svg",
+        ]}]
+
+    def test_optimize_comic_images(self):
+        comic_data_dicts = self.get_comic_data_dicts()
+        optimize_images.optimize_comic_images("", self.comic_info, comic_data_dicts)
+        self.assertEqual(
+            ["comic/Page 1/page.png", "comic/Page 1/photo.jpg", "your_content/comics/Page 1/drawing.svg"],
+            comic_data_dicts[0]["comic_paths"]
+        )
+        self.assertLess(os.path.getsize("comic/Page 1/page.png"),
+                        os.path.getsize("your_content/comics/Page 1/page.png"))
+        with Image.open("comic/Page 1/page.png") as im:
+            self.assertEqual((255, 0, 0), im.getpixel((0, 0)))
+        with Image.open("comic/Page 1/photo.jpg") as im:
+            self.assertTrue(im.info.get("progressive"))
+
+    def test_webp(self):
+        self.comic_info.set("Image Reprocessing", "Convert to WebP", "True")
+        comic_data_dicts = self.get_comic_data_dicts()
+        optimize_images.optimize_comic_images("", self.comic_info, comic_data_dicts)
+        self.assertEqual(["comic/Page 1/page.webp", "comic/Page 1/photo.webp"], comic_data_dicts[0]["comic_paths"][:2])
+        with Image.open("comic/Page 1/page.webp") as im:
+            self.assertEqual("WEBP", im.format)
+
+    def test_not_smaller(self):
+        # Pretend the optimized image came out bigger than the original
+        with patch.object(optimize_images.os.path, "getsize", side_effect=[2, 1]):
+            self.assertFalse(optimize_images.optimize_image(
+                "your_content/comics/Page 1/page.png", "optimized.png",
+                optimize_images.get_optimize_settings(self.comic_info)
+            ))
+        self.assertEqual([], [f for f in os.listdir(".") if f.startswith("optimized")])
+
+    def test_unoptimized_images_keep_original_path(self):
+        self.comic_info.set("Image Reprocessing", "Convert to WebP", "True")
+        frames = [Image.new("RGB", (64, 64), color) for color in ("red", "blue")]
+        frames[0].save("your_content/comics/Page 1/page.png", save_all=True, append_images=frames[1:])
+        comic_data_dicts = self.get_comic_data_dicts()
+        optimize_images.optimize_comic_images("", self.comic_info, comic_data_dicts)
+        # Animated images aren't optimized, so the page keeps the original image instead of a .webp that isn't one
+        self.assertEqual(["your_content/comics/Page 1/page.png", "comic/Page 1/photo.webp"],
+                         comic_data_dicts[0]["comic_paths"][:2])
+        self.assertEqual(["photo.webp"], os.listdir("comic/Page 1"))
+        # and isn't tried again
+        with patch.object(optimize_images, "optimize_image") as m:
+            comic_data_dicts = self.get_comic_data_dicts()
+            optimize_images.optimize_comic_images("", self.comic_info, comic_data_dicts)
+        m.assert_not_called()
+        self.assertEqual("your_content/comics/Page 1/page.png", comic_data_dicts[0]["comic_paths"][0])
+
+    def test_cached(self):
+        optimize_images.optimize_comic_images("", self.comic_info, self.get_comic_data_dicts())
+        with patch.object(optimize_images, "optimize_image") as m:
+            comic_data_dicts = self.get_comic_data_dicts()
+            optimize_images.optimize_comic_images("", self.comic_info, comic_data_dicts)
+        m.assert_not_called()
+        self.assertEqual("comic/Page 1/page.png", comic_data_dicts[0]["comic_paths"][0])
+        # Unchanged images aren't even read again
+        with patch.object(optimize_images, "get_file_hash") as m:
+            optimize_images.optimize_comic_images("", self.comic_info, self.get_comic_data_dicts())
+        m.assert_not_called()
+        # Changing an image means it's optimized again, and the old cached copy is deleted
+        Image.new("RGB", (64, 64), "green").save("your_content/comics/Page 1/page.png", compress_level=0)
+        with patch.object(optimize_images, "optimize_image", wraps=optimize_images.optimize_image) as m:
+            optimize_images.optimize_comic_images("", self.comic_info, self.get_comic_data_dicts())
+        self.assertEqual(1, m.call_count)
+        self.assertEqual(2, len(os.listdir(os.path.join(".comic_git_cache", "optimized_images"))))
+
+    def test_disabled(self):
+        comic_data_dicts = self.get_comic_data_dicts()
+        optimize_images.optimize_comic_images("", RawConfigParser(), comic_data_dicts)
+        self.assertEqual(self.get_comic_data_dicts(), comic_data_dicts)
+        self.assertFalse(os.path.exists("comic"))
@@ -0,0 +1,42 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from scripts import output_writer
+
+
+class TestOutputWriter(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = self.temp_dir.name
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_write(self):
+        writer = output_writer.OutputWriter(threads=2, max_pending=1)
+        paths = [os.path.join(self.root, "comic", f"Page {i}", "index.html") for i in range(20)]
+        for i, path in enumerate(paths):
+            writer.write(path, f"page {i}".encode("utf-8"))
+        self.assertEqual([], writer.flush())
+        for i, path in enumerate(paths):
+            with open(path, "rb") as f:
+                self.assertEqual(f"page {i}".encode("utf-8"), f.read())
+        writer.close()
+
+    def test_errors(self):
+        with open(os.path.join(self.root, "file"), "w"):
+            pass
+        bad_path = os.path.join(self.root, "file", "index.html")
+        writer = output_writer.OutputWriter()
+        writer.write(bad_path, b"")
+        writer.write(os.path.join(self.root, "index.html"), b"")
+        errors = writer.flush()
+        self.assertEqual([bad_path], [path for path, _ in errors])
+        self.assertIsInstance(errors[0][1], OSError)
+        # Errors are only reported once
+        self.assertEqual([], writer.flush())
+        writer.write(bad_path, b"")
+        with self.assertRaises(output_writer.OutputWriteError):
+            writer.close()
@@ -0,0 +1,63 @@
+import pickle
+from unittest import TestCase
+
+from jinja2 import Environment, StrictUndefined
+
+from scripts.page_record import PageRecord
+
+
+class TestPageRecord(TestCase):
+
+    def test_mapping(self):
+        record = PageRecord({"page_name": "Page 1", "_title": "Title", "_custom_option": "custom"})
+        self.assertEqual("Page 1", record["page_name"])
+        self.assertEqual("custom", record["_custom_option"])
+        self.assertEqual({"_custom_option": "custom"}, record.user_values)
+        self.assertIn("_title", record)
+        self.assertNotIn("_storyline", record)
+        self.assertIsNone(record.get("_storyline"))
+        with self.assertRaises(KeyError):
+            _ = record["_storyline"]
+        self.assertEqual({"page_name": "Page 1", "_title": "Title", "_custom_option": "custom"}, dict(record))
+        del record["_title"]
+        del record["_custom_option"]
+        self.assertEqual({"page_name": "Page 1"}, dict(record))
+        with self.assertRaises(KeyError):
+            del record["_title"]
+
+    def test_add_global_values(self):
+        record = PageRecord({"page_name": "Page 1", "comic_title": "Page value"})
+        global_values = {"comic_title": "Global value", "theme": "default"}
+        record.add_global_values(global_values)
+        # Global values win over page values with the same name, the same as dict.update() would do
+        self.assertEqual("Global value", record["comic_title"])
+        self.assertEqual("default", record["theme"])
+        self.assertEqual(3, len(record))
+        self.assertEqual({"page_name": "Page 1", "comic_title": "Global value", "theme": "default"}, dict(record))
+        self.assertEqual(dict(record), record.to_dict())
+        # Global values aren't copied into the record
+        self.assertNotIn("theme", record.user_values)
+        # Values set after the global values are attached win
+        record["theme"] = "page theme"
+        self.assertEqual("page theme", record.to_dict()["theme"])
+        self.assertEqual("default", global_values["theme"])
+
+    def test_copy(self):
+        record = PageRecord({"page_name": "Page 1", "_tags": ["a"]})
+        record.add_global_values({"theme": "default"})
+        new_record = record.copy()
+        new_record["page_name"] = "Page 2"
+        self.assertEqual("Page 1", record["page_name"])
+        self.assertEqual("default", new_record["theme"])
+
+    def test_pickle(self):
+        record = PageRecord({"page_name": "Page 1", "_custom_option": "custom"})
+        self.assertEqual(dict(record), dict(pickle.loads(pickle.dumps(record))))
+
+    def test_template(self):
+        record = PageRecord({"page_name": "Page 1", "_title": "Title", "_custom_option": "custom"})
+        template = Environment(undefined=StrictUndefined).from_string(
+            "{{ page.page_name }} {{ page._title }} {{ page._custom_option }} {{ page['_title'] }}"
+            "{% if page._storyline is defined %} storyline{% endif %}"
+        )
+        self.assertEqual("Page 1 Title custom Title", template.render(page=record))
@@ -1,10 +1,14 @@
 from configparser import RawConfigParser
 from copy import deepcopy
+from datetime import datetime
 from unittest import TestCase
 from unittest.mock import patch, mock_open, MagicMock
 from xml.etree import ElementTree
 
+from pytz import timezone
+
 from scripts import build_rss_feed
+from working_directory import temp_working_directory
 
 
 class TestRssFeed(TestCase):
@@ -144,6 +148,27 @@ class TestRssFeed(TestCase):
 """
         open_mock().write.assert_called_once_with(expected.encode("utf-8"))
 
+    def test_build_rss_feed_spooled_posts(self):
+        comic_data_dicts = [{
+            "_title": f"Page {i}",
+            "_post_date": "January 1, 1903",
+            "page_name": f"Page {i}",
+            "comic_paths": [f"your_content/comics/Page {i}/page_{i}.png"],
+            "escaped_alt_text": "Alt text",
+            "post_html": f"<p>Post {{{i}}}</p>",
+        } for i in range(3)]
+        with temp_working_directory(), patch.dict(build_rss_feed.cdata_dict, clear=True):
+            build_rss_feed.build_rss_feed(self.comic_info, comic_data_dicts)
+            with open("feed.xml", "rb") as f:
+                expected = f.read()
+            spooled_posts = build_rss_feed.SpooledPosts()
+            for comic_data in comic_data_dicts:
+                spooled_posts.add(comic_data["page_name"], comic_data.pop("post_html"))
+            build_rss_feed.build_rss_feed(self.comic_info, comic_data_dicts, spooled_posts)
+            spooled_posts.close()
+            with open("feed.xml", "rb") as f:
+                self.assertEqual(expected, f.read())
+
     def test_add_item(self):
         channel = ElementTree.Element("channel")
         comic_data = {
@@ -211,3 +236,16 @@ class TestRssFeed(TestCase):
 <p>Why you reading this when there\'s a perfectly good image up above?</p>]]>'''}
         actual = build_rss_feed.cdata_dict
         self.assertEqual(expected, actual)
+
+    def test_add_item_post_datetime(self):
+        channel = ElementTree.Element("channel")
+        comic_data = {
+            "_title": "I'ma title bay-bee!",
+            "_post_date": "January 1, 1903",
+            "_post_datetime": timezone("US/Eastern").localize(datetime(1903, 1, 1, 12, 30)),
+            "page_name": "Page 1",
+            "comic_paths": ["your_content/comics/Page 1/page_1.png"],
+            "post_html": "",
+        }
+        build_rss_feed.add_item(channel, comic_data, "https://www.tamberlanecomic.com/", self.comic_info)
+        self.assertEqual("Thu, 01 Jan 1903 12:30:00 -0500", channel.find("item/pubDate").text)
@@ -0,0 +1,57 @@
+import json
+import os
+from configparser import RawConfigParser
+from unittest.mock import patch
+
+from scripts import build_search_index
+from working_directory import TempDirTestCase
+
+
+class TestSearchIndex(TempDirTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.comic_info = RawConfigParser()
+        self.comic_info.read_string("[Search]\nBuild search index = True\n")
+        self.comic_data_dicts = [
+            {"page_name": "Page 1", "_title": "The Cat", "_post_date": "2020-01-01", "_tags": ["Cats"],
+             "_characters": ["Alice"], "_storyline": "Intro", "transcripts": {"English": "<p>Alice &amp; the cat</p>"}},
+            {"page_name": "Page 2", "_title": "The Dog", "_post_date": "2020-01-02", "_tags": [],
+             "_characters": [], "_storyline": "", "transcripts": {}},
+        ]
+
+    def read_json(self, name):
+        with open(os.path.join("comic", "search", name), encoding="utf-8") as f:
+            return json.load(f)
+
+    def test_get_shard_name(self):
+        self.assertEqual("ca", build_search_index.get_shard_name("cat"))
+        self.assertEqual("a", build_search_index.get_shard_name("a"))
+        self.assertEqual("_c3a974", build_search_index.get_shard_name("étoile"))
+        self.assertEqual("_5f", build_search_index.get_shard_name("_"))
+
+    def test_build_search_index(self):
+        build_search_index.build_search_index("", self.comic_info, self.comic_data_dicts)
+        index = self.read_json("index.json")
+        self.assertEqual([["Page 1", "The Cat", "2020-01-01"], ["Page 2", "The Dog", "2020-01-02"]], index["pages"])
+        self.assertEqual(["al", "ca", "do", "in", "th"], index["shards"])
+        # "cat" is in the title and transcript of the first page
+        self.assertEqual({"cat": [[0, 0b10001]], "cats": [[0, 0b10]]}, self.read_json("ca.json"))
+        self.assertEqual({"the": [[0, 0b10001], [1, 0b1]]}, self.read_json("th.json"))
+        self.assertEqual({"alice": [[0, 0b10100]]}, self.read_json("al.json"))
+        # HTML tags and entities are stripped from transcripts
+        self.assertFalse(os.path.exists(os.path.join("comic", "search", "am.json")))
+
+    def test_build_search_index_incremental(self):
+        build_search_index.build_search_index("", self.comic_info, self.comic_data_dicts)
+        self.comic_data_dicts[1]["_title"] = "The Bird"
+        with patch.object(build_search_index, "get_page_terms", wraps=build_search_index.get_page_terms) as m:
+            build_search_index.build_search_index("", self.comic_info, self.comic_data_dicts)
+        # Only the page that changed has its terms found again
+        self.assertEqual(1, m.call_count)
+        self.assertEqual({"bird": [[1, 0b1]]}, self.read_json("bi.json"))
+        self.assertNotIn("do", self.read_json("index.json")["shards"])
+
+    def test_build_search_index_disabled(self):
+        build_search_index.build_search_index("", RawConfigParser(), self.comic_data_dicts)
+        self.assertFalse(os.path.exists(os.path.join("comic", "search")))
@@ -0,0 +1,88 @@
+import os
+from configparser import RawConfigParser
+
+from scripts import build_cache, build_site, output_writer, staged_output, utils
+from working_directory import TempDirTestCase
+
+
+def write(path: str, contents: str):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        f.write(contents)
+
+
+def read(path: str) -> str:
+    with open(path) as f:
+        return f.read()
+
+
+class TestStagedOutput(TempDirTestCase):
+
+    def tearDown(self):
+        utils.output_directory = ""
+        build_site.utils.output_directory = ""
+
+    def test_swap(self):
+        write("comic/old/index.html", "old page")
+        write("comic/same/index.html", "same page")
+        write("feed.xml", "old feed")
+        write("archive/index.html", "old archive")
+        write("custom/kept.html", "not built")
+        utils.output_directory = staged_output.start_staging()
+
+        utils.write_output_file("comic/same/index.html", b"same page")
+        utils.write_output_file("comic/new/index.html", b"new page")
+        utils.write_output_file("feed.xml", b"new feed")
+        # Written by a hook, outside of the usual output paths
+        utils.write_output_file("custom/hook.html", b"hook page")
+        # The live site isn't touched until the swap
+        self.assertEqual("old feed", read("feed.xml"))
+        self.assertTrue(os.path.samefile("comic/same/index.html",
+                                         os.path.join(utils.output_directory, "comic/same/index.html")))
+        same_inode = os.stat("comic/same/index.html").st_ino
+
+        staged_output.swap_staged_output(["comic", "feed.xml", "archive"])
+        self.assertEqual(["new", "same"], sorted(os.listdir("comic")))
+        self.assertEqual(same_inode, os.stat("comic/same/index.html").st_ino)
+        self.assertEqual("new feed", read("feed.xml"))
+        self.assertFalse(os.path.exists("archive"))
+        self.assertEqual(["hook.html", "kept.html"], sorted(os.listdir("custom")))
+        self.assertFalse(os.path.exists(staged_output.STAGING_FOLDER))
+        self.assertFalse(os.path.exists(staged_output.PREVIOUS_FOLDER))
+        # Leftover staging folders are never committed with the site
+        self.assertTrue(os.path.isfile(os.path.join(build_cache.CACHE_DIRECTORY, ".gitignore")))
+
+    def test_link_previous_file(self):
+        write("tagged/a/index.html", "tag page")
+        staged_output.start_staging()
+        self.assertTrue(staged_output.link_previous_file("tagged/a/index.html"))
+        self.assertFalse(staged_output.link_previous_file("tagged/b/index.html"))
+        staged_output.discard_staged_output()
+        self.assertEqual("tag page", read("tagged/a/index.html"))
+        self.assertFalse(os.path.exists(staged_output.STAGING_FOLDER))
+
+    def test_rewrite_linked_file(self):
+        # Writing over a file that's linked to the live site mustn't change the live copy
+        write("index.html", "old")
+        utils.output_directory = staged_output.start_staging()
+        staged_output.link_previous_file("index.html")
+        utils.write_output_file("index.html", b"new")
+        self.assertEqual("old", read("index.html"))
+        staged_output.swap_staged_output(["index.html"])
+        self.assertEqual("new", read("index.html"))
+
+    def test_failed_tagged_page(self):
+        # build_site.py imports its own copy of utils
+        build_site.utils.output_directory = "stage"
+        write("templates/tagged.tpl", "{{ tag }}")
+        build_site.utils.build_jinja_environment(RawConfigParser(), ["templates"])
+        # A file in the way of the tag page's folder, so it can't be written
+        write("stage/tagged/bad", "")
+        build_site.utils.output_writer = output_writer.OutputWriter()
+        try:
+            failed_tags = build_site.write_tagged_page_batch({"theme": "default"}, [("good", []), ("bad", [])])
+        finally:
+            build_site.utils.output_writer.close()
+            build_site.utils.output_writer = None
+        self.assertEqual(["bad"], failed_tags)
+        self.assertEqual("good", read("stage/tagged/good/index.html"))
@@ -0,0 +1,50 @@
+from collections import OrderedDict
+from unittest import TestCase
+
+from scripts import storyline_index
+from scripts.storyline_index import StorylineIndex
+
+
+def make_pages(*storylines):
+    return [{"page_name": str(i), "_storyline": storyline} for i, storyline in enumerate(storylines)]
+
+
+class TestStorylineIndex(TestCase):
+
+    def test_build(self):
+        pages = make_pages("A", "A", "", "B", "A", "")
+        storylines = StorylineIndex.build(pages)
+        self.assertEqual(["A", "B", "Uncategorized"], list(storylines.keys()))
+        a = storylines["A"]
+        self.assertEqual([[0, 2], [4, 5]], a.ranges)
+        self.assertEqual((3, 3), (a.count, len(a)))
+        self.assertIs(pages[0], a.first)
+        self.assertIs(pages[4], a.last)
+        self.assertEqual(["0", "1", "4"], [p["page_name"] for p in a])
+        self.assertIs(pages[4], a[2])
+        self.assertIs(pages[4], a[-1])
+        self.assertEqual([pages[1], pages[4]], a[1:])
+        with self.assertRaises(IndexError):
+            a[3]
+        self.assertEqual(["A", "B"], list(StorylineIndex.build(pages, show_uncategorized=False).keys()))
+        self.assertEqual(0, len(StorylineIndex.build([])))
+
+    def test_hook_adapter(self):
+        pages = make_pages("A", "A", "B")
+        storylines_dict = StorylineIndex.build(pages).to_dict()
+        self.assertEqual(OrderedDict([("A", pages[:2]), ("B", pages[2:])]), storylines_dict)
+
+        # Reordered and renamed by a hook, with the same page dicts
+        hooked = StorylineIndex.from_dict(pages, OrderedDict([("Chapter B", [pages[2]]), ("Chapter A", pages[:2])]))
+        self.assertEqual(["Chapter B", "Chapter A"], list(hooked.keys()))
+        self.assertEqual([[0, 2]], hooked["Chapter A"].ranges)
+        self.assertIs(pages, hooked["Chapter A"].pages)
+
+        # Pages that aren't in the page list are kept as they are
+        copy = dict(pages[0], _title="Copy")
+        hooked = storyline_index.from_hook_result(pages, {"A": [copy, pages[1]]})
+        self.assertEqual([copy, pages[1]], list(hooked["A"]))
+
+        # Anything that isn't lists of pages is passed through
+        volumes = {"Volume 1": {"A": pages[:2]}}
+        self.assertIs(volumes, storyline_index.from_hook_result(pages, volumes))
@@ -0,0 +1,76 @@
+import os
+from configparser import RawConfigParser
+from unittest.mock import patch
+
+from scripts import build_site
+from working_directory import TempDirTestCase
+
+
+class TestTaggedPages(TempDirTestCase):
+
+    def setUp(self):
+        super().setUp()
+        os.makedirs("templates")
+        with open("templates/tagged.tpl", "w") as f:
+            f.write("{{ tag }}: {% for page in tagged_pages %}{{ page.page_name }} {% endfor %}")
+        self.comic_info = RawConfigParser()
+        self.comic_info.read_dict({"Comic Settings": {}})
+        # build_site.py imports its own copy of utils
+        build_site.utils.build_jinja_environment(self.comic_info, ["templates"])
+        self.comic_data_dicts = [
+            {"page_name": "Page 1", "_tags": ["Cats"], "_characters": ["Alice"]},
+            {"page_name": "Page 2", "_tags": ["Cats", "Dogs"], "_characters": []},
+        ]
+        self.global_values = {"theme": "default"}
+
+    def tearDown(self):
+        build_site.TAGGED_PAGE_FINGERPRINTS = {}
+
+    def write_tagged_pages(self, comic_data_dicts, comic_folder=""):
+        with patch.object(build_site.utils, "write_to_template", wraps=build_site.utils.write_to_template) as m:
+            build_site.write_tagged_pages(comic_folder, self.comic_info, comic_data_dicts, self.global_values,
+                                          self.global_values)
+        return sorted(call.args[1] for call in m.call_args_list)
+
+    def save_build_state(self):
+        # What main() does once the build is done
+        build_site.build_cache.update_build_state(tagged_pages=build_site.get_tagged_page_state())
+        build_site.TAGGED_PAGE_FINGERPRINTS = {}
+
+    def test_write_tagged_pages(self):
+        all_pages = ["tagged/Alice/index.html", "tagged/Cats/index.html", "tagged/Dogs/index.html"]
+        self.assertEqual(all_pages, self.write_tagged_pages(self.comic_data_dicts))
+        with open("tagged/Cats/index.html") as f:
+            self.assertEqual("Cats: Page 1 Page 2 ", f.read())
+        # Every tag page is rendered again, since they're given the latest page and values built from every page
+        self.assertEqual(all_pages, self.write_tagged_pages(self.comic_data_dicts))
+
+    def test_reuse_unchanged_tagged_pages(self):
+        self.comic_info.set("Comic Settings", "Reuse unchanged tag pages", "True")
+        self.write_tagged_pages(self.comic_data_dicts)
+        self.save_build_state()
+        self.assertEqual([], self.write_tagged_pages(self.comic_data_dicts))
+        self.save_build_state()
+        # A new page only changes the pages of its own tags
+        comic_data_dicts = self.comic_data_dicts + [{"page_name": "Page 3", "_tags": ["Dogs"], "_characters": []}]
+        self.assertEqual(["tagged/Dogs/index.html"], self.write_tagged_pages(comic_data_dicts))
+
+    def test_reuse_unchanged_tagged_pages_of_extra_comics(self):
+        self.comic_info.set("Comic Settings", "Reuse unchanged tag pages", "True")
+        extra_comic_data_dicts = [{"page_name": "Page 1", "_tags": ["Cats", "Birds"], "_characters": []}]
+        for _ in range(2):
+            build_site.utils.output_directory = build_site.staged_output.start_staging()
+            try:
+                # Extra comics are built before the main comic
+                extra_comic_pages = self.write_tagged_pages(extra_comic_data_dicts, "extra/")
+                main_comic_pages = self.write_tagged_pages(self.comic_data_dicts)
+            finally:
+                build_site.utils.output_directory = ""
+            build_site.staged_output.swap_staged_output(["tagged"])
+            self.save_build_state()
+        # Each comic keeps its own fingerprints, but the main comic wrote the Cats page last, so only it can reuse it
+        self.assertEqual(["tagged/Cats/index.html"], extra_comic_pages)
+        self.assertEqual([], main_comic_pages)
+        self.assertEqual(["Alice", "Birds", "Cats", "Dogs"], sorted(os.listdir("tagged")))
+        with open("tagged/Cats/index.html") as f:
+            self.assertEqual("Cats: Page 1 Page 2 ", f.read())
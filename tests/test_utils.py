@@ -1,7 +1,10 @@
 import unittest
 from configparser import RawConfigParser
+from datetime import datetime, timedelta
 from unittest import mock
 
+from pytz import timezone
+
 from scripts import utils
 
 
@@ -111,3 +114,54 @@ class TestUtils(unittest.TestCase):
             ("https://www.tamberlanecomic.com", ""),
             utils.get_comic_url(comic_info)
         )
+
+    def test_parse_post_date(self):
+        # strptime path
+        self.assertEqual(datetime(1903, 1, 1), utils.parse_post_date("January 1, 1903", "%B %d, %Y"))
+        # ISO-8601 fast path
+        self.assertEqual(datetime(2020, 5, 31, 14, 30), utils.parse_post_date("2020-05-31 14:30", "%Y-%m-%d %H:%M"))
+        # ISO formats that fromisoformat() can't handle fall back to strptime
+        self.assertEqual(datetime(2020, 5, 1), utils.parse_post_date("2020-5-1", "%Y-%m-%d"))
+        with self.assertRaises(ValueError):
+            utils.parse_post_date("May 1, 2020", "%Y-%m-%d")
+        # fromisoformat() accepts dates that don't match the date format, which strptime() still rejects
+        for post_date in ("2024-01-05", "2024-01-05 10:00+09:00", "2024-01-05T10:00", "2024-01-05 10:00:00"):
+            with self.subTest(post_date=post_date), self.assertRaises(ValueError):
+                utils.parse_post_date(post_date, "%Y-%m-%d %H:%M", timezone("US/Pacific"))
+        # Timezone-aware
+        post_date = utils.parse_post_date("2020-05-31", "%Y-%m-%d", timezone("US/Pacific"))
+        self.assertEqual(timedelta(hours=-7), post_date.utcoffset())
+        self.assertEqual(datetime(2020, 5, 31), post_date.replace(tzinfo=None))
+
+    def test_parse_info_string(self):
+        samples = [
+            "Title = Page 1\nPost date = January 1, 2020\nFilename = page_1.png\nAlt text = \n",
+            "Title: Page 1\r\nAlt text = Something: with a colon\r\n",
+            # Comments, empty lines, and !-prefixed options
+            "# A comment\nTitle = Page 1\n; Another comment\n\n!Notes = Don't publish this\nTags = a, b",
+            # Multi-line values, including empty lines and comments inside them
+            "Title = Page 1\nAlt text = First line\n    Second line\n\n    Third line\n    # Not a line\n\nTags = a",
+            "  Title = Indented\n  Tags = a\n     b\n",
+            "Title = Trailing empty lines\n\n\n",
+            "Title = = starts with equals",
+            "",
+        ]
+        for sample in samples:
+            with self.subTest(sample=sample):
+                self.assertEqual(utils.read_info_string(sample, to_dict=True), utils.parse_info_string(sample))
+
+    def test_parse_info_string_fallback(self):
+        samples = [
+            # Section headers
+            "[DEFAULT]\nTitle = Page 1",
+            "Title = Page 1\n[Section]\nTags = a",
+            # Option without a value
+            "Title = Page 1\nNo value here",
+            # Duplicate option
+            "Title = Page 1\nTitle = Page 2",
+            # Empty option name
+            "= value",
+        ]
+        for sample in samples:
+            with self.subTest(sample=sample):
+                self.assertIsNone(utils.parse_info_string(sample))
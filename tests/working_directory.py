@@ -0,0 +1,28 @@
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import Iterator
+from unittest import TestCase
+
+
+@contextmanager
+def temp_working_directory() -> Iterator[str]:
+    """
+    Changes into a new, empty temporary folder for the body of the with statement, then changes back and deletes it
+    """
+    old_cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        os.chdir(temp_dir)
+        try:
+            yield temp_dir
+        finally:
+            os.chdir(old_cwd)
+
+
+class TempDirTestCase(TestCase):
+    """
+    Runs each test in its own temporary working directory, which is available as self.temp_dir.
+    """
+
+    def setUp(self):
+        self.temp_dir = self.enterContext(temp_working_directory())